@@ -1,7 +1,13 @@
+import json
+import base64
+import binascii
 import logging
 import uuid
-from typing import Any, Type, TypeVar
+from datetime import date, datetime
+from typing import Any, Type, TypeVar, Iterable, Sequence
+import sqlalchemy as sa
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID, uuid4
 from pydantic import BaseModel
 
@@ -78,3 +84,127 @@ def sentinel_uuid(obj: T, keys: list[str]) -> T:
         if value is not None:
             setattr(obj, key, uuid.UUID(value))
     return obj
+
+
+async def copy_rows(session: AsyncSession, table: str, columns: list[str], rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Stream `rows` into `table` via the COPY protocol of the underlying psycopg connection.
+    This runs within the transaction of the given session, so it is usually used to fill
+    (temporary) staging tables that are merged into the actual tables with set-based statements afterwards.
+
+    Values are sent in text format, so JSON(B) columns expect already serialised strings.
+
+    :param session:
+    :param table: Name of the target table
+    :param columns: Names of the columns in the order of values in each row
+    :param rows: Iterable of row tuples
+    :return: Number of rows sent to the database
+    """
+    from psycopg import sql
+
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    stmt = sql.SQL('COPY {table} ({columns}) FROM STDIN').format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(', ').join(sql.Identifier(col) for col in columns),
+    )
+
+    n_rows = 0
+    async with driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+        async with cursor.copy(stmt) as copy:
+            for row in rows:
+                await copy.write_row(row)
+                n_rows += 1
+    return n_rows
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque token for keyset pagination, holding the sort key values of the last row on a page.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def _cursor_value(value: Any, column: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type in {datetime, date}:
+        return python_type.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return value
+
+
+def decode_cursor(cursor: str, *columns: Any) -> list[Any]:
+    """
+    Inverse of `encode_cursor()`; values are converted back to the python types of the respective `columns`.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error) as e:
+        raise ValueError(f'Invalid cursor "{cursor}"') from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError(f'Invalid cursor "{cursor}"')
+    return [_cursor_value(value, column) for value, column in zip(values, columns, strict=True)]
+
+
+def keyset_paginate(
+    stmt: sa.Select,  # type: ignore[type-arg]
+    Schema: Type[Base],
+    limit: int,
+    cursor: str | None = None,
+    order_by: str = 'item_id',
+) -> sa.Select:  # type: ignore[type-arg]
+    """
+    Keyset (cursor) pagination: Instead of skipping `offset` rows, which the database has to produce and
+    discard first, continue right after the sort key of the last row on the previous page.
+    Rows are ordered by `order_by` (NULLs last) with `item_id` as a tiebreaker, so the order is total and stable
+    even when items are added or removed between pages.
+
+    Note, that this fetches one extra row, so `next_cursor()` can tell whether there is another page.
+    If `stmt` uses DISTINCT ON (item_id), the sort key is added to it, as postgres needs it to match the leftmost ORDER BY.
+
+    :param stmt: statement selecting `Schema`
+    :param Schema: ORM class with an `item_id` and the `order_by` column
+    :param limit: page size
+    :param cursor: token from `next_cursor()` of the previous page (or None for the first page)
+    :param order_by: name of the column in `Schema` to sort by
+    :return:
+    """
+    item_id = Schema.item_id  # type: ignore[attr-defined]
+
+    if order_by == 'item_id':
+        if cursor is not None:
+            (last_id,) = decode_cursor(cursor, item_id)
+            stmt = stmt.where(item_id > last_id)
+        return stmt.order_by(item_id).limit(limit + 1)
+
+    key = getattr(Schema, order_by)
+    if cursor is not None:
+        last_key, last_id = decode_cursor(cursor, key, item_id)
+        if last_key is None:
+            stmt = stmt.where(sa.and_(key.is_(None), item_id > last_id))
+        else:
+            stmt = stmt.where(sa.or_(key > last_key, sa.and_(key == last_key, item_id > last_id), key.is_(None)))
+    if stmt._distinct_on:
+        stmt = stmt.distinct(key)
+    return stmt.order_by(key.asc().nulls_last(), item_id).limit(limit + 1)
+
+
+def next_cursor(rows: Sequence[Any], limit: int, order_by: str = 'item_id') -> str | None:
+    """
+    Token for the page following `rows` (which were fetched by a statement from `keyset_paginate()`)
+    or None if this is the last page.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    if order_by == 'item_id':
+        return encode_cursor(last.item_id)
+    return encode_cursor(getattr(last, order_by), last.item_id)
@@ -1,8 +1,12 @@
 import uuid
 import logging
+from typing import Any
 
 from pydantic import BaseModel
-from sqlalchemy import select, delete, asc, desc
+
+from sqlalchemy import select, delete, insert, update, asc, desc, func, any_, literal, Row
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.dialects.postgresql import insert as insert_pg
 from sqlalchemy.sql import text
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
 
@@ -362,72 +366,78 @@ async def delete_assignment_scope(session: DBSession, assignment_scope_id: str |
         raise ValueError(f'Assignment scope with id="{assignment_scope_id}" does not seem to exist.')
 
 
+# Columns that change when an existing annotation is re-submitted
+ANNOTATION_UPDATE_COLUMNS = ['key', 'repeat', 'parent', 'value_int', 'value_bool', 'value_str', 'value_float', 'multi_int']
+
+
+def _parents_first(rows: list[dict[str, Any]], id_field: str) -> list[dict[str, Any]]:
+    # Sub-annotations reference their parent, so parents have to be written before their children
+    parents = {str(row[id_field]): row['parent'] for row in rows}
+
+    def depth(row: dict[str, Any]) -> int:
+        level = 0
+        parent = row['parent']
+        while parent is not None and str(parent) in parents and level < len(parents):
+            parent = parents[str(parent)]
+            level += 1
+        return level
+
+    return sorted(rows, key=depth)
+
+
 async def upsert_annotations(
     annotations: list[AnnotationModel], assignment_id: str | uuid.UUID | None, db_engine: DatabaseEngineAsync
 ) -> AssignmentStatus | None:
+    """
+    Save the annotations submitted for an assignment and update its status.
+    Annotations of the assignment that were not submitted are deleted, existing ones are updated, and new ones are created.
+    This is done in one DELETE and one INSERT ... ON CONFLICT statement.
+
+    Existing annotations are only updated if they belong to the same assignment and user as the submitted one;
+    if an `annotation_id` is taken by another assignment or user, nothing is saved and a ValueError is raised.
+    The assignment status is validated against the annotation scheme, which is read once (in the same session).
+    """
     if not all([annotation is not None and annotation.annotation_id is not None for annotation in annotations]):  # noqa: C419
         raise ValueError('One or more annotations have no ID, this an undefined behaviour.')
 
-    if assignment_id is not None:
-        existing_annotations = await read_annotations_for_assignment(assignment_id=assignment_id, db_engine=db_engine)
-        existing_ids = {str(annotation.annotation_id) for annotation in existing_annotations}
-        submitted_ids = {str(annotation.annotation_id) for annotation in annotations}
-
-        ids_to_remove = existing_ids - submitted_ids
-        ids_to_update = existing_ids - ids_to_remove
-        ids_to_create = submitted_ids - ids_to_update
-    else:
-        ids_to_remove = set()
-        ids_to_update = set()
-        ids_to_create = {str(annotation.annotation_id) for annotation in annotations}
-
-    logger.debug(f'[upsert_annotations] CREATING new annotations with ids: {ids_to_create}')
-    logger.debug(f'[upsert_annotations] UPDATING existing annotations with ids: {ids_to_update}')
-    logger.debug(f'[upsert_annotations] DELETING existing annotations with ids: {ids_to_remove}')
+    submitted_ids = [str(annotation.annotation_id) for annotation in annotations]
 
     session: AsyncSession
     async with db_engine.session() as session:
-        annotation: AnnotationModel | Annotation | None
-        # TODO this seems too excessive compared to simply deleting them directly (but has to be done for FK constraint)
-        #      session.execute(delete(Annotation).where(Annotation.annotation_id == annotation_id))
-        annotations_to_delete = [(await session.scalars(select(Annotation).filter_by(annotation_id=annotation_id))).first() for annotation_id in ids_to_remove]
-        for annotation in annotations_to_delete:
-            await session.delete(annotation)
-
-        new_annotations = []
-        for annotation in annotations:
-            if str(annotation.annotation_id) in ids_to_create:
-                new_annotations.append(Annotation(**annotation.model_dump()))
-
-        session.add_all(new_annotations)
-        await session.flush()
-
-        for annotation in annotations:
-            if annotation.annotation_id in ids_to_update:
-                stmt = select(Annotation).filter_by(annotation_id=annotation.annotation_id)
-                annotation_db = (await session.scalars(stmt)).one_or_none()
-                if annotation_db is None:
-                    raise RuntimeError(
-                        f'During processing, one of the annotations disappeared.This should never happen! ID for reference: {annotation.annotation_id}'
-                    )
-                annotation_db.key = annotation.key
-                annotation_db.repeat = annotation.repeat
-                annotation_db.parent = annotation.parent
-                annotation_db.value_int = annotation.value_int
-                annotation_db.value_bool = annotation.value_bool
-                annotation_db.value_str = annotation.value_str
-                annotation_db.value_float = annotation.value_float
-                await session.flush()
+        if assignment_id is not None:
+            stmt_delete = delete(Annotation).where(Annotation.assignment_id == assignment_id, Annotation.annotation_id.not_in(submitted_ids))
+            deleted = await session.execute(stmt_delete)
+            logger.debug(f'[upsert_annotations] DELETED {deleted.rowcount} existing annotations')  # type: ignore[attr-defined]
+
+        if len(annotations) > 0:
+            stmt_insert = insert_pg(Annotation)
+            stmt_upsert = stmt_insert.on_conflict_do_update(
+                index_elements=[Annotation.annotation_id],
+                set_={**{column: stmt_insert.excluded[column] for column in ANNOTATION_UPDATE_COLUMNS}, 'time_updated': func.now()},
+                # Never take over annotations from another assignment or user
+                where=(Annotation.assignment_id == stmt_insert.excluded.assignment_id) & (Annotation.user_id == stmt_insert.excluded.user_id),
+            ).returning(Annotation.annotation_id)
+            upserted = await session.scalars(
+                stmt_upsert,
+                _parents_first([annotation.model_dump(exclude={'time_created', 'time_updated'}) for annotation in annotations], id_field='annotation_id'),
+            )
+            conflicting = set(submitted_ids) - {str(annotation_id) for annotation_id in upserted}
+            if len(conflicting) > 0:
+                await session.rollback()
+                raise ValueError(f'Annotations {conflicting} belong to another assignment or user.')
+            logger.debug(f'[upsert_annotations] UPSERTED {len(annotations)} annotations')
+
+        status: AssignmentStatus | None = None
+        if assignment_id is not None:
+            assignment = (await session.scalars(select(Assignment).where(Assignment.assignment_id == assignment_id))).one()
+            annotation_scheme = await read_annotation_scheme(session=session, assignment_scope_id=assignment.assignment_scope_id)
+            if annotation_scheme is not None:
+                status = validate_annotated_assignment(annotation_scheme=annotation_scheme, annotations=annotations)
+                assignment.status = status
+
         await session.commit()
 
-    if assignment_id is not None:
-        annotation_scheme = await read_annotation_scheme_for_assignment(assignment_id=assignment_id, db_engine=db_engine)
-        if annotation_scheme is not None:
-            status = validate_annotated_assignment(annotation_scheme=annotation_scheme, annotations=annotations)
-            await update_assignment_status(assignment_id=assignment_id, status=status, db_engine=db_engine, use_commit=True)
-            return status
-
-    return None
+    return status
 
 
 class ItemWithCount(BaseModel):
@@ -554,22 +564,26 @@ async def store_resolved_bot_annotations(
     await session.flush()
 
     # We are assuming, that the parent linkages are already done!
-    for row in matrix.values():
-        for cell in row.values():
-            if cell.resolution and has_values(cell.resolution):
-                ba_dump = cell.resolution.model_dump()
-                ba_dump['bot_annotation_metadata_id'] = meta_uuid
-                ba_dump['bot_annotation_id'] = uuid.UUID(ba_dump['bot_annotation_id'])
-                session.add(BotAnnotation(**ba_dump))
-            # FIXME: When a parent is empty, it will be excluded, leading to a missing foreign key error!
-            #        However, just adding all BA's will add lots of junk to the database...
-
+    # FIXME: When a parent is empty, it will be excluded, leading to a missing foreign key error!
+    #        However, just adding all BA's will add lots of junk to the database...
+    counts = await _write_resolved_bot_annotations(session=session, bot_annotation_metadata_id=meta_uuid, matrix=matrix, existing={})
+    logger.debug(f'[store_resolved_bot_annotations] {counts}')
     await session.flush_or_commit()
 
     return str(meta_uuid)
 
 
-def has_changed(orm: BotAnnotation, resolution: BotAnnotationModel) -> bool:
+class BotAnnotationWriteCounts(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+
+# Columns of a resolved BotAnnotation that can change between revisions of a resolution
+BOT_ANNOTATION_UPDATE_COLUMNS = ['repeat', 'parent', 'order', 'value_bool', 'value_str', 'value_int', 'value_float', 'multi_int']
+
+
+def has_changed(orm: BotAnnotation | Row[Any], resolution: BotAnnotationModel) -> bool:
     return (
         orm.repeat != resolution.repeat
         or str(orm.parent or 'None') != str(resolution.parent or 'None')
@@ -582,8 +596,64 @@ def has_changed(orm: BotAnnotation, resolution: BotAnnotationModel) -> bool:
     )
 
 
+def _as_uuid(value: str | uuid.UUID | None) -> uuid.UUID | None:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(value)
+
+
+def _bot_annotation_row(resolution: BotAnnotationModel, bot_annotation_metadata_id: uuid.UUID, columns: list[str] | None = None) -> dict[str, Any]:
+    row = resolution.model_dump(include=None if columns is None else {'bot_annotation_id', *columns}, exclude={'time_created', 'time_updated'})
+    row['bot_annotation_id'] = _as_uuid(row['bot_annotation_id'])
+    row['parent'] = _as_uuid(row['parent'])
+    if columns is None:
+        row['bot_annotation_metadata_id'] = bot_annotation_metadata_id
+        row['item_id'] = _as_uuid(row['item_id'])
+    if row['order'] is None:
+        # `order` is an identity column, so leave it to the database (or as it is)
+        del row['order']
+    return row
+
+
+async def _write_resolved_bot_annotations(
+    session: DBSession, bot_annotation_metadata_id: uuid.UUID, matrix: ResolutionMatrix, existing: dict[str, Row[Any]]
+) -> BotAnnotationWriteCounts:
+    """
+    Diff the resolutions in the `matrix` against `existing` rows (by bot_annotation_id) and apply the changes
+    with (at most) one DELETE, one INSERT, and one UPDATE statement.
+    Resolutions without an ID get one assigned up front, so that references to parents stay intact.
+    """
+    resolutions = [cell.resolution for row in matrix.values() for cell in row.values() if cell.resolution and has_values(cell.resolution)]
+    for resolution in resolutions:
+        if resolution.bot_annotation_id is None:
+            resolution.bot_annotation_id = uuid.uuid4()
+
+    submitted_ids = {str(resolution.bot_annotation_id) for resolution in resolutions}
+    ids_to_remove = [uuid.UUID(ba_id) for ba_id in existing.keys() if ba_id not in submitted_ids]
+    to_create = [_bot_annotation_row(resolution, bot_annotation_metadata_id) for resolution in resolutions if str(resolution.bot_annotation_id) not in existing]
+    to_update = [
+        _bot_annotation_row(resolution, bot_annotation_metadata_id, columns=BOT_ANNOTATION_UPDATE_COLUMNS)
+        for resolution in resolutions
+        if str(resolution.bot_annotation_id) in existing and has_changed(existing[str(resolution.bot_annotation_id)], resolution)
+    ]
+
+    logger.debug(f'[upsert_bot_annotations] CREATING ({len(to_create):,}) new annotations')
+    logger.debug(f'[upsert_bot_annotations] UPDATING ({len(to_update):,}) existing annotations')
+    logger.debug(f'[upsert_bot_annotations] DELETING ({len(ids_to_remove):,}) existing annotations')
+
+    if len(ids_to_remove) > 0:
+        await session.execute(delete(BotAnnotation).where(BotAnnotation.bot_annotation_id == any_(literal(ids_to_remove, ARRAY(UUID)))))
+    if len(to_create) > 0:
+        await session.execute(insert(BotAnnotation), _parents_first(to_create, id_field='bot_annotation_id'))
+    if len(to_update) > 0:
+        await session.execute(update(BotAnnotation), to_update)
+    await session.flush()
+
+    return BotAnnotationWriteCounts(inserted=len(to_create), updated=len(to_update), deleted=len(ids_to_remove))
+
+
 @ensure_session_async
-async def update_resolved_bot_annotations(session: DBSession, bot_annotation_metadata_id: str, name: str, matrix: ResolutionMatrix) -> None:
+async def update_resolved_bot_annotations(session: DBSession, bot_annotation_metadata_id: str, name: str, matrix: ResolutionMatrix) -> BotAnnotationWriteCounts:
     bot_meta: BotAnnotationMetaData | None = (
         (await session.execute(select(BotAnnotationMetaData).where(BotAnnotationMetaData.bot_annotation_metadata_id == bot_annotation_metadata_id)))
         .scalars()
@@ -593,72 +663,22 @@ async def update_resolved_bot_annotations(session: DBSession, bot_annotation_met
     if bot_meta is None:
         raise MissingIdError(f'No `BotAnnotationMetaData` object for {bot_annotation_metadata_id}')
 
-    resolutions = dehydrate_resolutions(matrix)
     # Update the bot_meta
     bot_meta.name = name
     bot_meta.meta.snapshot = dehydrate_user_annotations(matrix)
-    bot_meta.meta.resolutions = resolutions
+    bot_meta.meta.resolutions = dehydrate_resolutions(matrix)
     await session.flush()
 
-    # Get ids of existing annotations in for this resolution
-    existing_ids_uuid: list[uuid.UUID] = list(
-        (await session.execute(select(BotAnnotation.bot_annotation_id).where(BotAnnotation.bot_annotation_metadata_id == bot_annotation_metadata_id)))
-        .scalars()
-        .all()
+    # Get existing annotations for this resolution (only what we need for comparison)
+    stmt = select(BotAnnotation.bot_annotation_id, *[getattr(BotAnnotation, column) for column in BOT_ANNOTATION_UPDATE_COLUMNS]).where(
+        BotAnnotation.bot_annotation_metadata_id == bot_annotation_metadata_id
     )
+    existing = {str(row.bot_annotation_id): row for row in await session.execute(stmt)}
 
-    # Figure out which ones we have to delete, update, and create
-    existing_ids = {str(ba) for ba in existing_ids_uuid}
-    submitted_ids = {str(res.ba_id) for res in resolutions}
-
-    ids_to_remove = existing_ids - submitted_ids
-    ids_to_update = existing_ids - ids_to_remove
-    ids_to_create = submitted_ids - ids_to_update
-
-    logger.debug(f'[upsert_bot_annotations] CREATING ({len(ids_to_create):,}) new annotations with ids: {ids_to_create}')
-    logger.debug(f'[upsert_bot_annotations] UPDATING ({len(ids_to_update):,}) existing annotations with ids: {ids_to_update}')
-    logger.debug(f'[upsert_bot_annotations] DELETING ({len(ids_to_remove):,}) existing annotations with ids: {ids_to_remove}')
-
-    # Delete old bot_annotations
-    if len(ids_to_remove) > 0:
-        stmt = delete(BotAnnotation).where(BotAnnotation.bot_annotation_id.in_(list(ids_to_remove)))
-        await session.execute(stmt)
-
-    # Create new or update existing bot_annotations
-    new_bot_annotations = []
-    for row in matrix.values():
-        for cell in row.values():
-            if cell.resolution:
-                if str(cell.resolution.bot_annotation_id) in ids_to_update:
-                    if has_values(cell.resolution):
-                        ba_orm: BotAnnotation = (
-                            (await session.execute(select(BotAnnotation).where(BotAnnotation.bot_annotation_id == cell.resolution.bot_annotation_id)))
-                            .scalars()
-                            .one()
-                        )
-                        if has_changed(ba_orm, cell.resolution):
-                            ba_orm.repeat = cell.resolution.repeat
-                            ba_orm.parent = cell.resolution.parent
-                            ba_orm.value_bool = cell.resolution.value_bool
-                            ba_orm.value_str = cell.resolution.value_str
-                            ba_orm.value_int = cell.resolution.value_int
-                            ba_orm.value_float = cell.resolution.value_float
-                            ba_orm.multi_int = cell.resolution.multi_int
-                            ba_orm.order = cell.resolution.order
-                            await session.flush()
-                    else:
-                        await session.execute(delete(BotAnnotation).where(BotAnnotation.bot_annotation_id == cell.resolution.bot_annotation_id))
-                else:
-                    if has_values(cell.resolution):
-                        new_orm = BotAnnotation(**{**cell.resolution.model_dump(), 'bot_annotation_metadata_id': uuid.UUID(bot_annotation_metadata_id)})
-                        new_orm.item_id = uuid.UUID(new_orm.item_id)
-                        new_orm.bot_annotation_id = uuid.UUID(new_orm.bot_annotation_id)
-                        if new_orm.parent:
-                            new_orm.parent = uuid.UUID(new_orm.parent)
-                        new_bot_annotations.append(new_orm)
-    if len(new_bot_annotations) > 0:
-        logger.debug(f'Creating ({len(new_bot_annotations):,} new BotAnnotations.')
-        session.add_all(new_bot_annotations)
-        await session.flush()
+    counts = await _write_resolved_bot_annotations(
+        session=session, bot_annotation_metadata_id=uuid.UUID(str(bot_annotation_metadata_id)), matrix=matrix, existing=existing
+    )
+    logger.debug(f'[update_resolved_bot_annotations] {counts}')
 
     await session.flush_or_commit()
+    return counts
@@ -1,18 +1,19 @@
 import datetime
 import logging
 import uuid
+from typing import Iterable
 
 from sqlalchemy import select, delete, func, text, update
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert as insert_pg
 
-from nacsos_data.db.crud import upsert_orm
+from nacsos_data.db.crud import upsert_orm, copy_rows
 from nacsos_data.db.engine import ensure_session_async, DBSession
 from nacsos_data.db.schemas import Import, m2m_import_item_table, Task, Project
 from nacsos_data.db.schemas.imports import ImportRevision
 from nacsos_data.db.schemas.items.base import Item
-from nacsos_data.models.imports import ImportModel, ImportRevisionModel, M2MImportItemType
+from nacsos_data.models.imports import ImportModel, ImportRevisionModel, ImportCheckpoint, M2MImportItemType
 from nacsos_data.util import elapsed_timer
 from nacsos_data.util.errors import MissingIdError, ParallelImportError
 
@@ -170,6 +171,45 @@ async def upsert_m2m(session: AsyncSession, item_id: str, import_id: str, latest
         logger.debug(' -> Upserted many-to-many relationship for import/item')
 
 
+async def upsert_m2m_bulk(
+    session: AsyncSession,
+    item_ids: Iterable[str | uuid.UUID],
+    import_id: str,
+    latest_revision: int,
+    dry_run: bool,
+    logger: logging.Logger,
+) -> int:
+    """
+    Same as `upsert_m2m()`, but for many items at once.
+    The `item_ids` are sent to a temporary staging table via COPY and then merged
+    into `m2m_import_item` with one INSERT ... SELECT ... ON CONFLICT statement.
+
+    :return: Number of (unique) item_ids that were upserted
+    """
+    item_ids = {str(item_id) for item_id in item_ids}
+    if dry_run:
+        logger.debug(f' [DRY-RUN] -> Upserted {len(item_ids):,} many-to-many relationships for import/item')
+        return len(item_ids)
+    if len(item_ids) == 0:
+        return 0
+
+    await session.execute(text('CREATE TEMPORARY TABLE IF NOT EXISTS tmp_m2m_import_item (item_id uuid NOT NULL) ON COMMIT DROP;'))
+    await copy_rows(session=session, table='tmp_m2m_import_item', columns=['item_id'], rows=((item_id,) for item_id in item_ids))
+    await session.execute(
+        text("""
+            INSERT INTO m2m_import_item (item_id, import_id, type, first_revision, latest_revision)
+            SELECT DISTINCT tmp.item_id, :import_id, 'explicit', :revision, :revision
+            FROM tmp_m2m_import_item tmp
+            ON CONFLICT ON CONSTRAINT m2m_import_item_pkey DO UPDATE SET latest_revision = EXCLUDED.latest_revision;
+        """),
+        {'import_id': import_id, 'revision': latest_revision},
+    )
+    await session.execute(text('TRUNCATE tmp_m2m_import_item;'))
+    await session.flush()
+    logger.debug(f' -> Upserted {len(item_ids):,} many-to-many relationships for import/item')
+    return len(item_ids)
+
+
 async def update_revision_statistics(
     session: AsyncSession,
     import_id: str | uuid.UUID,
@@ -212,6 +252,18 @@ async def update_revision_statistics(
     return None
 
 
+async def set_revision_checkpoint(session: AsyncSession, revision_id: str | uuid.UUID, checkpoint: ImportCheckpoint | None) -> None:
+    """
+    Update the progress of an unfinished import (or clear it by passing None).
+    Note, that this does not commit, so the checkpoint can be written in the same transaction as the data it refers to.
+    """
+    await session.execute(
+        update(ImportRevision)
+        .where(ImportRevision.import_revision_id == revision_id)
+        .values(checkpoint=None if checkpoint is None else checkpoint.model_dump()),
+    )
+
+
 async def get_latest_revision_counter(session: AsyncSession, import_id: str | uuid.UUID) -> int:
     latest_revision: int = (
         await session.execute(  # type: ignore[assignment]
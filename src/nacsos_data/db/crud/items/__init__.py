@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from nacsos_data.db import DatabaseEngineAsync
+from nacsos_data.db.crud import keyset_paginate, next_cursor
 from nacsos_data.db.schemas import (
     Item,
     TwitterItem,
@@ -75,6 +76,26 @@ async def read_paged_for_project(
         return ret
 
 
+async def read_keyset_for_project(
+    project_id: str | UUID,
+    Schema: Type[AnyItemSchema],
+    Model: Type[AnyItemModelType],
+    page_size: int,
+    engine: DatabaseEngineAsync,
+    cursor: str | None = None,
+    order_by: str = 'item_id',
+) -> tuple[list[AnyItemModelType], str | None]:
+    """
+    Like `read_paged_for_project()`, but with keyset pagination instead of OFFSET, so deep pages are as fast as the first.
+    Returns the items and the cursor for the next page (None if this is the last page).
+    """
+    session: AsyncSession
+    async with engine.session() as session:
+        stmt = keyset_paginate(select(Schema).where(Schema.project_id == project_id), Schema=Schema, limit=page_size, cursor=cursor, order_by=order_by)
+        result = (await session.execute(stmt)).scalars().all()
+        return [Model.model_validate(res.__dict__) for res in result[:page_size]], next_cursor(result, limit=page_size, order_by=order_by)
+
+
 def _get_schema_model_for_type(item_type: ItemType | ItemTypeLiteral) -> tuple[Type[AnyItemType], Type[AnyItemModel]]:
     if item_type == 'generic' or item_type == ItemType.generic:
         return GenericItem, GenericItemModel
@@ -120,4 +141,4 @@ async def read_any_item_by_item_id(item_id: str | UUID, item_type: ItemType | It
     return None
 
 
-__all__ = ['read_all_for_project', 'read_paged_for_project', 'read_item_count_for_project', 'read_any_item_by_item_id']
+__all__ = ['read_all_for_project', 'read_paged_for_project', 'read_keyset_for_project', 'read_item_count_for_project', 'read_any_item_by_item_id']
@@ -1,4 +1,5 @@
 import re
+import json
 import uuid
 import logging
 from collections import defaultdict
@@ -7,8 +8,9 @@ from typing import Generator, Callable, TypeAlias, AsyncGenerator, Literal
 from sqlalchemy import select, func, text, cast, TEXT
 from sqlalchemy.ext.asyncio import AsyncSession  # noqa: F401
 
-from ...schemas import AcademicItem, m2m_import_item_table
-from ....models.items import AcademicItemModel, ItemEntry
+from .. import copy_rows
+from ...schemas import Item, AcademicItem, m2m_import_item_table
+from ....models.items import AcademicItemModel, ItemEntry, ItemIndexFingerprint
 from ....util import gather_async
 from ....util.text import itm2txt
 
@@ -45,6 +47,57 @@ async def read_item_entries_from_db(
         yield [ItemEntry(item_id=item_id, text=text) for item_id, text in prepared if text and len(text) > min_text_len]
 
 
+async def read_item_entries_for_revision(
+    session: AsyncSession,
+    import_id: str | uuid.UUID,
+    import_revision: int,
+    log: logging.Logger | None = None,
+    batch_size: int = 500,
+    min_text_len: int = 250,
+) -> AsyncGenerator[list[ItemEntry], None]:
+    """
+    Same as `read_item_entries_from_db()`, but only for items that were part of the given import revision.
+    """
+    if log is None:
+        log = logger
+    stmt = (
+        select(AcademicItem.item_id, AcademicItem.title, AcademicItem.text)
+        .join(m2m_import_item_table, m2m_import_item_table.c.item_id == AcademicItem.item_id)
+        .where(
+            m2m_import_item_table.c.import_id == import_id,
+            m2m_import_item_table.c.latest_revision == import_revision,
+            AcademicItem.text.isnot(None),
+            func.char_length(AcademicItem.text) > min_text_len,
+        )
+        .execution_options(yield_per=batch_size)
+    )
+    rslt = (await session.stream(stmt)).mappings().partitions()
+
+    async for batch in rslt:
+        log.debug(f'Received batch with {len(batch)} entries.')
+        prepared = [(str(r['item_id']), itm2txt(r)) for r in batch]
+
+        yield [ItemEntry(item_id=item_id, text=text) for item_id, text in prepared if text and len(text) > min_text_len]
+
+
+async def read_item_index_fingerprint(session: AsyncSession, project_id: str | uuid.UUID, min_text_len: int = 250) -> ItemIndexFingerprint:
+    """
+    Cheap summary of the items in a project to check if a persisted duplicate detection index is still valid.
+    """
+    stmt = select(
+        func.count(Item.item_id).label('num_items'),
+        func.max(Item.time_edited).label('time_edited'),
+        func.sum(func.hashtextextended(cast(Item.item_id, TEXT), 0)).label('item_checksum'),
+    ).where(Item.project_id == project_id)
+    rslt = (await session.execute(stmt)).mappings().one()
+    return ItemIndexFingerprint(
+        num_items=rslt['num_items'],
+        time_edited=rslt['time_edited'],
+        item_checksum=None if rslt['item_checksum'] is None else int(rslt['item_checksum']),
+        min_text_len=min_text_len,
+    )
+
+
 IdField = Literal['item_id', 'doi', 'wos_id', 'scopus_id', 'openalex_id', 's2_id', 'pubmed_id', 'dimensions_id']
 
 
@@ -150,3 +203,88 @@ async def read_item_ids_for_import(
     async for batch in rslt:
         for r in batch:
             yield r
+
+
+# Columns of the `tmp_academic_item` staging table used by `insert_academic_items_bulk()`
+_STAGED_TEXT_COLUMNS = ['doi', 'wos_id', 'scopus_id', 'openalex_id', 's2_id', 'pubmed_id', 'dimensions_id', 'title', 'title_slug', 'source']
+_STAGED_JSON_COLUMNS = ['keywords', 'authors', 'meta']
+_STAGED_COLUMNS = ['item_id', 'project_id', 'text'] + _STAGED_TEXT_COLUMNS + ['publication_year'] + _STAGED_JSON_COLUMNS
+
+
+def _staged_row(item: AcademicItemModel) -> tuple[str | int | None, ...]:
+    obj = item.model_dump(mode='json')
+    return (
+        str(item.item_id),
+        str(item.project_id),
+        obj['text'],
+        *[obj[col] for col in _STAGED_TEXT_COLUMNS],
+        obj['publication_year'],
+        *[json.dumps(obj[col]) if obj[col] is not None else None for col in _STAGED_JSON_COLUMNS],
+    )
+
+
+async def insert_academic_items_bulk(session: AsyncSession, items: list[AcademicItemModel], log: logging.Logger | None = None) -> int:
+    """
+    Insert many new `AcademicItem`s at once.
+    Items are sent to a temporary staging table via COPY and then merged into `item` and `academic_item`
+    with two set-based INSERT ... SELECT statements.
+
+    Note, that this does not check for duplicates and expects `item_id` and `project_id` to be set on every item.
+    Any constraint violation will fail the entire batch, so you may want to wrap this in a savepoint.
+
+    :param session:
+    :param items:
+    :param log:
+    :return: Number of inserted items
+    """
+    if log is None:
+        log = logger
+    if len(items) == 0:
+        return 0
+
+    await session.execute(
+        text("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS tmp_academic_item (
+                item_id uuid NOT NULL,
+                project_id uuid NOT NULL,
+                text varchar,
+                doi varchar,
+                wos_id varchar,
+                scopus_id varchar,
+                openalex_id varchar,
+                s2_id varchar,
+                pubmed_id varchar,
+                dimensions_id varchar,
+                title varchar,
+                title_slug varchar,
+                source varchar,
+                publication_year integer,
+                keywords jsonb,
+                authors jsonb,
+                meta jsonb
+            ) ON COMMIT DROP;
+        """)
+    )
+    n_staged = await copy_rows(session=session, table='tmp_academic_item', columns=_STAGED_COLUMNS, rows=(_staged_row(item) for item in items))
+    log.debug(f'Staged {n_staged:,} items for bulk insertion.')
+
+    await session.execute(
+        text("""
+            INSERT INTO item (item_id, project_id, text, type)
+            SELECT tmp.item_id, tmp.project_id, tmp.text, 'academic'
+            FROM tmp_academic_item tmp;
+        """)
+    )
+    await session.execute(
+        text("""
+            INSERT INTO academic_item (item_id, project_id, doi, wos_id, scopus_id, openalex_id, s2_id, pubmed_id, dimensions_id,
+                                       title, title_slug, source, publication_year, keywords, authors, meta)
+            SELECT tmp.item_id, tmp.project_id, tmp.doi, tmp.wos_id, tmp.scopus_id, tmp.openalex_id, tmp.s2_id, tmp.pubmed_id, tmp.dimensions_id,
+                   tmp.title, tmp.title_slug, tmp.source, tmp.publication_year, tmp.keywords, tmp.authors, tmp.meta
+            FROM tmp_academic_item tmp;
+        """)
+    )
+    await session.execute(text('TRUNCATE tmp_academic_item;'))
+    await session.flush()
+
+    return n_staged
@@ -49,6 +49,8 @@ class AnnotationTracker(Base):
     recall = mapped_column(mutable_json_type(dbtype=JSONB(none_as_null=True), nested=True), nullable=True, index=False)
     # list[tuple[int, float]] of the BUSCAR metric (stopping criterion)
     buscar = mapped_column(mutable_json_type(dbtype=JSONB(none_as_null=True), nested=True), nullable=True, index=False)
+    # BUSCAR parameters (n_items_total, recall_target, bias) the `buscar` series was computed with
+    buscar_params = mapped_column(mutable_json_type(dbtype=JSONB(none_as_null=True), nested=True), nullable=True, index=False)
     buscar_frontier = mapped_column(mutable_json_type(dbtype=JSONB(none_as_null=True), nested=True), nullable=True, index=False)
 
     # Date and time when this tracker was created (or last updated)
@@ -94,3 +94,5 @@ class ImportRevision(Base):
     num_items_updated = mapped_column(Integer, nullable=True, default=None, server_default=None)
     # Number of items in last revision but not in this one
     num_items_removed = mapped_column(Integer, nullable=True, default=None, server_default=None)
+    # Progress of an unfinished import (see `ImportCheckpoint`), NULL once the import is complete
+    checkpoint = mapped_column(mutable_json_type(dbtype=JSONB(none_as_null=True), nested=True), nullable=True)
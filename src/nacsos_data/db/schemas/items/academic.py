@@ -1,12 +1,12 @@
 import uuid
-from sqlalchemy import String, Integer, ForeignKey, UniqueConstraint, Column
+from sqlalchemy import String, Integer, ForeignKey, UniqueConstraint, Column, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import mapped_column, column_property, Mapped, Relationship, relationship
 from sqlalchemy_json import mutable_json_type
 
 from . import ItemType
 from .. import Import
-from .base import Item
+from .base import Item, ts_document
 from ..projects import Project
 from ...base_class import Base
 
@@ -76,6 +76,12 @@ class AcademicItem(Item):
     }
 
 
+# Trigram index, so `ILIKE '%...%'` (e.g. in NQL) does not need a sequential scan (requires `pg_trgm` extension)
+Index('ix_academic_item_title_trgm', AcademicItem.title, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+# Full-text index for `websearch_to_tsquery` queries (e.g. in NQL)
+Index('ix_academic_item_title_tsv', ts_document(AcademicItem.title), postgresql_using='gin')
+
+
 class AcademicItemVariant(Base):
     """
     This Class/Table mostly mirrors `AcademicItem`, please refer to that definition for additional comments.
@@ -1,8 +1,9 @@
 import uuid
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import String, ForeignKey, Enum as SAEnum, DateTime
+from sqlalchemy import String, ForeignKey, Enum as SAEnum, DateTime, Index, func, literal_column
 from sqlalchemy.orm import relationship, mapped_column, Mapped
+from sqlalchemy.sql.functions import Function
 from sqlalchemy.dialects.postgresql import UUID
 
 from ...base_class import Base
@@ -14,6 +15,17 @@ if TYPE_CHECKING:
     from ..annotations import Annotation, Assignment
     from ..enhancements import Enhancement
 
+# Text search configuration for full-text indices and queries
+TS_CONFIG = 'english'
+
+
+def ts_document(column: Any) -> Function[Any]:
+    """
+    Text search vector of `column` as used by the full-text (GIN) indices.
+    Queries have to use exactly this expression for postgres to use the index, hence literals instead of bind parameters.
+    """
+    return func.to_tsvector(literal_column(f"'{TS_CONFIG}'"), func.coalesce(column, literal_column("''")))
+
 
 class Item(Base):
     """
@@ -58,3 +70,9 @@ class Item(Base):
         'polymorphic_identity': 'item',
         'polymorphic_on': 'type',
     }
+
+
+# Trigram index, so `ILIKE '%...%'` (e.g. in NQL) does not need a sequential scan (requires `pg_trgm` extension)
+Index('ix_item_text_trgm', Item.text, postgresql_using='gin', postgresql_ops={'text': 'gin_trgm_ops'})
+# Full-text index for `websearch_to_tsquery` queries (e.g. in NQL)
+Index('ix_item_text_tsv', ts_document(Item.text), postgresql_using='gin')
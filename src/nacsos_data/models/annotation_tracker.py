@@ -47,6 +47,8 @@ class AnnotationTrackerModel(DehydratedAnnotationTracker):
     recall: list[float | None] | None = None
     # list[tuple[int, float]] of the BUSCAR metric (stopping criterion)
     buscar: H0Series | None = None
+    # BUSCAR parameters (n_items_total, recall_target, bias) the `buscar` series was computed with
+    buscar_params: dict[str, float] | None = None
     buscar_frontier: list[tuple[float, float]] | None = None
     # Date and time when this tracker was created (or last updated)
     time_created: datetime | None = None
@@ -90,6 +90,19 @@ class M2MImportItemType(str, Enum):
     implicit = 'implicit'
 
 
+class ImportCheckpoint(BaseModel):
+    # Last completed phase of the import
+    phase: Literal['created', 'buffered', 'm2m', 'items']
+    # Number of items (raw count) from the source
+    num_new_items: int | None = None
+    # Number of items in the buffer of unknown items (persisted next to the checkpoint)
+    n_unknown_items: int | None = None
+    # Number of buffered items that were imported and committed so far
+    n_processed: int = 0
+    # Number of items detected as duplicate so far
+    num_updated: int = 0
+
+
 class ImportRevisionModel(BaseModel):
     # Unique identifier for this import revision
     import_revision_id: UUID | str | None = None
@@ -112,3 +125,5 @@ class ImportRevisionModel(BaseModel):
     num_items_updated: int | None = None
     # Number of items in last revision but not in this one
     num_items_removed: int | None = None
+    # Progress of an unfinished import, None once the import is complete
+    checkpoint: ImportCheckpoint | None = None
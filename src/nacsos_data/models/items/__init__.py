@@ -1,5 +1,8 @@
+from datetime import datetime
 from typing import TypeVar, Union, NamedTuple
 
+from pydantic import BaseModel
+
 from .generic import GenericItemModel
 from .twitter import TwitterItemModel
 from .academic import AcademicItemModel, AcademicItemVariantModel
@@ -11,6 +14,22 @@ class ItemEntry(NamedTuple):
     text: str
 
 
+class ItemIndexFingerprint(BaseModel):
+    """
+    State of the items in a project a persisted duplicate detection index was built for.
+    If this differs from the current state, the index is outdated.
+    """
+
+    # Number of items in the project (drops when items are deleted, e.g. via `delete_import`)
+    num_items: int
+    # Most recent `Item.time_edited` in the project (changes when items are edited manually)
+    time_edited: datetime | None = None
+    # Order-independent checksum over all `Item.item_id`s (changes when items are deleted and others added)
+    item_checksum: int | None = None
+    # Items with shorter texts are not in the index
+    min_text_len: int
+
+
 AnyItemModel = Union[TwitterItemModel, AcademicItemModel, LexisNexisItemModel, FullLexisNexisItemModel, GenericItemModel]
 AnyItemModelList = list[TwitterItemModel] | list[AcademicItemModel] | list[LexisNexisItemModel] | list[FullLexisNexisItemModel] | list[GenericItemModel]
 AnyItemModelType = TypeVar('AnyItemModelType', GenericItemModel, TwitterItemModel, AcademicItemModel, LexisNexisItemModel, FullLexisNexisItemModel)
@@ -27,4 +46,5 @@ __all__ = [
     'AnyItemModelType',
     'AnyItemModelList',
     'ItemEntry',
+    'ItemIndexFingerprint',
 ]
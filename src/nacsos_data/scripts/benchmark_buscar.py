@@ -0,0 +1,67 @@
+"""
+Benchmark for the BUSCAR stopping criterion: scipy vs. log-space evaluation of the hypergeometric cdf (`H0Method`)
+and sequential vs. multi-process `retrospective_h0()` / `recall_frontier()`.
+
+Runs without a database; creates a synthetic prioritised screening sequence of `--n-seen` labels
+(relevant documents become rarer the further down the ranking) in a corpus of `--n-docs` documents.
+
+Usage:
+  python -m nacsos_data.scripts.benchmark_buscar --n-docs 100000 --n-seen 20000 --processes 4
+"""
+
+import random
+from time import perf_counter
+from typing import Annotated
+
+import typer
+
+from nacsos_data.util.annotations.evaluation.buscar import BuscarEstimator, recall_frontier, retrospective_h0
+
+app = typer.Typer()
+
+
+def _labels(n_seen: int, n_docs: int, prevalence: float, seed: int) -> list[int]:
+    rng = random.Random(seed)
+    # Probability of the next document being relevant decays along the ranking
+    return [int(rng.random() < min(1.0, 5 * prevalence * (1 - i / n_docs) ** 8)) for i in range(n_seen)]
+
+
+@app.command()
+def main(
+    n_docs: Annotated[int, typer.Option(help='Number of documents in the corpus')] = 100_000,
+    n_seen: Annotated[int, typer.Option(help='Number of screened documents')] = 20_000,
+    prevalence: Annotated[float, typer.Option(help='Proportion of relevant documents in the corpus')] = 0.02,
+    batch_size: Annotated[int, typer.Option(help='Compute the p-score after this many documents')] = 1000,
+    recall_target: Annotated[float, typer.Option(help='Recall target')] = 0.95,
+    processes: Annotated[int, typer.Option(help='Number of worker processes for the multi-process mode')] = 4,
+    seed: Annotated[int, typer.Option(help='Random seed')] = 42,
+) -> None:
+    labels = _labels(n_seen, n_docs=n_docs, prevalence=prevalence, seed=seed)
+    print(f'{sum(labels):,} relevant documents in {n_seen:,} screened documents')
+
+    results = {}
+    for method in ['scipy', 'logsum']:
+        estimator = BuscarEstimator(n_docs=n_docs, recall_target=recall_target, labels=labels, method=method)  # type: ignore[arg-type]
+        start = perf_counter()
+        results[method] = [estimator.h0(n) for n in range(batch_size, n_seen + 1, batch_size)]
+        print(f'{method:<8} {perf_counter() - start:>8.3f}s')
+
+    diffs = [abs(a - b) for a, b in zip(results['scipy'], results['logsum'], strict=True) if a is not None and b is not None]
+    same_none = all((a is None) == (b is None) for a, b in zip(results['scipy'], results['logsum'], strict=True))
+    print(f'max. abs. difference: {max(diffs, default=0.0):.3g}, same undefined scores: {same_none}')
+
+    for name, func in [
+        ('retrospective_h0', lambda procs: retrospective_h0(labels, n_docs, recall_target=recall_target, batch_size=batch_size, processes=procs)),
+        ('recall_frontier', lambda procs: recall_frontier(labels, n_docs, processes=procs)),
+    ]:
+        start = perf_counter()
+        sequential = func(None)
+        t_sequential = perf_counter() - start
+        start = perf_counter()
+        parallel = func(processes)
+        t_parallel = perf_counter() - start
+        print(f'{name:<18} sequential: {t_sequential:.3f}s, {processes} processes: {t_parallel:.3f}s, same: {sequential == parallel}')
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,129 @@
+"""
+Benchmark for `compute_irr_scores()`: pairwise loops vs. the tensor engine (contingency tables for all pairs at once).
+
+Runs without a database; creates a synthetic scope with `--n-items` items, each annotated by a random subset of
+`--n-users` users for a bool, a single-choice, and a multi-choice label, and compares run times and scores of both engines.
+
+Usage:
+  python -m nacsos_data.scripts.benchmark_irr --n-users 40 --n-items 2000
+"""
+
+import math
+import random
+from time import perf_counter
+from typing import Annotated
+
+import typer
+
+from nacsos_data.models.annotations import FlatLabel, FlatLabelChoice
+from nacsos_data.util.annotations.evaluation.irr import AnnotationMap, irr_scores_from_annotations
+from nacsos_data.util.annotations.label_transform import SortedAnnotationLabel
+
+app = typer.Typer()
+
+METRICS = [
+    'cohen',
+    'fleiss',
+    'randolph',
+    'krippendorff',
+    'pearson',
+    'pearson_p',
+    'kendall',
+    'kendall_p',
+    'spearman',
+    'spearman_p',
+    'precision',
+    'recall',
+    'f1',
+    'multi_overlap_mean',
+    'multi_overlap_median',
+    'multi_overlap_std',
+    'num_overlap',
+    'num_agree',
+    'num_disagree',
+    'perc_agree',
+]
+
+
+def _labels(n_choices: int) -> list[FlatLabel]:
+    choices = [FlatLabelChoice(name=f'choice {ci}', value=ci) for ci in range(n_choices)]
+    return [
+        FlatLabel(
+            path=[], repeat=1, path_key=f'{key}|1', name=key, key=key, required=True, max_repeat=1, kind=kind, choices=None if kind == 'bool' else choices
+        )
+        for key, kind in [('relevant', 'bool'), ('topic', 'single'), ('tags', 'multi')]
+    ]
+
+
+def _annotation_map(n_users: int, n_items: int, users_per_item: int, n_choices: int, seed: int) -> tuple[AnnotationMap, list[str], list[str]]:
+    rng = random.Random(seed)
+    users = [f'user{ui:02d}' for ui in range(n_users)]
+    items = [f'item{ii}' for ii in range(n_items)]
+    annotation_map: AnnotationMap = {}
+    for item in items:
+        # Annotators mostly agree with some "true" label of the item
+        relevant = rng.random() < 0.3
+        topic = rng.randrange(n_choices)
+        tags = rng.sample(range(n_choices), k=rng.randint(1, 3))
+        annotation_map[item] = {
+            user: {
+                'relevant': SortedAnnotationLabel.model_construct(value_bool=relevant if rng.random() < 0.85 else not relevant),
+                'topic': SortedAnnotationLabel.model_construct(value_int=topic if rng.random() < 0.7 else rng.randrange(n_choices)),
+                'tags': SortedAnnotationLabel.model_construct(multis=[tags if rng.random() < 0.6 else rng.sample(range(n_choices), k=rng.randint(1, 3))]),
+            }
+            for user in rng.sample(users, k=users_per_item)
+        }
+    return annotation_map, users, items
+
+
+def _max_difference(expected: list[float | None], actual: list[float | None]) -> float:
+    diff = 0.0
+    for ev, av in zip(expected, actual, strict=True):
+        if (ev is None) != (av is None):
+            return math.inf
+        if ev is not None and av is not None:
+            diff = max(diff, abs(ev - av))
+    return diff
+
+
+@app.command()
+def main(
+    n_users: Annotated[int, typer.Option(help='Number of annotators in the scope')] = 40,
+    n_items: Annotated[int, typer.Option(help='Number of items in the scope')] = 2000,
+    users_per_item: Annotated[int, typer.Option(help='Number of annotators per item')] = 6,
+    n_choices: Annotated[int, typer.Option(help='Number of choices of the single- and multi-choice label')] = 5,
+    seed: Annotated[int, typer.Option(help='Random seed')] = 42,
+) -> None:
+    labels = _labels(n_choices)
+    annotation_map, users, items = _annotation_map(n_users, n_items=n_items, users_per_item=users_per_item, n_choices=n_choices, seed=seed)
+
+    results = {}
+    timings = {}
+    for engine in ['pairwise', 'tensor']:
+        start = perf_counter()
+        results[engine] = irr_scores_from_annotations(
+            labels=labels,
+            annotation_map=annotation_map,
+            annotators=users,
+            item_order=items,
+            assignment_scope_id='benchmark',
+            engine=engine,  # type: ignore[arg-type]
+        )
+        timings[engine] = perf_counter() - start
+    print(f'pairwise: {timings["pairwise"]:.2f}s, tensor: {timings["tensor"]:.2f}s ({timings["pairwise"] / timings["tensor"]:.1f}x)')
+
+    expected, actual = results['pairwise'], results['tensor']
+    same_rows = [(q.label_key, q.label_value, q.user_base, q.user_target) for q in expected] == [
+        (q.label_key, q.label_value, q.user_base, q.user_target) for q in actual
+    ]
+    print(f'{len(expected):,} scores, same rows: {same_rows}')
+    if not same_rows:
+        return
+    print(f'{"metric":<22} {"max. abs. difference":>20}')
+    for metric in METRICS:
+        diff = _max_difference([getattr(q, metric) for q in expected], [getattr(q, metric) for q in actual])
+        print(f'{metric:<22} {diff:>20.3g}')
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,81 @@
+"""
+Benchmark for `annotations_to_sequence()`: per-annotation tree walk vs. compiled (vectorised) rule evaluation.
+
+Runs without a database; creates a synthetic scope with `--n-annotations` annotation rows (`SortedAnnotation`),
+each with values for a random subset of `--n-keys` label keys, and evaluates rules of different complexity.
+
+Usage:
+  python -m nacsos_data.scripts.benchmark_label_transform --n-annotations 100000 --n-keys 30
+"""
+
+import uuid
+import random
+import statistics
+from time import perf_counter
+from typing import Annotated, Callable
+
+import typer
+
+from nacsos_data.util.annotations.label_transform import SortedAnnotation, SortedAnnotationLabel, annotations_to_sequence
+
+app = typer.Typer()
+
+
+def _annotations(n_annotations: int, n_keys: int, keys_per_annotation: int, seed: int) -> list[SortedAnnotation]:
+    rng = random.Random(seed)
+    keys = [f'key{ki}' for ki in range(n_keys)]
+    source_id = uuid.uuid4()
+    return [
+        SortedAnnotation.model_construct(
+            source_order=1,
+            source_id=source_id,
+            user_id='resolved',
+            source_type='R',
+            item_order=ai,
+            item_id=uuid.uuid4(),
+            labels={
+                key: SortedAnnotationLabel.model_construct(value_int=rng.randint(0, 4), value_bool=rng.random() < 0.5)
+                for key in rng.sample(keys, k=keys_per_annotation)
+            },
+        )
+        for ai in range(n_annotations)
+    ]
+
+
+def _time(func: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return statistics.median(timings)
+
+
+@app.command()
+def main(
+    n_annotations: Annotated[int, typer.Option(help='Number of synthetic annotation rows')] = 100_000,
+    n_keys: Annotated[int, typer.Option(help='Number of distinct label keys')] = 30,
+    keys_per_annotation: Annotated[int, typer.Option(help='Number of label keys with a value per annotation row')] = 10,
+    repeats: Annotated[int, typer.Option(help='Number of runs per rule (median is reported)')] = 5,
+    seed: Annotated[int, typer.Option(help='Random seed')] = 42,
+) -> None:
+    annotations = _annotations(n_annotations, n_keys=n_keys, keys_per_annotation=keys_per_annotation, seed=seed)
+    rules = [
+        'key0 = 1',
+        'key0 = true | key1 > 2',
+        "(key0 = 1 AND 'key1' >= 2) OR NOT (key2 != 3 | key3 = false)",
+        ' OR '.join(f'(key{ki} = true AND key{(ki + 1) % n_keys} <= 2)' for ki in range(n_keys)),
+    ]
+
+    print(f'{"rule":<60} {"walk [s]":>10} {"compiled [s]":>13} {"speedup":>8} {"same":>5}')
+    for rule in rules:
+        expected = annotations_to_sequence(rule, annotations, compiled=False)
+        same = annotations_to_sequence(rule, annotations, compiled=True) == expected
+        t_walk = _time(lambda: annotations_to_sequence(rule, annotations, compiled=False), repeats=repeats)  # noqa: B023
+        t_compiled = _time(lambda: annotations_to_sequence(rule, annotations, compiled=True), repeats=repeats)  # noqa: B023
+        label = rule if len(rule) <= 60 else f'{rule[:57]}...'
+        print(f'{label:<60} {t_walk:>10.3f} {t_compiled:>13.3f} {t_walk / t_compiled:>7.1f}x {str(same):>5}')
+
+
+if __name__ == '__main__':
+    app()
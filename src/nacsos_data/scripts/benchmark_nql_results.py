@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for turning NQL results into models: per-row validation vs. bulk validation vs. construction without validation,
+as well as plain column tuples converted to an arrow record batch.
+
+Runs without a database; rows are transient `AcademicItem` objects with realistic field sizes (authors, keywords, abstract).
+
+Usage:
+  python -m nacsos_data.scripts.benchmark_nql_results --n-rows 20 --n-rows 1000 --n-rows 10000
+"""
+
+import uuid
+import random
+import string
+import statistics
+from time import perf_counter
+from typing import Annotated, Any, Callable
+
+import typer
+
+from nacsos_data.db.schemas import AcademicItem, ItemType
+from nacsos_data.util.nql import NQLQuery, TransformMode, rows_to_record_batch
+
+app = typer.Typer()
+
+MODES: list[TransformMode] = ['validate', 'bulk', 'construct']
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(n))
+
+
+def _rows(project_id: str, n_rows: int, seed: int) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            'AcademicItem': AcademicItem(
+                item_id=uuid.uuid4(),
+                project_id=project_id,
+                type=ItemType.academic,
+                text=_words(rng, 200),
+                title=_words(rng, 12),
+                doi=f'10.{rng.randint(1000, 9999)}/{uuid.uuid4().hex[:8]}',
+                openalex_id=f'W{rng.randint(10**9, 10**10)}',
+                publication_year=rng.randint(1990, 2025),
+                source=_words(rng, 3),
+                keywords=_words(rng, 5).split(),
+                authors=[
+                    {'name': _words(rng, 2), 'orcid': None, 'affiliations': [{'name': _words(rng, 4), 'country': 'DE'}]} for _ in range(rng.randint(1, 8))
+                ],
+                meta={'openalex': {'cited_by_count': rng.randint(0, 500)}},
+            )
+        }
+        for _ in range(n_rows)
+    ]
+
+
+def _time(func: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return statistics.median(timings)
+
+
+@app.command()
+def main(
+    n_rows: Annotated[list[int] | None, typer.Option(help='Page sizes to benchmark')] = None,
+    repeats: Annotated[int, typer.Option(help='Number of runs per mode (median is reported)')] = 7,
+    seed: Annotated[int, typer.Option(help='Random seed for synthetic rows')] = 42,
+) -> None:
+    project_id = str(uuid.uuid4())
+    query = NQLQuery(project_id=project_id, project_type=ItemType.academic)
+
+    print(f'{"rows":>8} {"mode":<10} {"total [ms]":>12} {"per row [µs]":>14}')
+    for n in n_rows or [20, 1000, 10000]:
+        rows = _rows(project_id, n_rows=n, seed=seed)
+
+        for mode in MODES:
+            t_mode = _time(lambda: query._transform_results(rows, transform=mode), repeats=repeats)  # type: ignore[arg-type] # noqa: B023
+            print(f'{n:>8} {mode:<10} {t_mode * 1000:>12.2f} {t_mode * 1e6 / n:>14.2f}')
+
+        # Equivalent of `NQLQuery.results_raw()` (columns in model order) followed by the arrow conversion
+        fields, _ = query._raw_stmt(query.stmt)
+        tuples = [tuple(getattr(row['AcademicItem'], field) for field in fields) for row in rows]
+        t_arrow = _time(lambda: rows_to_record_batch(fields, tuples), repeats=repeats)  # noqa: B023
+        print(f'{n:>8} {"arrow":<10} {t_arrow * 1000:>12.2f} {t_arrow * 1e6 / n:>14.2f}')
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,132 @@
+"""
+Benchmark for free-text NQL filters: `ILIKE` (optionally trigram-accelerated) vs. full-text search.
+
+Creates a synthetic academic project with `--n-items` items (word frequencies follow a skewed distribution),
+runs title/abstract filters for terms of different frequencies in both search modes and reports median run times.
+
+Requires the indices from migration `7e2f4a9c1b03` (text search indices) to be in place, otherwise both modes use sequential scans.
+
+Usage:
+  python -m nacsos_data.scripts.benchmark_nql_search --config path/to/config.env --n-items 1000000
+"""
+
+import uuid
+import random
+import string
+import statistics
+from time import perf_counter
+from typing import Annotated, Callable
+
+import typer
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from nacsos_data.db.connection import get_engine
+from nacsos_data.db.schemas import Project, ItemType
+from nacsos_data.models.nql import FieldFilter
+from nacsos_data.util import get_logger
+from nacsos_data.util.nql import NQLQuery, SearchMode
+
+logger = get_logger('nacsos_data.benchmark.nql_search')
+
+app = typer.Typer()
+
+MODES: list[SearchMode] = ['like', 'fts']
+
+
+def _vocabulary(size: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    words: set[str] = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    return sorted(words)
+
+
+def _create_project(session: Session, n_items: int, vocabulary: list[str], words_per_item: int) -> str:
+    project_id = str(uuid.uuid4())
+    session.add(Project(project_id=project_id, name=f'benchmark-nql-search-{project_id}', type=ItemType.academic))
+    session.flush()
+
+    # Word ranks are drawn as `floor(n * random()^3)`, so low ranks are (much) more frequent than high ranks.
+    # The reference to `g` in the inner query prevents postgres from evaluating it only once.
+    session.execute(
+        sa.text("""
+            INSERT INTO item (item_id, project_id, text, type)
+            SELECT gen_random_uuid(),
+                   CAST(:project_id AS uuid),
+                   (SELECT string_agg((CAST(:vocabulary AS text[]))[1 + floor(:n_words * power(random(), 3))::int], ' ')
+                    FROM generate_series(1, :words_per_item + 0 * g)),
+                   'academic'
+            FROM generate_series(1, :n_items) g;
+        """),
+        {'project_id': project_id, 'vocabulary': vocabulary, 'n_words': len(vocabulary), 'words_per_item': words_per_item, 'n_items': n_items},
+    )
+    session.execute(
+        sa.text("""
+            INSERT INTO academic_item (item_id, project_id, title, title_slug)
+            SELECT item_id, project_id, split_part(text, ' ', 1) || ' ' || split_part(text, ' ', 7) || ' ' || split_part(text, ' ', 13), NULL
+            FROM item
+            WHERE project_id = CAST(:project_id AS uuid);
+        """),
+        {'project_id': project_id},
+    )
+    session.commit()
+    session.execute(sa.text('ANALYZE item;'))
+    session.execute(sa.text('ANALYZE academic_item;'))
+    return project_id
+
+
+def _time(func: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return statistics.median(timings)
+
+
+@app.command()
+def main(
+    config: Annotated[str, typer.Option(help='Path to config file with database settings')],
+    n_items: Annotated[int, typer.Option(help='Number of synthetic items')] = 1_000_000,
+    vocabulary_size: Annotated[int, typer.Option(help='Number of distinct words')] = 20_000,
+    words_per_item: Annotated[int, typer.Option(help='Number of words per abstract')] = 150,
+    repeats: Annotated[int, typer.Option(help='Number of runs per query (median is reported)')] = 5,
+    keep: Annotated[bool, typer.Option(help='Keep the synthetic project afterwards')] = False,
+    project_id: Annotated[str | None, typer.Option(help='Re-use synthetic project kept from an earlier run')] = None,
+    seed: Annotated[int, typer.Option(help='Random seed for the vocabulary')] = 42,
+) -> None:
+    engine = get_engine(conf_file=config)
+    vocabulary = _vocabulary(vocabulary_size, seed=seed)
+
+    # Frequent, medium, and rare terms as well as a phrase
+    terms = [vocabulary[0], vocabulary[vocabulary_size // 100], vocabulary[vocabulary_size // 2], f'"{vocabulary[0]} {vocabulary[1]}"']
+
+    with engine.session() as session:
+        if project_id is None:
+            logger.info(f'Creating synthetic project with {n_items:,} items...')
+            start = perf_counter()
+            project_id = _create_project(session, n_items=n_items, vocabulary=vocabulary, words_per_item=words_per_item)
+            logger.info(f'Created project {project_id} in {perf_counter() - start:.1f}s')
+
+        try:
+            print(f'{"field":<10} {"term":<25} {"mode":<6} {"count":>10} {"count [s]":>10} {"page [s]":>10}')
+            for field in ['abstract', 'title']:
+                for term in terms:
+                    for mode in MODES:
+                        # Phrases only make sense in websearch syntax
+                        value = term.strip('"') if mode == 'like' else term
+                        query = NQLQuery(project_id=project_id, query=FieldFilter(field=field, value=value), search_mode=mode)
+                        count = query.count(session, use_cache=False)
+                        t_count = _time(lambda: query.count(session, use_cache=False), repeats=repeats)  # noqa: B023
+                        t_page = _time(lambda: query.results_page(session, limit=20), repeats=repeats)  # noqa: B023
+                        print(f'{field:<10} {term:<25} {mode:<6} {count:>10,} {t_count:>10.3f} {t_page:>10.3f}')
+        finally:
+            if not keep:
+                logger.info(f'Deleting synthetic project {project_id}...')
+                session.execute(sa.delete(Project).where(Project.project_id == project_id))
+                session.commit()
+
+
+if __name__ == '__main__':
+    app()
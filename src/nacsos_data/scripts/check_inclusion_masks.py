@@ -0,0 +1,117 @@
+"""
+Checks that the compiled (numpy) evaluation of inclusion rules in `get_inclusion_mask()` returns the same masks
+as the pandas implementation, including missing values.
+
+Runs without a database on random export-like frames (numpy `float64` or nullable `Int8` label columns with missing values,
+resolutions for some labels) and random rules using all column operators of the grammar on columns in the frame.
+
+Usage:
+  python -m nacsos_data.scripts.check_inclusion_masks --n-frames 1500 --n-rules 20
+"""
+
+import random
+from typing import Annotated, Any
+
+import typer
+import numpy as np
+import pandas as pd
+
+from nacsos_data.util import get_logger
+from nacsos_data.util.priority.mask import get_inclusion_mask
+
+logger = get_logger('nacsos_data.check.inclusion_masks')
+
+app = typer.Typer()
+
+LABELS = ['a:0', 'a:1', 'b:0', 'b:1']
+USERS = ['u1', 'u2', 'u3']
+
+# Negations use `~`, because a leading `-` can also be parsed as part of the user or label name
+SRC_OPS = ['{col}', '{col}!', '{col}?', '~{col}', '~{col}!', '~{col}?']
+ANYSRC_OPS = ['{lab}', '{lab}*', '{lab}!*', '~{lab}', '~{lab}*', '~{lab}!*', '/{lab}', '~/{lab}']
+
+
+def _frame(n_rows: int, dtype: str, rng: random.Random) -> pd.DataFrame:
+    columns: dict[str, Any] = {}
+    for label in LABELS:
+        for user in ['res', *USERS]:
+            if rng.random() < 0.25:
+                continue
+            p_missing = rng.choice([0.0, 0.3, 0.7, 1.0])
+            columns[f'{user}|{label}'] = [np.nan if rng.random() < p_missing else rng.choice([0, 1]) for _ in range(n_rows)]
+    return pd.DataFrame(columns, dtype=dtype)
+
+
+def _column(columns: list[str], rng: random.Random) -> str:
+    # Only columns in the frame (with `ignore_missing`, the pandas implementation returns a plain `False` or fails)
+    col = rng.choice(columns)
+    if rng.random() < 0.5:
+        return rng.choice(SRC_OPS).format(col=col)
+    return rng.choice(ANYSRC_OPS).format(lab=col.split('|')[1])
+
+
+def _rule(columns: list[str], depth: int, rng: random.Random) -> str:
+    if depth == 0 or rng.random() < 0.3:
+        cols = [_column(columns, rng) for _ in range(rng.randint(1, 3))]
+        fmt = rng.choice(['{}', 'OR[{}]', 'AND[{}]'])
+        return fmt.format(rng.choice([' ', ',']).join(cols))
+    left, right = _rule(columns, depth - 1, rng), _rule(columns, depth - 1, rng)
+    return f'({left}) {rng.choice(["&", "|", "AND", "OR"])} ({right})'
+
+
+def _as_mask(mask: Any, index: pd.Index) -> 'pd.Series[bool]':
+    if not isinstance(mask, pd.Series):
+        # `oring([])`/`anding([])` return a plain `False`
+        mask = pd.Series(mask, index=index)
+    return mask.astype('boolean')
+
+
+def _fmt(mask: 'pd.Series[bool] | str') -> str:
+    return mask if isinstance(mask, str) else str(mask.tolist())
+
+
+@app.command()
+def main(
+    n_frames: Annotated[int, typer.Option(help='Number of random frames')] = 500,
+    n_rows: Annotated[int, typer.Option(help='Number of rows per frame')] = 20,
+    n_rules: Annotated[int, typer.Option(help='Number of random rules per frame')] = 10,
+    depth: Annotated[int, typer.Option(help='Maximum nesting of AND/OR clauses in rules')] = 2,
+    seed: Annotated[int, typer.Option(help='Random seed')] = 42,
+) -> None:
+    rng = random.Random(seed)
+    n_differences = 0
+    n_frames_differing = 0
+    n_compared = 0
+    for i in range(n_frames):
+        df = _frame(n_rows=n_rows, dtype=rng.choice(['float64', 'Int8']), rng=rng)
+        if len(df.columns) == 0:
+            continue
+        differing = False
+        n_compared += n_rules
+        for _ in range(n_rules):
+            rule = _rule(columns=list(df.columns), depth=depth, rng=rng)
+            results = []
+            for compiled in [False, True]:
+                try:
+                    results.append(_as_mask(get_inclusion_mask(rule=rule, df=df, compiled=compiled), df.index))
+                except Exception as e:
+                    results.append(repr(e))
+            expected, actual = results
+            if isinstance(expected, str) or isinstance(actual, str):
+                same = isinstance(expected, str) and isinstance(actual, str) and expected == actual
+            else:
+                same = expected.isna().equals(actual.isna()) and expected.fillna(False).equals(actual.fillna(False))
+            if not same:
+                n_differences += 1
+                differing = True
+                if n_differences <= 20:
+                    logger.error(f'Frame {i} ({df.dtypes.iloc[0]}), rule `{rule}`: {_fmt(expected)} vs {_fmt(actual)}')
+        n_frames_differing += differing
+
+    logger.info(f'Compared {n_compared:,} rules on {n_frames:,} frames, found {n_differences} differences in {n_frames_differing} frames.')
+    if n_differences > 0:
+        raise typer.Exit(code=1)
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,321 @@
+"""
+Checks that the 'flat' NQL compiler returns the same items as the 'cte' compiler.
+
+Creates a small synthetic academic and generic project (items, imports, assignments, annotations, bot annotations),
+runs every filter type (field/import/assignment/annotation/label/meta) on its own, negated, and in random nested AND/OR/NOT trees
+with both compilers and reports queries with differing results. The projects are deleted afterwards.
+
+Usage:
+  python -m nacsos_data.scripts.check_nql_compilers --config path/to/config.env --n-trees 500
+"""
+
+import uuid
+import random
+from typing import Annotated
+
+import typer
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from nacsos_data.db.connection import get_engine
+from nacsos_data.db.schemas import (
+    AcademicItem,
+    Annotation,
+    AnnotationScheme,
+    Assignment,
+    AssignmentScope,
+    BotAnnotation,
+    BotAnnotationMetaData,
+    GenericItem,
+    Import,
+    ItemType,
+    Project,
+    User,
+    m2m_import_item_table,
+)
+from nacsos_data.db.schemas.imports import ImportRevision
+from nacsos_data.models.bot_annotations import BotKind
+from nacsos_data.models.nql import (
+    AbstractFilter,
+    AnnotationFilter,
+    AssignmentFilter,
+    FieldFilter,
+    FieldFilters,
+    IEUUID,
+    ImportFilter,
+    LabelFilterBool,
+    LabelFilterInt,
+    LabelFilterMulti,
+    MetaFilterBool,
+    MetaFilterInt,
+    MetaFilterStr,
+    NQLFilter,
+    SubQuery,
+    UsersFilter,
+)
+from nacsos_data.util import get_logger
+from nacsos_data.util.nql import NQLQuery, NQLCompiler
+
+logger = get_logger('nacsos_data.check.nql_compilers')
+
+app = typer.Typer()
+
+WORDS = ['climate', 'carbon', 'policy', 'forest', 'ocean', 'energy', 'health', 'urban']
+
+
+class Fixture:
+    def __init__(self, session: Session, n_items: int, rng: random.Random):
+        self.session = session
+        self.rng = rng
+        tag = uuid.uuid4().hex[:8]
+
+        self.users = [
+            User(user_id=uuid.uuid4(), username=f'check-nql-{tag}-{ui}', email=f'check-nql-{tag}-{ui}@nacsos', full_name='NQL check') for ui in range(2)
+        ]
+        self.academic = Project(project_id=uuid.uuid4(), name=f'check-nql-academic-{tag}', type=ItemType.academic)
+        self.generic = Project(project_id=uuid.uuid4(), name=f'check-nql-generic-{tag}', type=ItemType.generic)
+        session.add_all([*self.users, self.academic, self.generic])
+        session.flush()
+
+        self.imports = [
+            Import(import_id=uuid.uuid4(), project_id=self.academic.project_id, name=f'import {ii}', description='', type='script') for ii in range(3)
+        ]
+        self.schemes = [AnnotationScheme(annotation_scheme_id=uuid.uuid4(), project_id=self.academic.project_id, name=f'scheme {si}') for si in range(2)]
+        session.add_all([*self.imports, *self.schemes])
+        session.flush()
+        session.add_all([ImportRevision(import_id=imp.import_id, import_revision_counter=1) for imp in self.imports])
+        self.scopes = [
+            AssignmentScope(assignment_scope_id=uuid.uuid4(), annotation_scheme_id=self.schemes[si].annotation_scheme_id, name=f'scope {si}', description='')
+            for si in [0, 0, 1]
+        ]
+        self.bots = [
+            BotAnnotationMetaData(
+                bot_annotation_metadata_id=uuid.uuid4(),
+                project_id=self.academic.project_id,
+                name=kind,
+                kind=kind,
+                annotation_scheme_id=self.schemes[0].annotation_scheme_id,
+            )
+            for kind in [BotKind.RESOLVE, BotKind.SCRIPT]
+        ]
+        session.add_all([*self.scopes, *self.bots])
+        session.flush()
+
+        self.items = [self._academic_item() for _ in range(n_items)]
+        session.add_all([*self.items, *(self._generic_item() for _ in range(n_items))])
+        session.flush()
+
+        for item in self.items:
+            for imp in rng.sample(self.imports, k=rng.randint(0, 2)):
+                session.execute(sa.insert(m2m_import_item_table).values(import_id=imp.import_id, item_id=item.item_id))
+            for scope in rng.sample(self.scopes, k=rng.choice([0, 0, 1, 2])):
+                self._assignment(item, scope)
+            for bot in self.bots:
+                if rng.random() < 0.5:
+                    session.add(BotAnnotation(bot_annotation_metadata_id=bot.bot_annotation_metadata_id, item_id=item.item_id, **self._values()))
+        session.commit()
+
+    def _text(self) -> str | None:
+        return None if self.rng.random() < 0.2 else ' '.join(self.rng.choices(WORDS, k=self.rng.randint(1, 40)))
+
+    def _academic_item(self) -> AcademicItem:
+        rng = self.rng
+        return AcademicItem(
+            item_id=uuid.uuid4(),
+            project_id=self.academic.project_id,
+            type=ItemType.academic,
+            text=self._text(),
+            title=None if rng.random() < 0.1 else ' '.join(rng.choices(WORDS, k=3)),
+            doi=None if rng.random() < 0.3 else f'10.1/{rng.randint(0, 20)}',
+            openalex_id=f'W{rng.randint(0, 20)}',
+            publication_year=None if rng.random() < 0.2 else rng.randint(2000, 2010),
+            source=rng.choice([None, 'Nature', 'Science', 'Nature Climate Change']),
+        )
+
+    def _generic_item(self) -> GenericItem:
+        rng = self.rng
+        meta = {'flag': rng.choice([True, False]), 'cnt': rng.randint(0, 5), 'tag': rng.choice(WORDS)}
+        return GenericItem(
+            item_id=uuid.uuid4(),
+            project_id=self.generic.project_id,
+            type=ItemType.generic,
+            text=self._text(),
+            meta={key: value for key, value in meta.items() if rng.random() < 0.7},
+        )
+
+    def _values(self) -> dict[str, object]:
+        key = self.rng.choice(['rel', 'cat', 'topics'])
+        if key == 'rel':
+            return {'key': key, 'value_bool': self.rng.choice([True, False])}
+        if key == 'cat':
+            return {'key': key, 'value_int': self.rng.randint(0, 3)}
+        return {'key': key, 'multi_int': self.rng.sample(range(4), k=self.rng.randint(1, 3))}
+
+    def _assignment(self, item: AcademicItem, scope: AssignmentScope) -> None:
+        user = self.rng.choice(self.users)
+        assignment = Assignment(
+            assignment_id=uuid.uuid4(),
+            assignment_scope_id=scope.assignment_scope_id,
+            annotation_scheme_id=scope.annotation_scheme_id,
+            user_id=user.user_id,
+            item_id=item.item_id,
+        )
+        self.session.add(assignment)
+        self.session.flush()
+        for _ in range(self.rng.choice([0, 1, 2, 3])):
+            self.session.add(
+                Annotation(
+                    assignment_id=assignment.assignment_id,
+                    annotation_scheme_id=scope.annotation_scheme_id,
+                    user_id=user.user_id,
+                    item_id=item.item_id,
+                    repeat=self.rng.choice([1, 1, 2]),
+                    **self._values(),
+                )
+            )
+
+    def academic_leaves(self) -> list[NQLFilter]:
+        scopes = [str(scope.assignment_scope_id) for scope in self.scopes]
+        scheme = str(self.schemes[0].annotation_scheme_id)
+        bot = str(self.bots[0].bot_annotation_metadata_id)
+        users = [str(user.user_id) for user in self.users]
+        imports = [str(imp.import_id) for imp in self.imports]
+        leaves: list[NQLFilter] = [
+            FieldFilter(field='title', value='carbon'),
+            FieldFilter(field='abstract', value='policy'),
+            FieldFilter(field='pub_year', value=2005, comp='>='),
+            FieldFilter(field='pub_year', value=2003, comp='!='),
+            FieldFilter(field='source', value='Nature', comp='LIKE'),
+            FieldFilters(field='doi', values=['10.1/1', '10.1/2', '10.1/3']),
+            FieldFilters(field='openalex_id', values=['W4', 'W5']),
+            FieldFilters(field='item_id', values=[str(item.item_id) for item in self.items[:5]]),
+            AbstractFilter(comp='>', size=100),
+            AbstractFilter(empty=True),
+            AbstractFilter(empty=False),
+            ImportFilter(import_ids=[IEUUID(incl=True, uuid=imports[0])]),
+            ImportFilter(import_ids=[IEUUID(incl=False, uuid=imports[1])]),
+            ImportFilter(import_ids=[IEUUID(incl=True, uuid=imports[0]), IEUUID(incl=True, uuid=imports[2]), IEUUID(incl=False, uuid=imports[1])]),
+            AssignmentFilter(mode=1),
+            AssignmentFilter(mode=2, scopes=scopes[:1]),
+            AssignmentFilter(mode=4),
+            AssignmentFilter(mode=5, scopes=scopes[:1]),
+            AssignmentFilter(mode=6, scheme=scheme),
+            AssignmentFilter(mode=7, scheme=scheme),
+            AnnotationFilter(incl=True),
+            AnnotationFilter(incl=False),
+            AnnotationFilter(incl=True, scheme=scheme),
+            AnnotationFilter(incl=False, scheme=scheme),
+            AnnotationFilter(incl=True, scopes=scopes[1:]),
+            AnnotationFilter(incl=False, scopes=scopes[1:]),
+        ]
+        for kind in ['user', 'bot', 'resolved']:
+            restrictions: list[dict[str, object]] = [{}, {'repeats': [2]}, {'scheme': scheme}, {'scopes': [bot] if kind != 'user' else scopes[:2]}]
+            if kind == 'user':
+                restrictions += [{'users': UsersFilter(user_ids=users[:1], mode='ANY')}, {'users': UsersFilter(user_ids=users, mode='ALL')}]
+            for restriction in restrictions:
+                leaves += [
+                    LabelFilterBool(key='rel', type=kind, value_bool=True, **restriction),  # type: ignore[arg-type]
+                    LabelFilterInt(key='cat', type=kind, value_int=1, comp='>=', **restriction),  # type: ignore[arg-type]
+                    LabelFilterMulti(key='topics', type=kind, multi_int=[1, 2], comp='&&', **restriction),  # type: ignore[arg-type]
+                ]
+        leaves += [
+            LabelFilterMulti(key='topics', type='user', multi_int=[1], comp='@>'),
+            LabelFilterMulti(key='topics', type='user', multi_int=[0], comp='!>'),
+            LabelFilterMulti(key='topics', type='bot', multi_int=[0, 1], comp='=='),
+        ]
+        return leaves
+
+    @staticmethod
+    def generic_leaves() -> list[NQLFilter]:
+        return [
+            FieldFilter(field='abstract', value='ocean'),
+            AbstractFilter(comp='<=', size=50),
+            AbstractFilter(empty=True),
+            MetaFilterBool(field='flag', value=True),
+            MetaFilterBool(field='flag', value=False),
+            MetaFilterInt(field='cnt', comp='=', value=2),
+            MetaFilterStr(field='tag', value='an'),
+            AnnotationFilter(incl=False),
+            AssignmentFilter(mode=4),
+        ]
+
+    def delete(self) -> None:
+        project_ids = [self.academic.project_id, self.generic.project_id]
+        item_ids = sa.select(AcademicItem.item_id).where(AcademicItem.project_id.in_(project_ids))
+        self.session.execute(sa.delete(m2m_import_item_table).where(m2m_import_item_table.c.item_id.in_(item_ids)))
+        self.session.execute(sa.delete(ImportRevision).where(ImportRevision.import_id.in_([imp.import_id for imp in self.imports])))
+        self.session.execute(sa.delete(Annotation).where(Annotation.annotation_scheme_id.in_([s.annotation_scheme_id for s in self.schemes])))
+        self.session.execute(sa.delete(Assignment).where(Assignment.annotation_scheme_id.in_([s.annotation_scheme_id for s in self.schemes])))
+        self.session.execute(sa.delete(BotAnnotationMetaData).where(BotAnnotationMetaData.project_id.in_(project_ids)))
+        self.session.execute(sa.delete(AssignmentScope).where(AssignmentScope.annotation_scheme_id.in_([s.annotation_scheme_id for s in self.schemes])))
+        self.session.execute(sa.delete(Project).where(Project.project_id.in_(project_ids)))
+        self.session.execute(sa.delete(User).where(User.user_id.in_([user.user_id for user in self.users])))
+        self.session.commit()
+
+
+def _tree(rng: random.Random, leaves: list[NQLFilter], depth: int) -> NQLFilter:
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(leaves)
+    op = rng.choice(['and_', 'or_', 'not_'])
+    if op == 'not_':
+        return SubQuery(not_=_tree(rng, leaves, depth - 1))
+    children = [_tree(rng, leaves, depth - 1) for _ in range(rng.randint(2, 3))]
+    if rng.random() < 0.3:
+        # Repeated filters are shared between branches in the flat compiler
+        children.append(children[0])
+    return SubQuery(and_=children) if op == 'and_' else SubQuery(or_=children)
+
+
+def _item_ids(session: Session, project: Project, query: NQLFilter, compiler: NQLCompiler, timeout: int) -> set[uuid.UUID] | None:
+    # Large trees can take forever with the cte compiler, those are skipped (None) after `timeout` seconds
+    stmt = NQLQuery(project_id=str(project.project_id), project_type=project.type, query=query, compiler=compiler).stmt.subquery()
+    try:
+        session.execute(sa.text(f'SET LOCAL statement_timeout = {timeout * 1000}'))
+        return set(session.execute(sa.select(stmt.c.item_id)).scalars())
+    except OperationalError:
+        session.rollback()
+        return None
+
+
+@app.command()
+def main(
+    config: Annotated[str, typer.Option(help='Path to config file (database settings)')],
+    n_items: Annotated[int, typer.Option(help='Number of items per synthetic project')] = 200,
+    n_trees: Annotated[int, typer.Option(help='Number of random nested filter trees per project')] = 300,
+    depth: Annotated[int, typer.Option(help='Maximum depth of random filter trees')] = 3,
+    timeout: Annotated[int, typer.Option(help='Skip queries that take longer than this many seconds')] = 30,
+    seed: Annotated[int, typer.Option(help='Random seed')] = 42,
+) -> None:
+    rng = random.Random(seed)
+    db_engine = get_engine(conf_file=config)
+    with db_engine.session() as session:
+        fixture = Fixture(session, n_items=n_items, rng=rng)
+        try:
+            n_checked = 0
+            n_skipped = 0
+            mismatches = []
+            for project, leaves in [(fixture.academic, fixture.academic_leaves()), (fixture.generic, fixture.generic_leaves())]:
+                queries: list[NQLFilter] = [*leaves, *(SubQuery(not_=leaf) for leaf in leaves)]
+                queries += [_tree(rng, leaves, depth) for _ in range(n_trees)]
+                for query in queries:
+                    cte = _item_ids(session, project, query, 'cte', timeout=timeout)
+                    flat = _item_ids(session, project, query, 'flat', timeout=timeout)
+                    if cte is None or flat is None:
+                        n_skipped += 1
+                        logger.warning(f'Skipping query after timeout ({"cte" if cte is None else "flat"}): {query.model_dump_json(exclude_defaults=True)}')
+                        continue
+                    n_checked += 1
+                    if cte != flat:
+                        mismatches.append(query)
+                        logger.error(f'{len(cte)} (cte) vs {len(flat)} (flat) items for {query.model_dump_json(exclude_defaults=True)}')
+            logger.info(f'Checked {n_checked} queries ({n_skipped} skipped after timeout), found {len(mismatches)} with differing results.')
+        finally:
+            fixture.delete()
+
+    if len(mismatches) > 0:
+        raise typer.Exit(code=1)
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,136 @@
+"""
+Checks that the columnar resolution engine (`ColumnarMatrix`) proposes the same resolutions as `naive_majority_vote()`
+on the dict-based `ResolutionMatrix`, including the types of the resolved values (e.g. `int` rather than `float` for single-choice labels).
+
+Runs without a database on a synthetic scope with bool, single, multi, and str labels (some repeated) and
+partially overlapping annotations by several users.
+
+Usage:
+  python -m nacsos_data.scripts.check_resolution_engines --n-items 2000 --seed 1 --seed 2
+"""
+
+import uuid
+import random
+from typing import Annotated, Any
+
+import typer
+
+from nacsos_data.models.annotations import AnnotationSchemeLabelTypes, AssignmentStatus, FlatLabel, ItemAnnotation, Label
+from nacsos_data.models.bot_annotations import AssignmentMap, DehydratedAssignment, OrderingEntry, ResolutionMatrix
+from nacsos_data.util import get_logger
+from nacsos_data.util.annotations.resolve import _empty_matrix, _populate_matrix_annotations
+from nacsos_data.util.annotations.resolve.columnar import VALUE_FIELDS, ColumnarMatrix
+from nacsos_data.util.annotations.resolve.majority_vote import naive_majority_vote
+
+logger = get_logger('nacsos_data.check.resolution_engines')
+
+app = typer.Typer()
+
+LABELS: list[tuple[str, AnnotationSchemeLabelTypes, int]] = [('rel', 'bool', 1), ('cat', 'single', 2), ('topics', 'multi', 1), ('note', 'str', 1)]
+
+
+def _value(rng: random.Random, kind: AnnotationSchemeLabelTypes) -> dict[str, Any]:
+    if rng.random() < 0.1:
+        # Empty annotations are ignored by both engines
+        return {}
+    if kind == 'bool':
+        return {'value_bool': rng.choice([True, False])}
+    if kind == 'single':
+        return {'value_int': rng.choice([0, 1, 10, 11])}
+    if kind == 'multi':
+        return {'multi_int': rng.sample([0, 1, 2, 3], k=rng.randint(0, 3))}
+    return {'value_str': rng.choice(['', 'a', 'bb'])}
+
+
+def _scope(n_items: int, n_users: int, rng: random.Random) -> tuple[list[FlatLabel], AssignmentMap, list[ItemAnnotation], list[OrderingEntry]]:
+    labels = [
+        FlatLabel(
+            path=[Label(key=key, repeat=repeat)], repeat=repeat, path_key=f'{key}-{repeat}', name=key, key=key, required=False, max_repeat=max_repeat, kind=kind
+        )
+        for key, kind, max_repeat in LABELS
+        for repeat in range(1, max_repeat + 1)
+    ]
+    users = [str(uuid.uuid4()) for _ in range(n_users)]
+    scheme_id = str(uuid.uuid4())
+
+    item_order: list[OrderingEntry] = []
+    annotations: list[ItemAnnotation] = []
+    for identifier in range(n_items):
+        item_id = str(uuid.uuid4())
+        assignments = [
+            DehydratedAssignment(assignment_id=str(uuid.uuid4()), user_id=user_id, item_id=item_id, username=user_id, status=AssignmentStatus.FULL, order=0)
+            for user_id in rng.sample(users, k=rng.randint(1, n_users))
+        ]
+        item_order.append(OrderingEntry(identifier=identifier, first_occurrence=identifier, item_id=item_id, assignments=assignments))
+        for assignment in assignments:
+            for label in labels:
+                if rng.random() < 0.3:
+                    continue
+                annotations.append(
+                    ItemAnnotation(
+                        annotation_id=str(uuid.uuid4()),
+                        assignment_id=assignment.assignment_id,
+                        user_id=assignment.user_id,
+                        item_id=item_id,
+                        annotation_scheme_id=scheme_id,
+                        key=label.key,
+                        repeat=label.repeat,
+                        path=label.path,
+                        **_value(rng, label.kind),
+                    )
+                )
+    rng.shuffle(annotations)
+    assignment_map: AssignmentMap = {ass.assignment_id: (ass, entry) for entry in item_order for ass in entry.assignments}
+    return labels, assignment_map, annotations, item_order
+
+
+def _differences(expected: ResolutionMatrix, actual: ResolutionMatrix) -> list[str]:
+    differences = []
+    for item_key, row in expected.items():
+        for path_key, cell in row.items():
+            other = actual[item_key][path_key]
+            if cell.status != other.status:
+                differences.append(f'{item_key}/{path_key}: status {cell.status} vs {other.status}')
+            for field in VALUE_FIELDS:
+                value, other_value = getattr(cell.resolution, field), getattr(other.resolution, field)
+                if field == 'multi_int' and value is not None and other_value is not None:
+                    # Unions of choices come from sets in both engines, so the order is arbitrary
+                    value, other_value = sorted(value), sorted(other_value)
+                    types, other_types = {type(v) for v in value}, {type(v) for v in other_value}
+                else:
+                    types, other_types = {type(value)}, {type(other_value)}
+                if value != other_value or types != other_types:
+                    differences.append(f'{item_key}/{path_key}: {field}={value!r} vs {other_value!r}')
+    return differences
+
+
+@app.command()
+def main(
+    n_items: Annotated[int, typer.Option(help='Number of items in the synthetic scope')] = 1000,
+    n_users: Annotated[int, typer.Option(help='Number of annotators')] = 4,
+    seed: Annotated[list[int] | None, typer.Option(help='Random seeds (one synthetic scope each)')] = None,
+) -> None:
+    n_differences = 0
+    for sd in seed or [42]:
+        labels, assignments, annotations, item_order = _scope(n_items=n_items, n_users=n_users, rng=random.Random(sd))
+        label_map = {label.path_key: label for label in labels}
+
+        expected = _populate_matrix_annotations(_empty_matrix(item_order=item_order, labels=labels), assignments=assignments, annotations=annotations)
+        expected = naive_majority_vote(expected, label_map)
+
+        matrix = ColumnarMatrix(item_order=item_order, labels=labels, assignments=assignments, annotations=annotations)
+        matrix.majority_vote()
+        actual = matrix.to_resolution_matrix()
+
+        differences = _differences(expected, actual)
+        for difference in differences[:20]:
+            logger.error(difference)
+        logger.info(f'Seed {sd}: compared {len(expected) * len(labels):,} cells ({len(annotations):,} annotations), found {len(differences)} differences.')
+        n_differences += len(differences)
+
+    if n_differences > 0:
+        raise typer.Exit(code=1)
+
+
+if __name__ == '__main__':
+    app()
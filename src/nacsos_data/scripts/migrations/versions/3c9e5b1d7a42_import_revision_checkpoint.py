@@ -0,0 +1,24 @@
+"""import revision checkpoint
+
+Revision ID: 3c9e5b1d7a42
+Revises: 088f7577e74c
+Create Date: 2026-10-16 10:12:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5b1d7a42'
+down_revision = '088f7577e74c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_revision', sa.Column('checkpoint', postgresql.JSONB(none_as_null=True, astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('import_revision', 'checkpoint')
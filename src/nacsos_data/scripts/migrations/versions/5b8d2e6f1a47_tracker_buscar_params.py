@@ -0,0 +1,24 @@
+"""tracker buscar params
+
+Revision ID: 5b8d2e6f1a47
+Revises: 7e2f4a9c1b03
+Create Date: 2026-10-16 21:47:09.362815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5b8d2e6f1a47'
+down_revision = '7e2f4a9c1b03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('annotation_tracker', sa.Column('buscar_params', postgresql.JSONB(none_as_null=True, astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('annotation_tracker', 'buscar_params')
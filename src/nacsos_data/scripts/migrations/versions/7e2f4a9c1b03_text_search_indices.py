@@ -0,0 +1,30 @@
+"""text search indices
+
+Revision ID: 7e2f4a9c1b03
+Revises: 3c9e5b1d7a42
+Create Date: 2026-10-16 14:03:27.193845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7e2f4a9c1b03'
+down_revision = '3c9e5b1d7a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    op.create_index('ix_item_text_trgm', 'item', ['text'], unique=False, postgresql_using='gin', postgresql_ops={'text': 'gin_trgm_ops'})
+    op.create_index('ix_academic_item_title_trgm', 'academic_item', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_item_text_tsv', 'item', [sa.text("to_tsvector('english', coalesce(text, ''))")], unique=False, postgresql_using='gin')
+    op.create_index('ix_academic_item_title_tsv', 'academic_item', [sa.text("to_tsvector('english', coalesce(title, ''))")], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_academic_item_title_tsv', table_name='academic_item')
+    op.drop_index('ix_item_text_tsv', table_name='item')
+    op.drop_index('ix_academic_item_title_trgm', table_name='academic_item')
+    op.drop_index('ix_item_text_trgm', table_name='item')
@@ -1,3 +1,4 @@
+import sys
 import logging
 import uuid
 from collections.abc import MutableMapping
@@ -178,6 +179,19 @@ def elapsed_timer(logger: logging.Logger, tn: str = 'Task') -> Generator[Callabl
     logger.debug(f'{tn} took {timedelta(seconds=end - start)} to execute.')
 
 
+def get_peak_rss() -> int:
+    """
+    Peak resident set size (max. physical memory used so far) of this process in bytes; 0 if not available on this platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, but in kilobytes on linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
 def get(obj: Any, *keys: str, default: Any = None) -> Any:
     for key in keys:
         if type(obj) is dict:
@@ -1,11 +1,11 @@
 import logging
 import uuid
-from typing import Any, Generator
+from typing import Any, Generator, AsyncGenerator
 import orjson as json
 from httpx import codes, HTTPError, Response
 from nacsos_data.models.items.academic import AcademicAuthorModel, AcademicItemModel, AffiliationModel
 from nacsos_data.util import get, as_uuid, clear_empty
-from nacsos_data.util.academic.apis.util import RequestClient, AbstractAPI
+from nacsos_data.util.academic.apis.util import RequestClient, AbstractAPI, gather_pages
 
 FIELDS = [  # FIXME: would be nice to activate ALL fields but that leads to a "too many" error (2026-01-14)...
     'abstract',
@@ -146,6 +146,7 @@ class DimensionsAPI(AbstractAPI):
         override_content: bool = False,
         fields: list[str] | None = None,
         logger: logging.Logger | None = None,
+        concurrency: int = 1,
     ):
         super().__init__(
             api_key=api_key,
@@ -154,11 +155,23 @@ class DimensionsAPI(AbstractAPI):
             max_req_per_sec=max_req_per_sec,
             backoff_rate=backoff_rate,
             logger=logger,
+            concurrency=concurrency,
         )
         self.page_size = page_size
         self.fields = fields if fields is not None and len(fields) > 0 else FIELDS
         self.override_content = override_content
 
+    def _page_content(self, query: str, where: str, skip: int) -> str:
+        if self.override_content:
+            return f'{query} sort by id limit {self.page_size} skip {skip} '
+        return (
+            f'search publications '
+            f'in title_abstract_only for "{query.replace("\n", " ").replace('"', '\\"')}" {where} '
+            f'return publications[{"+".join(self.fields)}] '
+            f'sort by id '
+            f'limit {self.page_size} skip {skip} '
+        )
+
     def fetch_raw(
         self,
         query: str,
@@ -219,16 +232,7 @@ class DimensionsAPI(AbstractAPI):
             while True:
                 logger.info(f'Fetching page {n_pages}...')
                 try:
-                    if self.override_content:
-                        content = f'{query} sort by id limit {self.page_size} skip {n_pages * self.page_size} '
-                    else:
-                        content = (
-                            f'search publications '
-                            f'in title_abstract_only for "{query.replace("\n", " ").replace('"', '\\"')}" {where} '
-                            f'return publications[{"+".join(self.fields)}] '
-                            f'sort by id '
-                            f'limit {self.page_size} skip {n_pages * self.page_size} '
-                        )
+                    content = self._page_content(query, where=where, skip=n_pages * self.page_size)
                     logger.debug(f'Query: {content}')
                     page = request_client.post(
                         url='https://app.dimensions.ai/api/dsl/v2',
@@ -256,6 +260,61 @@ class DimensionsAPI(AbstractAPI):
                     logging.exception(e)
                     raise e
 
+    async def fetch_raw_async(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        Same as `fetch_raw()`, but retrieves up to `concurrency` pages at once.
+        The first page is requested on its own to get the JWT and total number of results.
+        """
+        if self.api_key is None:
+            raise AssertionError('Missing API key!')
+
+        async with self.request_client_async(timeout=120) as request_client:
+            headers = {
+                'Accept': 'application/json',
+                'Authorization': f'JWT {(params or {}).get("jwt", "empty")}',
+            }
+            api_key = self.api_key
+
+            async def update_jwt(response: Response) -> dict[str, dict[str, str]]:
+                self.logger.debug('Fetching JWT token')
+                res = await request_client.post('https://app.dimensions.ai/api/auth.json', json={'key': api_key})
+                res.raise_for_status()
+                token = res.json()['token']
+                self.api_feedback['jwt'] = token
+                headers['Authorization'] = f'JWT {token}'
+                return {'headers': headers}
+
+            request_client.on(codes.UNAUTHORIZED, update_jwt)
+
+            where = ''
+            if params and 'where' in params:
+                where = f' where {params.pop("where")}'
+
+            async def fetch_page(skip: int) -> list[dict[str, Any]]:
+                self.logger.info(f'Fetching page at offset {skip}...')
+                content = self._page_content(query, where=where, skip=skip)
+                self.logger.debug(f'Query: {content}')
+                page = await request_client.post(url='https://app.dimensions.ai/api/dsl/v2', content=content, headers=headers)
+                data = page.json()
+                self.n_results = get(data, '_stats', 'total_count', default=0)
+                entries: list[dict[str, Any]] = get(data, 'publications', default=[])
+                return entries
+
+            entries = await fetch_page(0)
+            n_records = len(entries)
+            for entry in entries:
+                yield entry
+
+            async for entries in gather_pages(fetch_page, range(self.page_size, self.n_results or 0, self.page_size), concurrency=self.concurrency):
+                n_records += len(entries)
+                for entry in entries:
+                    yield entry
+                self.logger.debug(f'Found {n_records:,} records (total {self.n_results:,} records)')
+
     @classmethod
     def translate_record(cls, record: dict[str, Any], project_id: str | uuid.UUID | None = None) -> AcademicItemModel:
         return AcademicItemModel(
@@ -1,4 +1,7 @@
+import json
 import uuid
+import shutil
+import asyncio
 import logging
 from pathlib import Path
 from time import time
@@ -14,7 +17,7 @@ from nacsos_data.models.openalex import WorksSchema, DefType, SearchField, OpTyp
 from nacsos_data.util import get
 from nacsos_data.util.conf import OpenAlexConfig, load_settings
 from .shared import translate_work_to_item, FIELDS_SOLR, NESTED_FIELDS
-from ..util import RequestClient, AbstractAPI
+from ..util import RequestClient, AsyncRequestClient, AbstractAPI, _assert_target
 
 
 class SearchResult(BaseModel):
@@ -44,8 +47,17 @@ class OpenAlexSolrAPI(AbstractAPI):
         backoff_rate: float = 5.0,
         timeout: int = 60,
         logger: logging.Logger | None = None,
+        concurrency: int = 1,
     ):
-        super().__init__(api_key='', proxy=proxy, max_retries=max_retries, max_req_per_sec=max_req_per_sec, backoff_rate=backoff_rate, logger=logger)
+        super().__init__(
+            api_key='',
+            proxy=proxy,
+            max_retries=max_retries,
+            max_req_per_sec=max_req_per_sec,
+            backoff_rate=backoff_rate,
+            logger=logger,
+            concurrency=concurrency,
+        )
         self.openalex_conf = openalex_conf
 
         self.def_type = def_type
@@ -69,6 +81,30 @@ class OpenAlexSolrAPI(AbstractAPI):
 
         self.export_fields = [f'{field}:[json]' if field in NESTED_FIELDS else field for field in self.export_fields]
 
+    def _request_params(self, query: str, params: dict[str, Any] | None = None, include_histogram: bool = False) -> dict[str, Any]:
+        params_ = {'q': query, 'q.op': self.op, 'sort': 'id desc', 'fl': ','.join(self.export_fields), 'rows': self.batch_size, 'cursorMark': '*'}
+
+        if self.def_type == 'lucene':
+            params_ |= {'df': self.field, 'defType': 'lucene'}
+        else:
+            params_ |= {'qf': self.field, 'defType': self.def_type}
+
+        if include_histogram:
+            params_ |= {
+                'facet': 'true',
+                'facet.range': 'publication_year',
+                'facet.sort': 'index',
+                'facet.range.gap': '1',
+                'facet.range.start': self.histogram_from,
+                'facet.range.end': self.histogram_to,
+            }
+
+        # overrides
+        if params:
+            params_ |= params
+
+        return params_
+
     def fetch_raw(
         self,
         query: str,
@@ -95,26 +131,7 @@ class OpenAlexSolrAPI(AbstractAPI):
             auth=self.openalex_conf.auth,
             verify=self.openalex_conf.SSL_VERIFY,
         ) as request_client:
-            params_ = {'q': query, 'q.op': self.op, 'sort': 'id desc', 'fl': ','.join(self.export_fields), 'rows': self.batch_size, 'cursorMark': '*'}
-
-            if self.def_type == 'lucene':
-                params_ |= {'df': self.field, 'defType': 'lucene'}
-            else:
-                params_ |= {'qf': self.field, 'defType': self.def_type}
-
-            if self.include_histogram:
-                params_ |= {
-                    'facet': 'true',
-                    'facet.range': 'publication_year',
-                    'facet.sort': 'index',
-                    'facet.range.gap': '1',
-                    'facet.range.start': self.histogram_from,
-                    'facet.range.end': self.histogram_to,
-                }
-
-            # overrides
-            if params:
-                params_ |= params
+            params_ = self._request_params(query, params=params, include_histogram=self.include_histogram)
 
             t0 = time()
             self.logger.info(f'Querying endpoint with batch_size={self.batch_size:,}: {self.openalex_conf.solr_url}')
@@ -164,6 +181,153 @@ class OpenAlexSolrAPI(AbstractAPI):
 
             self.logger.info(f'Reached end of result set after {timedelta(seconds=time() - t1)}h')
 
+    @classmethod
+    def year_shards(cls, start: int, end: int, field: str = 'publication_year') -> list[str]:
+        """
+        Filter queries that partition any result set by `field`: one shard per year from `start` to `end`,
+        one for everything before and after, and one for documents without a value.
+        """
+        return [
+            f'{field}:[* TO {start - 1}]',
+            *[f'{field}:{year}' for year in range(start, end + 1)],
+            f'{field}:[{end + 1} TO *]',
+            f'-{field}:[* TO *]',
+        ]
+
+    @classmethod
+    def _shard_params(cls, shard: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        fq = (params or {}).get('fq')
+        if fq is None:
+            return (params or {}) | {'fq': shard}
+        return (params or {}) | {'fq': [shard, *(fq if isinstance(fq, list) else [fq])]}
+
+    async def _download_shard(self, request_client: AsyncRequestClient, query: str, params: dict[str, Any], part: Path) -> int:
+        params_ = self._request_params(query, params=params)
+        n_docs = 0
+        with open(part, 'w', encoding='utf-8') as f_out:
+            while True:
+                page = await request_client.post(f'{self.openalex_conf.solr_url}/select', data=params_, timeout=self.timeout)
+                res = page.json()
+                batch_docs = res['response']['docs']
+                for doc in batch_docs:
+                    f_out.write(json.dumps(doc) + '\n')
+                n_docs += len(batch_docs)
+
+                next_cursor = res.get('nextCursorMark')
+                if len(batch_docs) == 0 or next_cursor is None or next_cursor == params_['cursorMark']:
+                    break
+                params_['cursorMark'] = next_cursor
+
+        # Only mark as done once the shard is complete, partial shards are downloaded again when resuming
+        part.with_suffix('.done').write_text(str(n_docs))
+        return n_docs
+
+    async def _count_async(self, request_client: AsyncRequestClient, query: str, params: dict[str, Any] | None) -> int:
+        params_ = self._request_params(query, params=params) | {'rows': 0}
+        del params_['cursorMark']
+        page = await request_client.post(f'{self.openalex_conf.solr_url}/select', data=params_, timeout=self.timeout)
+        return int(page.json()['response']['numFound'])
+
+    async def _download_shards(
+        self,
+        request_client: AsyncRequestClient,
+        query: str,
+        shards: list[tuple[str, int]],
+        params: dict[str, Any] | None,
+        shard_dir: Path,
+    ) -> list[int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def download(si: int, shard: str, count: int) -> int:
+            part = shard_dir / f'{si}.jsonl'
+            done = part.with_suffix('.done')
+            if done.exists():
+                self.logger.info(f'Shard {si} ({shard}) already downloaded, skipping.')
+                return int(done.read_text())
+            if count == 0:
+                part.touch()
+                done.write_text('0')
+                return 0
+
+            async with semaphore:
+                t0 = time()
+                self.logger.info(f'Downloading shard {si} ({shard}) with {count:,} docs...')
+                n_docs = await self._download_shard(request_client, query, self._shard_params(shard, params), part)
+                self.logger.info(f'Shard {si} yielded {n_docs:,}/{count:,} docs in {timedelta(seconds=time() - t0)}h')
+                return n_docs
+
+        return await asyncio.gather(*[download(si, shard, count) for si, (shard, count) in enumerate(shards)])
+
+    @classmethod
+    def _concat_shards(cls, shard_dir: Path, num_shards: int, target: Path) -> None:
+        with open(target, 'wb') as f_out:
+            for si in range(num_shards):
+                with open(shard_dir / f'{si}.jsonl', 'rb') as f_in:
+                    shutil.copyfileobj(f_in, f_out)
+        shutil.rmtree(shard_dir)
+
+    async def download_sharded_async(
+        self,
+        query: str,
+        target: Path,
+        shards: list[str] | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> int:
+        """
+        Download all records for a query to `target` (jsonl), with up to `concurrency` shards paged at once.
+
+        The result set is partitioned by `shards` (solr filter queries, by default `year_shards()` from
+        `histogram_from` to `histogram_to`), which must not overlap and cover all documents.
+        Each shard is written to `<target>.shards/` first, so an interrupted download can be resumed
+        by calling this again with the same arguments; completed shards are skipped.
+        Once all shards are done, they are concatenated (in order of `shards`) into `target`.
+
+        :return: Number of documents written
+        """
+        _assert_target(target)
+        if shards is None:
+            shards = self.year_shards(self.histogram_from, self.histogram_to)
+
+        async with self.request_client_async(auth=self.openalex_conf.auth, verify=self.openalex_conf.SSL_VERIFY) as request_client:
+            num_found = await self._count_async(request_client, query, params=params)
+            counts = list(await asyncio.gather(*[self._count_async(request_client, query, params=self._shard_params(shard, params)) for shard in shards]))
+            if sum(counts) != num_found:
+                raise ValueError(f'Shards do not partition the result set: {sum(counts):,} docs in shards vs {num_found:,} for the query!')
+            self.logger.info(f'Found {num_found:,} docs for query across {len(shards)} shards.')
+
+            shard_dir = target.parent / f'{target.name}.shards'
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            spec_file = shard_dir / 'shards.json'
+            spec = {'query': query, 'params': params, 'shards': shards}
+            if spec_file.exists():
+                if json.loads(spec_file.read_text()) != spec:
+                    raise FileExistsError(f'Found unfinished download for a different query or shards in {shard_dir}')
+                self.logger.info(f'Resuming download from {shard_dir}')
+            else:
+                spec_file.write_text(json.dumps(spec))
+
+            n_docs = await self._download_shards(request_client, query, list(zip(shards, counts, strict=True)), params=params, shard_dir=shard_dir)
+
+        if sum(n_docs) != num_found:
+            self.logger.warning(f'Downloaded {sum(n_docs):,} docs, but query has {num_found:,} (index changed during download?)')
+
+        await asyncio.to_thread(self._concat_shards, shard_dir, len(shards), target)
+
+        self.n_results = sum(n_docs)
+        return self.n_results
+
+    def download_sharded(
+        self,
+        query: str,
+        target: Path,
+        shards: list[str] | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> int:
+        """
+        Synchronous wrapper for `download_sharded_async()`; use that one when already running in an event loop.
+        """
+        return asyncio.run(self.download_sharded_async(query, target, shards=shards, params=params))
+
     @classmethod
     def _prepare_histogram(cls, response: Response) -> dict[str, int] | None:
         hist_facets: list[int | str] | None = get(response, 'facet_counts', 'facet_ranges', 'publication_year', 'counts', default=None)
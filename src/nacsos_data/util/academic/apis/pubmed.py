@@ -1,12 +1,13 @@
 import uuid
-from typing import Any, Generator
+from contextlib import aclosing
+from typing import Any, Generator, AsyncGenerator
 from xml.etree.ElementTree import Element, fromstring as parse_xml
 
 from httpx import codes, Response
 
 from nacsos_data.util import as_uuid, clear_empty
 from nacsos_data.util.xml import xml2dict
-from nacsos_data.util.academic.apis.util import RequestClient, AbstractAPI
+from nacsos_data.util.academic.apis.util import RequestClient, AbstractAPI, gather_pages
 from nacsos_data.models.items.academic import AcademicAuthorModel, AcademicItemModel, AffiliationModel
 
 
@@ -42,9 +43,34 @@ def get_authors(citation: dict[str, Any]) -> Generator[AcademicAuthorModel, None
         )
 
 
+class _EndOfResults(Exception):
+    """
+    Raised by the BAD_REQUEST handler in `PubmedAPI.fetch_raw_async()` to stop retrying a page past the end.
+    """
+
+
 class PubmedAPI(AbstractAPI):
     PAGE_MAX = 50  # FIXME: unclear, not documented
 
+    def _read_search_page(self, search_page: Response) -> tuple[str, str, int]:
+        """
+        Parse the esearch response and return WebEnv, QueryKey, and page size (also sets `n_results`).
+        """
+        tree = parse_xml(search_page.text)
+        web_env = tree.find('WebEnv').text  # type: ignore[union-attr]
+        query_key = tree.find('QueryKey').text  # type: ignore[union-attr]
+
+        self.logger.warning(f'Query translated to: {tree.find("QueryTranslation").text}')  # type: ignore[union-attr]
+
+        errors = tree.find('ErrorList')
+        if errors is not None:
+            for error in errors.iter():
+                self.logger.error(f'Error {error.tag}: {"".join(error.itertext())}')
+
+        self.n_results = int(tree.find('Count').text)  # type: ignore[union-attr,arg-type]
+        page_size = int(tree.find('RetMax').text)  # type: ignore[union-attr,arg-type]
+        return web_env, query_key, page_size  # type: ignore[return-value]
+
     def _fetch_raw(
         self,
         query: str,
@@ -91,19 +117,7 @@ class PubmedAPI(AbstractAPI):
                 },
                 params=params,
             )
-            tree = parse_xml(search_page.text)
-            web_env = tree.find('WebEnv').text  # type: ignore[union-attr]
-            query_key = tree.find('QueryKey').text  # type: ignore[union-attr]
-
-            self.logger.warning(f'Query translated to: {tree.find("QueryTranslation").text}')  # type: ignore[union-attr]
-
-            errors = tree.find('ErrorList')
-            if errors is not None:
-                for error in errors.iter():
-                    self.logger.error(f'Error {error.tag}: {"".join(error.itertext())}')
-
-            self.n_results = int(tree.find('Count').text)  # type: ignore[union-attr,arg-type]
-            page_size = int(tree.find('RetMax').text)  # type: ignore[union-attr,arg-type]
+            web_env, query_key, page_size = self._read_search_page(search_page)
 
             done = False
 
@@ -141,7 +155,7 @@ class PubmedAPI(AbstractAPI):
                     f'Found {n_records:,}/{self.n_results:,} records after processing page {n_pages} ({page_size} per page) | {self.api_feedback}',
                 )
 
-                if n_records >= self.n_results or len(articles) == 0:
+                if n_records >= (self.n_results or 0) or len(articles) == 0:
                     self.logger.info('Seemed to have reached the end (count zero or total reached).')
                     break
 
@@ -153,6 +167,71 @@ class PubmedAPI(AbstractAPI):
         for entry in self._fetch_raw(query, params=params):
             yield xml2dict(entry)
 
+    async def fetch_raw_async(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        Same as `fetch_raw()`, but retrieves up to `concurrency` efetch batches at once.
+        """
+        if self.api_key is None:
+            raise AssertionError('Missing API key!')
+
+        async with self.request_client_async(timeout=120) as request_client:
+            self.logger.info(f'Running query: {query}')
+            search_page = await request_client.post(
+                'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi',
+                data={
+                    'api_key': self.api_key,
+                    'db': 'pubmed',
+                    'term': query,
+                    'usehistory': 'y',
+                },
+                params=params,
+            )
+            web_env, query_key, page_size = self._read_search_page(search_page)
+            # RetMax is zero for empty result sets
+            page_size = page_size or self.PAGE_MAX
+
+            def on_done(response: Response) -> dict[str, Any]:
+                self.logger.info('Seemed to have reached the end (BAD_REQUEST).')
+                raise _EndOfResults()
+
+            request_client.on(codes.BAD_REQUEST, on_done)
+
+            async def fetch_page(retstart: int) -> list[Element]:
+                try:
+                    result_page = await request_client.get(
+                        'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi',
+                        params={
+                            'api_key': self.api_key,
+                            'db': 'pubmed',
+                            'WebEnv': web_env,
+                            'query_key': query_key,
+                            'retmax': page_size,
+                            'retstart': retstart,
+                        },
+                    )
+                except _EndOfResults:
+                    return []
+                self.api_feedback = {
+                    'rate_limit': result_page.headers.get('x-ratelimit-limit'),
+                    'rate_left': result_page.headers.get('x-ratelimit-remaining'),
+                }
+                return list(parse_xml(result_page.text).findall('PubmedArticle'))
+
+            n_records = 0
+            async with aclosing(gather_pages(fetch_page, range(0, self.n_results or 0, page_size), concurrency=self.concurrency)) as pages:
+                async for articles in pages:
+                    if len(articles) == 0:
+                        self.logger.info('Seemed to have reached the end (count zero).')
+                        break
+                    n_records += len(articles)
+                    for article in articles:
+                        yield xml2dict(article)
+                    self.logger.info(f'Found {n_records:,}/{self.n_results:,} records ({page_size} per page) | {self.api_feedback}')
+
     @classmethod
     def translate_record(cls, record: dict[str, Any], project_id: str | uuid.UUID | None = None) -> AcademicItemModel:
         citation = record.get('MedlineCitation')[0]  # type: ignore[index]
@@ -1,12 +1,12 @@
 import uuid
-from typing import Any, Generator
+from typing import Any, Generator, AsyncGenerator
 
-from httpx import codes
+from httpx import codes, Response
 
 from nacsos_data.models.items import AcademicItemModel
 from nacsos_data.models.items.academic import AcademicAuthorModel, AffiliationModel
 from nacsos_data.util import get, clear_empty, as_uuid
-from nacsos_data.util.academic.apis.util import RequestClient, AbstractAPI, response_logger
+from nacsos_data.util.academic.apis.util import RequestClient, AbstractAPI, response_logger, gather_pages
 
 
 def get_title(obj: dict[str, Any]) -> str | None:
@@ -58,6 +58,89 @@ def translate_authors(record: dict[str, Any]) -> list[AcademicAuthorModel] | Non
 
 class ScopusAPI(AbstractAPI):
     PAGE_MAX = 25  # FIXME: unclear, not documented
+    # Offset-based paging (`start`) is only allowed for the first N results, beyond that only the cursor works
+    OFFSET_MAX = 5000
+
+    def _read_page(self, page: Response) -> tuple[list[dict[str, Any]], str | None]:
+        """
+        Parse a search result page and return its entries and the next cursor (also sets `n_results`).
+        """
+        self.api_feedback = {
+            'scopus_requests_limit': page.headers.get('x-ratelimit-limit'),
+            'scopus_requests_remaining': page.headers.get('x-ratelimit-remaining'),
+            'scopus_requests_reset': page.headers.get('x-ratelimit-reset'),
+        }
+        data = page.json()
+        self.n_results = int(get(data, 'search-results', 'opensearch:totalResults', default=0))
+        next_cursor: str | None = get(data, 'search-results', 'cursor', '@next', default=None)
+        entries: list[dict[str, Any]] = get(data, 'search-results', 'entry', default=[])
+        if len(entries) == 1 and entries[0].get('error') is not None:
+            return [], None
+        return entries, next_cursor
+
+    async def fetch_raw_async(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        Same as `fetch_raw()`, but retrieves up to `concurrency` pages at once using offsets instead of the cursor.
+        The first page is always requested with a cursor; if the query has more than `OFFSET_MAX` results,
+        the remaining pages are fetched (sequentially) by following that cursor.
+        """
+        if self.api_key is None:
+            raise AssertionError('Missing API key!')
+        api_key: str = self.api_key
+
+        async with self.request_client_async(timeout=120) as request_client:
+            request_client.on(status=codes.UNAUTHORIZED, func=response_logger(self.logger))
+
+            async def fetch_page(page_params: dict[str, Any]) -> tuple[list[dict[str, Any]], str | None]:
+                self.logger.info(f'Fetching page at {page_params}...')
+                page = await request_client.post(
+                    'https://api.elsevier.com/content/search/scopus',
+                    params={
+                        **page_params,
+                        'count': self.PAGE_MAX,
+                        # https://dev.elsevier.com/sc_search_views.html
+                        'view': 'COMPLETE',
+                        **(params or {}),
+                    },
+                    headers={
+                        'Accept': 'application/json',
+                        'X-ELS-APIKey': api_key,
+                    },
+                    data={
+                        'query': query,
+                    },
+                )
+                return self._read_page(page)
+
+            async def fetch_offset(start: int) -> list[dict[str, Any]]:
+                entries, _ = await fetch_page({'start': start})
+                return entries
+
+            entries, next_cursor = await fetch_page({'cursor': '*'})
+            n_results = self.n_results or 0
+            n_records = len(entries)
+            for entry in entries:
+                yield entry
+
+            if n_results > self.OFFSET_MAX:
+                self.logger.info(f'Query has {n_results} results, continuing with cursor paging.')
+                while len(entries) > 0 and next_cursor is not None:
+                    entries, next_cursor = await fetch_page({'cursor': next_cursor})
+                    for entry in entries:
+                        yield entry
+                    n_records += len(entries)
+                    self.logger.debug(f'Found {n_records}/{n_results} records {self.api_feedback}')
+                return
+
+            async for entries in gather_pages(fetch_offset, range(self.PAGE_MAX, n_results, self.PAGE_MAX), concurrency=self.concurrency):
+                for entry in entries:
+                    yield entry
+                n_records += len(entries)
+                self.logger.debug(f'Found {n_records}/{n_results} records {self.api_feedback}')
 
     def fetch_raw(
         self,
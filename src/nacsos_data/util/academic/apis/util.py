@@ -1,12 +1,15 @@
 import json
-import logging
 import uuid
+import asyncio
+import inspect
+import logging
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Iterable, Generator, Annotated, Type
+from collections import deque
+from typing import Any, Callable, Iterable, Generator, Annotated, Type, Awaitable, AsyncGenerator, Coroutine, TypeVar
 from pathlib import Path
 from time import perf_counter, sleep
 from typing_extensions import override
-from httpx import Client, URL, USE_CLIENT_DEFAULT, Response, codes, HTTPError
+from httpx import Client, AsyncClient, URL, USE_CLIENT_DEFAULT, Response, codes, HTTPError
 from httpx._client import UseClientDefault
 from httpx._types import (
     RequestContent,
@@ -22,6 +25,9 @@ from httpx._types import (
 
 from nacsos_data.models.items import AcademicItemModel
 
+T = TypeVar('T')
+R = TypeVar('R')
+
 
 def response_logger(logger: logging.Logger) -> Callable[[Response], dict[str, Any]]:
     def inner(response: Response) -> dict[str, Any]:
@@ -32,6 +38,52 @@ def response_logger(logger: logging.Logger) -> Callable[[Response], dict[str, An
     return inner
 
 
+def _request_args(defaults: dict[str, Any], args: dict[str, Any]) -> dict[str, Any]:
+    """
+    Fill in request arguments that were not given with the defaults passed to the client constructor.
+    """
+    if args['auth'] == USE_CLIENT_DEFAULT:
+        args['auth'] = None
+    if args['follow_redirects'] == USE_CLIENT_DEFAULT:
+        args['follow_redirects'] = None
+    if args['timeout'] == USE_CLIENT_DEFAULT:
+        args['timeout'] = None
+
+    return {
+        'method': args['method'] or defaults.get('method'),
+        'url': args['url'] or defaults.get('url'),
+        'content': args['content'] or defaults.get('content'),
+        'data': args['data'] or defaults.get('data'),
+        'files': args['files'] or defaults.get('files'),
+        'json': args['json'] or defaults.get('json'),
+        'params': args['params'] or defaults.get('params'),
+        'headers': defaults.get('headers', {}) | (args['headers'] or {}),
+        'cookies': defaults.get('cookies', {}) | (args['cookies'] or {}),
+        'auth': args['auth'] or defaults.get('auth', USE_CLIENT_DEFAULT),
+        'follow_redirects': args['follow_redirects'] or defaults.get('follow_redirects', True),
+        'timeout': args['timeout'] or defaults.get('timeout', 120),
+        'extensions': args['extensions'] or defaults.get('extensions'),
+    }
+
+
+def _apply_update(args: dict[str, Any], update: dict[str, Any] | None) -> None:
+    """
+    Apply changes to the request arguments returned by a status handler (see `RequestClient.on()`).
+    """
+    if not update:
+        return
+    if update.get('content'):
+        args['content'] = update.get('content')
+    if update.get('data'):
+        args['data'] = update.get('data')
+    for key in ['json', 'params', 'headers']:
+        if update.get(key):
+            if not args[key]:
+                args[key] = update.get(key, None)
+            else:
+                args[key].update(update.get(key, {}))
+
+
 class RequestClient(Client):
     def __init__(  # type: ignore[no-untyped-def]
         self,
@@ -62,7 +114,7 @@ class RequestClient(Client):
         self.callbacks[status] = func
 
     @override
-    def request(  # noqa: C901
+    def request(
         self,
         method: str,
         url: URL | str,
@@ -79,6 +131,21 @@ class RequestClient(Client):
         timeout: TimeoutTypes | UseClientDefault = 120,
         extensions: RequestExtensions | None = None,
     ) -> Response:
+        args = {
+            'method': method,
+            'url': url,
+            'content': content,
+            'data': data,
+            'files': files,
+            'json': json,
+            'params': params,
+            'headers': headers,
+            'cookies': cookies,
+            'auth': auth,
+            'follow_redirects': follow_redirects,
+            'timeout': timeout,
+            'extensions': extensions,
+        }
         for retry in range(self.max_retries):
             # Check if we need to wait before the next request so we are staying below the rate limit
             time = perf_counter() - (self.last_request or 0)
@@ -86,31 +153,10 @@ class RequestClient(Client):
                 logging.debug(f'Sleeping to keep rate limit: {self.time_per_request - time:.4f} seconds')
                 sleep(self.time_per_request - time)
 
-            if auth == USE_CLIENT_DEFAULT:
-                auth = None
-            if follow_redirects == USE_CLIENT_DEFAULT:
-                follow_redirects = None
-            if timeout == USE_CLIENT_DEFAULT:
-                timeout = None
-
             try:
                 # Log latest request
                 self.last_request = perf_counter()
-                response = super().request(
-                    method=method or self.kwargs.get('method'),  # type: ignore[arg-type]
-                    url=url or self.kwargs.get('url'),  # type: ignore[arg-type]
-                    content=content or self.kwargs.get('content'),
-                    data=data or self.kwargs.get('data'),
-                    files=files or self.kwargs.get('files'),
-                    json=json or self.kwargs.get('json'),
-                    params=params or self.kwargs.get('params'),
-                    headers=self.kwargs.get('headers', {}) | (headers or {}),
-                    cookies=self.kwargs.get('cookies', {}) | (cookies or {}),
-                    auth=auth or self.kwargs.get('auth', USE_CLIENT_DEFAULT),
-                    follow_redirects=follow_redirects or self.kwargs.get('follow_redirects', True),
-                    timeout=timeout or self.kwargs.get('timeout', 120),
-                    extensions=extensions or self.kwargs.get('extensions'),
-                )
+                response = super().request(**_request_args(self.kwargs, args))
 
                 response.raise_for_status()
 
@@ -125,26 +171,7 @@ class RequestClient(Client):
 
                 if e.response.status_code in self.callbacks:  # type: ignore[attr-defined]
                     logging.debug(f'Found status handler for {e.response.status_code}')  # type: ignore[attr-defined]
-                    update = self.callbacks[e.response.status_code](e.response)  # type: ignore[attr-defined]
-                    if update and update.get('content'):
-                        content = update.get('content')
-                    if update and update.get('data'):
-                        data = update.get('data')
-                    if update and update.get('json'):
-                        if not json:
-                            json = update.get('json', None)
-                        else:
-                            json.update(update.get('json', {}))
-                    if update and update.get('params'):
-                        if not params:
-                            params = update.get('params', None)
-                        else:
-                            params.update(update.get('params', {}))  # type: ignore[union-attr]
-                    if update and update.get('headers'):
-                        if not headers:
-                            headers = update.get('headers', None)
-                        else:
-                            headers.update(update.get('headers', {}))  # type: ignore[union-attr]
+                    _apply_update(args, self.callbacks[e.response.status_code](e.response))  # type: ignore[attr-defined]
 
                 # if this error is not on the list, pass on error right away; otherwise log and retry
                 elif e.response.status_code not in self.retry_on_status and len(self.retry_on_status) > 0:  # type: ignore[attr-defined]
@@ -161,6 +188,178 @@ class RequestClient(Client):
             raise RuntimeError('Maximum number of retries reached')
 
 
+class TokenBucket:
+    """
+    Rate limiter for async requests, allowing `rate` requests per second on average and bursts of up to `capacity` requests.
+    One bucket can be shared by several clients to enforce a common limit.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_update = perf_counter()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = perf_counter()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_update) * self.rate)
+                self.last_update = now
+
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+
+                logging.debug(f'Sleeping to keep rate limit: {wait:.4f} seconds')
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back all requests for the next `seconds` (e.g. to back off after errors).
+        """
+        self.blocked_until = max(self.blocked_until, perf_counter() + seconds)
+
+
+class AsyncRequestClient(AsyncClient):
+    """
+    Async counterpart to `RequestClient` with the same status handlers (`on()`) and backoff semantics.
+    Requests are rate-limited by a (shareable) `TokenBucket` and at most `max_concurrency` requests are in flight at once.
+    Status handlers can be regular functions or coroutines.
+    """
+
+    def __init__(  # type: ignore[no-untyped-def]
+        self,
+        *,
+        max_req_per_sec: int = 5,
+        max_retries: int = 5,
+        backoff_rate: float = 120.0,
+        retry_on_status: list[int] | None = None,
+        max_concurrency: int = 4,
+        limiter: TokenBucket | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+
+        self.max_req_per_sec = max_req_per_sec
+        self.max_retries = max_retries
+        self.backoff_rate = backoff_rate
+        self.limiter = limiter or TokenBucket(rate=max_req_per_sec)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.retry_on_status = retry_on_status or [
+            codes.INTERNAL_SERVER_ERROR,  # 500
+            codes.BAD_GATEWAY,  # 502
+            codes.SERVICE_UNAVAILABLE,  # 503
+            codes.GATEWAY_TIMEOUT,  # 504
+        ]
+        self.kwargs = kwargs
+        self.callbacks: dict[int, Callable[..., Any]] = {}
+
+    def on(self, status: int, func: Callable[[Response], dict[str, Any] | Awaitable[dict[str, Any]]]) -> None:
+        self.callbacks[status] = func
+
+    def backoff(self, retry: int) -> float:
+        """
+        Seconds to back off after the `retry`-th failed attempt of a request
+        (same growth as the time between requests in `RequestClient`).
+        """
+        time_per_request = 1 / self.max_req_per_sec
+        for _ in range(retry + 1):
+            time_per_request = (time_per_request + 1) * self.backoff_rate
+        return time_per_request
+
+    @override
+    async def request(
+        self,
+        method: str,
+        url: URL | str,
+        *,
+        content: RequestContent | None = None,
+        data: RequestData | None = None,
+        files: RequestFiles | None = None,
+        json: Any | None = None,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        cookies: CookieTypes | None = None,
+        auth: AuthTypes | UseClientDefault | None = None,
+        follow_redirects: bool | UseClientDefault | None = True,
+        timeout: TimeoutTypes | UseClientDefault = 120,
+        extensions: RequestExtensions | None = None,
+    ) -> Response:
+        args = {
+            'method': method,
+            'url': url,
+            'content': content,
+            'data': data,
+            'files': files,
+            'json': json,
+            'params': params,
+            'headers': headers,
+            'cookies': cookies,
+            'auth': auth,
+            'follow_redirects': follow_redirects,
+            'timeout': timeout,
+            'extensions': extensions,
+        }
+        for retry in range(self.max_retries):
+            await self.limiter.acquire()
+
+            try:
+                async with self.semaphore:
+                    response = await super().request(**_request_args(self.kwargs, args))
+
+                response.raise_for_status()
+
+                return response
+
+            except HTTPError as e:
+                logging.warning(f'Encountered HTTP error: {e.response.status_code}')  # type: ignore[attr-defined]
+                logging.warning(e.response.text)  # type: ignore[attr-defined]
+
+                if e.response.status_code in self.callbacks:  # type: ignore[attr-defined]
+                    logging.debug(f'Found status handler for {e.response.status_code}')  # type: ignore[attr-defined]
+                    update = self.callbacks[e.response.status_code](e.response)  # type: ignore[attr-defined]
+                    if inspect.isawaitable(update):
+                        update = await update
+                    _apply_update(args, update)
+
+                # if this error is not on the list, pass on error right away; otherwise log and retry
+                elif e.response.status_code not in self.retry_on_status and len(self.retry_on_status) > 0:  # type: ignore[attr-defined]
+                    logging.warning('No handler found for error, raising.')
+                    raise e
+
+                else:
+                    logging.warning(f'Retry {retry} after failing to retrieve from {url}: {e}')
+                    logging.exception(e)
+
+                    # hold back all requests sharing the limiter (concurrent failures pause it once, not once per request)
+                    self.limiter.pause(self.backoff(retry))
+        else:
+            raise RuntimeError('Maximum number of retries reached')
+
+
+async def gather_pages(fetch_page: Callable[[T], Coroutine[Any, Any, list[R]]], pages: Iterable[T], concurrency: int) -> AsyncGenerator[list[R], None]:
+    """
+    Fetch `pages` with up to `concurrency` pages in flight and yield results in the order of `pages`.
+    """
+    pending: deque[asyncio.Task[list[R]]] = deque()
+    try:
+        for page in pages:
+            pending.append(asyncio.create_task(fetch_page(page)))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 class AbstractAPI(ABC):
     logger: logging.Logger
 
@@ -173,12 +372,15 @@ class AbstractAPI(ABC):
         backoff_rate: float = 5.0,
         ignored_exceptions: list[Type[Exception]] | None = None,
         logger: logging.Logger | None = None,
+        concurrency: int = 1,
     ):
         self.api_key = api_key
         self.proxy = proxy
         self.max_req_per_sec = max_req_per_sec
         self.max_retries = max_retries
         self.backoff_rate = backoff_rate
+        # Max. number of pages to request at once in `fetch_raw_async` (for APIs that support it)
+        self.concurrency = concurrency
         self.ignored_exceptions = ignored_exceptions or []
         self.api_feedback: dict[str, int] = {}
         self.n_results: int | None = None
@@ -199,6 +401,30 @@ class AbstractAPI(ABC):
     ) -> Generator[dict[str, Any], None, None]:
         raise NotImplementedError
 
+    def request_client_async(self, **kwargs: Any) -> AsyncRequestClient:
+        return AsyncRequestClient(
+            max_req_per_sec=self.max_req_per_sec,
+            max_retries=self.max_retries,
+            backoff_rate=self.backoff_rate,
+            max_concurrency=self.concurrency,
+            proxy=self.proxy,
+            **kwargs,
+        )
+
+    async def fetch_raw_async(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        Async version of `fetch_raw()`.
+        By default, this runs the synchronous generator in a worker thread;
+        APIs that can address pages independently override this to retrieve up to `concurrency` pages at once.
+        """
+        records = iter(self.fetch_raw(query=query, params=params))
+        while (record := await asyncio.to_thread(next, records, None)) is not None:
+            yield record
+
     @classmethod
     @abstractmethod
     def translate_record(cls, record: dict[str, Any], project_id: str | uuid.UUID | None = None) -> AcademicItemModel:
@@ -1,9 +1,11 @@
 import re
 import uuid
 import logging
+from collections import defaultdict
+from typing import Generator, Any, Sequence
 
 from pydantic import BaseModel
-from sqlalchemy import select, or_
+from sqlalchemy import select, or_, func, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import fuze_dicts
@@ -183,6 +185,53 @@ async def find_duplicates(  # noqa: C901
     return None
 
 
+class StagedItems:
+    """
+    Items that are staged for bulk insertion are not visible to `find_duplicates()` until the batch is written.
+    This keeps an in-memory lookup over the same fields, so that duplicates within a batch are still detected.
+    """
+
+    FIELDS = ['title_slug', 'doi', 'wos_id', 'openalex_id', 'scopus_id', 'pubmed_id', 'dimensions_id', 's2_id']
+
+    def __init__(self) -> None:
+        self.items: list[AcademicItemModel] = []
+        self._lookup: defaultdict[tuple[str, str], list[Candidate]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _keys(self, item: AcademicItemModel) -> Generator[tuple[str, str], None, None]:
+        for field in self.FIELDS:
+            value = getattr(item, field)
+            if value is None or (field == 'title_slug' and len(value) <= MIN_TSLUG_LEN):
+                continue
+            yield field, value
+
+    def add(self, item: AcademicItemModel) -> None:
+        if item.item_id is None:
+            raise ValueError('Staged items need an item_id!')
+        self.items.append(item)
+        candidate = Candidate(
+            item_id=item.item_id,
+            title=item.title,
+            title_slug=item.title_slug,
+            doi=item.doi,
+            openalex_id=item.openalex_id,
+            publication_year=item.publication_year,
+        )
+        for key in self._keys(item):
+            self._lookup[key].append(candidate)
+
+    def find(self, item: AcademicItemModel) -> str | None:
+        if not item.title_slug:
+            item.title_slug = get_title_slug(item)
+        for key in self._keys(item):
+            for candidate in self._lookup.get(key, []):
+                if _are_actually_duplicate(item, candidate):
+                    return str(candidate.item_id)
+        return None
+
+
 REGEX_ABSTRACT_WORD_STRIPPER = re.compile(r'(abstract|title|a|the)')
 REGEX_ABSTRACT_CHAR_STRIPPER = re.compile(r'[^A-Za-z0-9 ]')
 
@@ -224,95 +273,24 @@ def _safe_lower(s: str | None) -> str | None:
     return None
 
 
-async def duplicate_insertion(  # noqa: C901
+def _fuze_duplicate(  # noqa: C901
+    orig_item: AcademicItemModel,
+    variants: list[dict[str, Any]],
     new_item: AcademicItemModel,
-    orig_item_id: str | uuid.UUID,
-    import_id: str | uuid.UUID | None,
-    import_revision: int | None,
-    session: AsyncSession,
     allow_field_overwrites: bool = False,
-    log: logging.Logger | None = None,
-) -> bool:
+) -> tuple[dict[str, Any], dict[str, Any]]:
     """
-    This method handles insertion of an item for which we found a duplicate in the database with `item_id`
+    Compare `new_item` to the reference item `orig_item` and all its prior `variants`.
 
-    :param import_revision:
-    :param log:
-    :param import_id:
-    :param session:
-    :param new_item:
-    :param allow_field_overwrites: when we get new values, and we already had one in the reference item, use the new value instead;
-                                   Going to write new values to previously empty fields in any case
-    :param orig_item_id: id in academic_item of which the `new_item` is a duplicate
-    :return: Return True if we ended up creating a new variant.
+    :return: Tuple of previously unseen values (for the new variant) and updated values for the reference item;
+             the latter is always empty for edited (non-editable) items.
     """
-    if log is None:
-        log = logger
-
-    # Fetch the original item from the database
-    orig_item_orm = await session.get(AcademicItem, {'item_id': orig_item_id})
-
-    # This should never happen, but let's check just in case
-    if orig_item_orm is None:
-        raise NotFoundError(f'No item found for {orig_item_id}')
-
-    orig_item = AcademicItemModel.model_validate(orig_item_orm.__dict__)
-    editable = orig_item_orm.time_edited is None
-
-    # Get prior variants of that AcademicItem
-    variants = [v.__dict__ for v in (await session.execute(select(AcademicItemVariant).where(AcademicItemVariant.item_id == orig_item_id))).scalars().all()]
-
-    #
-    if len(variants) > MAX_NUM_VARIANTS:
-        return False
-
-    # If we have no prior variant, we need to create one
-    if len(variants) == 0:
-        # For the first variant, we need to fetch the original import_id
-        orig_import = (
-            (
-                await session.execute(
-                    select(m2m_import_item_table.c.import_id, m2m_import_item_table.c.first_revision)
-                    .where(m2m_import_item_table.c.item_id == orig_item_id)
-                    .order_by(m2m_import_item_table.c.first_revision)
-                    .limit(1)
-                )
-            )
-            .mappings()
-            .one_or_none()
-        )
-        # Note, we are not checking for "not None", because it might be a valid case where no import_id exists
-        variant = AcademicItemVariantModel(
-            item_variant_id=uuid.uuid4(),
-            item_id=orig_item_id,
-            import_id=(orig_import or {}).get('import_id'),  # type: ignore[call-overload]
-            import_revision=(orig_import or {}).get('first_revision'),  # type: ignore[call-overload]
-            doi=orig_item.doi,
-            wos_id=orig_item.wos_id,
-            scopus_id=orig_item.scopus_id,
-            openalex_id=orig_item.openalex_id,
-            s2_id=orig_item.s2_id,
-            pubmed_id=orig_item.pubmed_id,
-            dimensions_id=orig_item.dimensions_id,
-            title=orig_item.title,
-            publication_year=orig_item.publication_year,
-            source=orig_item.source,
-            keywords=orig_item.keywords,
-            authors=orig_item.authors,
-            text=orig_item.text,
-            meta=orig_item.meta,
-        )
-
-        # add to database
-        session.add(AcademicItemVariant(**variant.model_dump()))
-        await session.flush()
-
-        log.debug(f'Created first variant of item {orig_item_id} at {variant.item_variant_id}')
-        # use this new variant for further value thinning
-        variants = [variant.model_dump()]
+    editable = orig_item.time_edited is None
 
     # Object to keep track of previously unseen values
-    new_variant = {}
+    new_variant: dict[str, Any] = {}
+    # Object to keep track of updated values for the reference item
+    updates: dict[str, Any] = {}
 
     # Check ID fields, title, abstract, and source (aka venue/journal)
     for field in ['doi', 'wos_id', 'scopus_id', 'openalex_id', 's2_id', 'pubmed_id', 'dimensions_id', 'source', 'title', 'text']:
@@ -333,19 +311,19 @@ async def duplicate_insertion(  # noqa: C901
             if field == 'title':
                 new_variant[field] = new_value
                 if editable:
-                    setattr(orig_item_orm, field, new_value)
-                    setattr(orig_item_orm, 'title_slug', str_to_title_slug(new_value))
+                    updates[field] = new_value
+                    updates['title_slug'] = str_to_title_slug(new_value)
             elif field == 'text':
                 candidates = sorted([abstr for abstr in field_values | {new_value} if len(abstr) < MAX_ABSTRACT_LENGTH], key=lambda a: len(a))
                 new_variant[field] = new_value
                 if len(candidates) > 0 and editable:
-                    setattr(orig_item_orm, field, candidates[-1])
+                    updates[field] = candidates[-1]
             else:
                 # This was new, so keep track of it in our variant
                 new_variant[field] = new_value  # fixme: shouldn't this be the old value (getattr(orig_item_orm, field))?
                 if editable:
                     # We always like new IDs, so update the reference item
-                    setattr(orig_item_orm, field, new_value)
+                    updates[field] = new_value
 
     # Check publication year field
     new_pub_year = getattr(new_item, 'publication_year')
@@ -359,7 +337,7 @@ async def duplicate_insertion(  # noqa: C901
             new_variant['publication_year'] = new_pub_year
             if editable:
                 # We always like new years, so update the reference item
-                setattr(orig_item_orm, 'publication_year', min(LATEST_POSSIBLE_PUB_YEAR, max(pub_yrs | {new_pub_year})))
+                updates['publication_year'] = min(LATEST_POSSIBLE_PUB_YEAR, max(pub_yrs | {new_pub_year}))
 
     # Check publication year field
     new_keywords = getattr(new_item, 'keywords')
@@ -373,7 +351,7 @@ async def duplicate_insertion(  # noqa: C901
             new_variant['keywords'] = new_keywords
             if editable:
                 # We always like new stuff, so update the reference item
-                setattr(orig_item_orm, 'keywords', list(keywords | set(new_keywords)))
+                updates['keywords'] = list(keywords | set(new_keywords))
 
     # Checking metadata field
     # only keep track of unique meta objects in variants
@@ -389,7 +367,7 @@ async def duplicate_insertion(  # noqa: C901
             new_variant['meta'] = new_meta
             if editable:
                 # We always like new IDs, so update the reference item
-                setattr(orig_item_orm, 'meta', clear_empty(fuze_dicts(getattr(orig_item_orm, 'meta'), new_meta)))
+                updates['meta'] = clear_empty(fuze_dicts(orig_item.meta, new_meta))
 
     # Checking authorships
     # only keep track of unique list of authors (or variations thereof) in variants
@@ -405,7 +383,104 @@ async def duplicate_insertion(  # noqa: C901
             new_variant['authors'] = new_authors
             if editable:
                 # We always like new IDs, so update the reference item
-                setattr(orig_item_orm, 'authors', new_authors)
+                updates['authors'] = new_authors
+
+    return new_variant, updates
+
+
+def _first_variant(orig_item: AcademicItemModel, orig_import: dict[str, Any] | None) -> AcademicItemVariantModel:
+    # Note, we are not checking for "not None", because it might be a valid case where no import_id exists
+    return AcademicItemVariantModel(
+        item_variant_id=uuid.uuid4(),
+        item_id=orig_item.item_id,  # type: ignore[arg-type]
+        import_id=(orig_import or {}).get('import_id'),
+        import_revision=(orig_import or {}).get('first_revision'),
+        doi=orig_item.doi,
+        wos_id=orig_item.wos_id,
+        scopus_id=orig_item.scopus_id,
+        openalex_id=orig_item.openalex_id,
+        s2_id=orig_item.s2_id,
+        pubmed_id=orig_item.pubmed_id,
+        dimensions_id=orig_item.dimensions_id,
+        title=orig_item.title,
+        publication_year=orig_item.publication_year,
+        source=orig_item.source,
+        keywords=orig_item.keywords,
+        authors=orig_item.authors,
+        text=orig_item.text,
+        meta=orig_item.meta,
+    )
+
+
+async def duplicate_insertion(
+    new_item: AcademicItemModel,
+    orig_item_id: str | uuid.UUID,
+    import_id: str | uuid.UUID | None,
+    import_revision: int | None,
+    session: AsyncSession,
+    allow_field_overwrites: bool = False,
+    log: logging.Logger | None = None,
+) -> bool:
+    """
+    This method handles insertion of an item for which we found a duplicate in the database with `item_id`
+
+    :param import_revision:
+    :param log:
+    :param import_id:
+    :param session:
+    :param new_item:
+    :param allow_field_overwrites: when we get new values, and we already had one in the reference item, use the new value instead;
+                                   Going to write new values to previously empty fields in any case
+    :param orig_item_id: id in academic_item of which the `new_item` is a duplicate
+    :return: Return True if we ended up creating a new variant.
+    """
+    if log is None:
+        log = logger
+
+    # Fetch the original item from the database
+    orig_item_orm = await session.get(AcademicItem, {'item_id': orig_item_id})
+
+    # This should never happen, but let's check just in case
+    if orig_item_orm is None:
+        raise NotFoundError(f'No item found for {orig_item_id}')
+
+    orig_item = AcademicItemModel.model_validate(orig_item_orm.__dict__)
+
+    # Get prior variants of that AcademicItem
+    variants = [v.__dict__ for v in (await session.execute(select(AcademicItemVariant).where(AcademicItemVariant.item_id == orig_item_id))).scalars().all()]
+
+    #
+    if len(variants) > MAX_NUM_VARIANTS:
+        return False
+
+    # If we have no prior variant, we need to create one
+    if len(variants) == 0:
+        # For the first variant, we need to fetch the original import_id
+        orig_import = (
+            (
+                await session.execute(
+                    select(m2m_import_item_table.c.import_id, m2m_import_item_table.c.first_revision)
+                    .where(m2m_import_item_table.c.item_id == orig_item_id)
+                    .order_by(m2m_import_item_table.c.first_revision)
+                    .limit(1)
+                )
+            )
+            .mappings()
+            .one_or_none()
+        )
+        variant = _first_variant(orig_item, orig_import=dict(orig_import) if orig_import is not None else None)
+
+        # add to database
+        session.add(AcademicItemVariant(**variant.model_dump()))
+        await session.flush()
+
+        log.debug(f'Created first variant of item {orig_item_id} at {variant.item_variant_id}')
+        # use this new variant for further value thinning
+        variants = [variant.model_dump()]
+
+    new_variant, updates = _fuze_duplicate(orig_item=orig_item, variants=variants, new_item=new_item, allow_field_overwrites=allow_field_overwrites)
+    for field, value in updates.items():
+        setattr(orig_item_orm, field, value)
 
     log.debug(f'Duplicate checking revealed new field variants for {len(new_variant)} fields: {new_variant.keys()}.')
 
@@ -423,3 +498,141 @@ async def duplicate_insertion(  # noqa: C901
         return True
 
     return False
+
+
+# Fields of `AcademicItemVariant` that are compared in `_fuze_duplicate()`
+VARIANT_FIELDS = [
+    'doi',
+    'wos_id',
+    'scopus_id',
+    'openalex_id',
+    's2_id',
+    'pubmed_id',
+    'dimensions_id',
+    'title',
+    'publication_year',
+    'source',
+    'keywords',
+    'authors',
+    'text',
+    'meta',
+]
+
+
+async def duplicate_insertion_batch(
+    pairs: Sequence[tuple[AcademicItemModel, str | uuid.UUID]],
+    import_id: str | uuid.UUID | None,
+    import_revision: int | None,
+    session: AsyncSession,
+    allow_field_overwrites: bool = False,
+    log: logging.Logger | None = None,
+) -> list[bool]:
+    """
+    Same as `duplicate_insertion()`, but for many (new item, existing item_id) pairs at once.
+
+    Reference items, their variants (at most `MAX_NUM_VARIANTS + 1` per item), and their first import are loaded
+    with three set-based queries. Field differences are computed in memory in the order of `pairs`,
+    so several new items may point to the same existing item. New variants and updated items are
+    written with one executemany each.
+
+    :param pairs: List of tuples with the new item and the item_id in academic_item it is a duplicate of
+    :param import_id:
+    :param import_revision:
+    :param session:
+    :param allow_field_overwrites: see `duplicate_insertion()`
+    :param log:
+    :return: For each pair, True if we ended up creating a new variant.
+    """
+    if log is None:
+        log = logger
+    if len(pairs) == 0:
+        return []
+
+    orig_item_ids = list({str(orig_item_id) for _, orig_item_id in pairs})
+
+    # Fetch the original items from the database
+    stmt_items = select(
+        AcademicItem.item_id,
+        AcademicItem.project_id,
+        AcademicItem.time_edited,
+        AcademicItem.text,
+        *[getattr(AcademicItem, field) for field in VARIANT_FIELDS if field != 'text'],
+    ).where(AcademicItem.item_id.in_(orig_item_ids))
+    orig_items = {str(row['item_id']): AcademicItemModel.model_validate(dict(row)) for row in (await session.execute(stmt_items)).mappings().all()}
+
+    # This should never happen, but let's check just in case
+    if len(orig_items) != len(orig_item_ids):
+        raise NotFoundError(f'No item found for {set(orig_item_ids) - set(orig_items.keys())}')
+
+    # Get prior variants of these AcademicItems, we don't need more than `MAX_NUM_VARIANTS` to know we can skip an item
+    rank = func.row_number().over(partition_by=AcademicItemVariant.item_id).label('rank')
+    variants_sub = (
+        select(AcademicItemVariant.item_id, rank, *[getattr(AcademicItemVariant, field) for field in VARIANT_FIELDS])
+        .where(AcademicItemVariant.item_id.in_(orig_item_ids))
+        .subquery()
+    )
+    variants: defaultdict[str, list[dict[str, Any]]] = defaultdict(list)
+    for row in (await session.execute(select(variants_sub).where(variants_sub.c.rank <= MAX_NUM_VARIANTS + 1))).mappings().all():
+        variants[str(row['item_id'])].append(dict(row))
+
+    # For first variants, we need to fetch the original import_id
+    no_variants = [orig_item_id for orig_item_id in orig_item_ids if orig_item_id not in variants]
+    stmt_imports = (
+        select(m2m_import_item_table.c.item_id, m2m_import_item_table.c.import_id, m2m_import_item_table.c.first_revision)
+        .where(m2m_import_item_table.c.item_id.in_(no_variants))
+        .distinct(m2m_import_item_table.c.item_id)
+        .order_by(m2m_import_item_table.c.item_id, m2m_import_item_table.c.first_revision)
+    )
+    orig_imports = {str(row['item_id']): dict(row) for row in (await session.execute(stmt_imports)).mappings().all()} if no_variants else {}
+
+    new_variants: list[dict[str, Any]] = []
+    updates: defaultdict[str, dict[str, Any]] = defaultdict(dict)
+    has_changes: list[bool] = []
+    for new_item, orig_item_id_ in pairs:
+        orig_item_id = str(orig_item_id_)
+        orig_item = orig_items[orig_item_id]
+
+        if len(variants[orig_item_id]) > MAX_NUM_VARIANTS:
+            has_changes.append(False)
+            continue
+
+        # If we have no prior variant, we need to create one
+        if len(variants[orig_item_id]) == 0:
+            variant = _first_variant(orig_item, orig_import=orig_imports.get(orig_item_id)).model_dump()
+            new_variants.append(variant)
+            variants[orig_item_id].append(variant)
+            log.debug(f'Created first variant of item {orig_item_id} at {variant["item_variant_id"]}')
+
+        new_variant, item_updates = _fuze_duplicate(
+            orig_item=orig_item,
+            variants=variants[orig_item_id],
+            new_item=new_item,
+            allow_field_overwrites=allow_field_overwrites,
+        )
+        log.debug(f'Duplicate checking revealed new field variants for {len(new_variant)} fields: {new_variant.keys()}.')
+
+        # Keep track of the changes, in case the same item shows up again in this batch
+        if len(item_updates) > 0:
+            updates[orig_item_id].update(item_updates)
+            orig_items[orig_item_id] = orig_item.model_copy(update=item_updates)
+
+        if len(new_variant) > 0:
+            variant = {field: new_variant.get(field) for field in VARIANT_FIELDS} | {
+                'item_variant_id': uuid.uuid4(),
+                'item_id': orig_item_id,
+                'import_id': import_id,
+                'import_revision': import_revision,
+            }
+            new_variants.append(variant)
+            # Remember the variant as we would read it back from the database
+            variants[orig_item_id].append(AcademicItemVariantModel.model_validate(variant).model_dump())
+        has_changes.append(len(new_variant) > 0)
+
+    if len(new_variants) > 0:
+        await session.execute(insert(AcademicItemVariant), new_variants)
+    if len(updates) > 0:
+        await session.execute(update(AcademicItem), [{'item_id': orig_item_id} | item_updates for orig_item_id, item_updates in updates.items()])
+    await session.flush()
+
+    log.debug(f'Created {len(new_variants):,} variants and updated {len(updates):,} items for {len(pairs):,} duplicates.')
+    return has_changes
@@ -1,9 +1,13 @@
+import json
 import uuid
+import shutil
 import logging
 import tempfile
 
 from pathlib import Path
-from typing import Generator, IO, Any
+from typing import Generator, IO, Any, Callable, Awaitable
+from itertools import islice
+from contextlib import ExitStack
 from collections import defaultdict
 
 from sqlalchemy.exc import IntegrityError
@@ -13,18 +17,35 @@ from sklearn.feature_extraction.text import CountVectorizer
 
 from ..conf import load_settings
 from ...db import DatabaseEngineAsync, get_engine_async
-from ...db.crud.imports import get_or_create_import, set_session_mutex, upsert_m2m, update_revision_statistics, get_latest_revision
-from ...db.crud.items.academic import AcademicItemGenerator, read_item_entries_from_db, gen_academic_entries, read_known_ids_map
+from ...db.crud.imports import (
+    get_or_create_import,
+    set_session_mutex,
+    upsert_m2m,
+    upsert_m2m_bulk,
+    update_revision_statistics,
+    get_latest_revision,
+    set_revision_checkpoint,
+)
+from ...db.crud.items.academic import (
+    AcademicItemGenerator,
+    read_item_entries_from_db,
+    read_item_entries_for_revision,
+    read_item_index_fingerprint,
+    gen_academic_entries,
+    read_known_ids_map,
+    insert_academic_items_bulk,
+)
 from ...db.schemas import AcademicItem
 from ...db.schemas.imports import ImportRevision
 from ...models.items import AcademicItemModel, ItemEntry
-from ...models.imports import ImportRevisionModel
+from ...models.imports import ImportRevisionModel, ImportCheckpoint
 from ...models.openalex import DefType, SearchField, OpType
-from .. import elapsed_timer
+from .. import elapsed_timer, batched, get_peak_rss
 from ..text import tokenise_item, extract_vocabulary, itm2txt
-from ..duplicate import MilvusDuplicateIndex, PynndescentDuplicateIndex
+from ..duplicate import AnyDuplicateIndex, DuplicateIndexType, MinHashDuplicateIndex, get_duplicate_index
 from .clean import get_cleaned_meta_field
-from .duplicate import str_to_title_slug, find_duplicates, duplicate_insertion
+from .readers.parallel import ParallelReader
+from .duplicate import str_to_title_slug, find_duplicates, duplicate_insertion, duplicate_insertion_batch, StagedItems
 from .util import ID_FIELDS, MIN_TSLUG_LEN, MAX_TITLE_LENGTH, MAX_ABSTRACT_LENGTH
 
 
@@ -101,20 +122,36 @@ async def _find_id_duplicates(
     return n_unknown_items, n_new_items, token_counts, m2m_buffer
 
 
+def _find_text_duplicates(
+    items: list[AcademicItemModel],
+    min_text_len: int,
+    index: AnyDuplicateIndex,
+) -> list[str | None]:
+    """
+    Look up a batch of items in the duplicate detection index.
+
+    :return: For each item, the item_id of a text duplicate (or None)
+    """
+    entries = [(i, ItemEntry(item_id=str(item.item_id), text=itm2txt(item))) for i, item in enumerate(items)]
+    entries = [(i, entry) for i, entry in entries if len(entry.text) > min_text_len]
+
+    text_matches: list[str | None] = [None] * len(items)
+    for (i, _), existing_id in zip(entries, index.test_many([entry for _, entry in entries]), strict=True):
+        text_matches[i] = existing_id
+    return text_matches
+
+
 async def _find_duplicate(
     session: AsyncSession,
     item: AcademicItemModel,
     project_id: str,
-    min_text_len: int,
-    index: PynndescentDuplicateIndex | MilvusDuplicateIndex,
     logger: logging.Logger,
+    text_match: str | None = None,
 ) -> str | None:
-    txt = itm2txt(item)
-    if len(txt) > min_text_len:
-        existing_id = index.test(ItemEntry(item_id=str(item.item_id), text=txt))
-        if existing_id is not None:
-            logger.debug(f'  -> Text lookup found duplicate: {existing_id}')
-            return existing_id
+    # Text duplicates are looked up beforehand (see `_find_text_duplicates()`)
+    if text_match is not None:
+        logger.debug(f'  -> Text lookup found duplicate: {text_match}')
+        return text_match
 
     duplicates = await find_duplicates(
         item=item,
@@ -209,6 +246,164 @@ async def _insert_item(
     return existing_id, has_changes
 
 
+async def _import_item(
+    session: AsyncSession,
+    item: AcademicItemModel,
+    text_match: str | None,
+    project_id: str,
+    import_id: str,
+    import_revision: int,
+    dry_run: bool,
+    logger: logging.Logger,
+    allow_field_overwrites: bool = False,
+) -> bool:
+    """
+    Deduplicate and insert a single item (new item or variant) and upsert its m2m tuple.
+
+    :param text_match: Result for this item from `_find_text_duplicates()`
+    :return: True if a variant was created
+    """
+    # Make sure the item fields are complete and clean
+    item = _ensure_clean_item(item, project_id=project_id)
+
+    # Search for duplicates in the database (unless we already found one in the index)
+    existing_id = await _find_duplicate(session=session, item=item, project_id=project_id, logger=logger, text_match=text_match)
+
+    # Insert a new item or an item variant
+    item_id, has_changes = await _insert_item(
+        session=session,
+        item=item,
+        existing_id=existing_id,
+        import_id=import_id,
+        import_revision=import_revision,
+        dry_run=dry_run,
+        logger=logger,
+        allow_field_overwrites=allow_field_overwrites,
+    )
+
+    # UPSERT m2m
+    await upsert_m2m(
+        session=session,
+        item_id=item_id,
+        import_id=import_id,
+        latest_revision=import_revision,
+        logger=logger,
+        dry_run=dry_run,
+    )
+    return has_changes
+
+
+async def _import_batch_bulk(
+    session: AsyncSession,
+    batch: list[AcademicItemModel],
+    text_matches: list[str | None],
+    project_id: str,
+    import_id: str,
+    import_revision: int,
+    dry_run: bool,
+    logger: logging.Logger,
+    allow_field_overwrites: bool = False,
+) -> int:
+    """
+    Bulk counterpart to `_import_item()` for a batch of items.
+    All items that are not a duplicate of something in the database or earlier in the batch are written
+    via `insert_academic_items_bulk()`, variants are merged afterwards via `duplicate_insertion_batch()`,
+    and all m2m tuples are upserted at once.
+    Raises on any constraint violation during the bulk insert, so the caller can fall back to `_import_item()`.
+
+    :return: Number of created variants
+    """
+    staged = StagedItems()
+    duplicates: list[tuple[AcademicItemModel, str]] = []
+
+    for item, text_match in zip(batch, text_matches, strict=True):
+        # Make sure the item fields are complete and clean
+        item = _ensure_clean_item(item, project_id=project_id)
+
+        # Search for duplicates in the index and the database, then in what we staged so far
+        existing_id = await _find_duplicate(session=session, item=item, project_id=project_id, logger=logger, text_match=text_match)
+        if existing_id is None:
+            existing_id = staged.find(item)
+
+        if existing_id is None:
+            item.item_id = str(uuid.uuid4())
+            staged.add(item)
+        else:
+            duplicates.append((item, existing_id))
+
+    if dry_run:
+        logger.debug(f'  [DRY-RUN] -> Creating {len(staged):,} new items and {len(duplicates):,} variants')
+        return len(duplicates)
+
+    num_updated = 0
+    async with session.begin_nested():
+        logger.debug(f'  -> Creating {len(staged):,} new items')
+        await insert_academic_items_bulk(session=session, items=staged.items, log=logger)
+        m2m_ids = [str(item.item_id) for item in staged.items]
+
+        # Variants might point to items in this batch, so we can only create them after the bulk insert
+        logger.debug(f'  -> Creating variants for {len(duplicates):,} duplicates')
+        has_changes = await duplicate_insertion_batch(
+            pairs=duplicates,
+            import_id=import_id,
+            import_revision=import_revision,
+            session=session,
+            allow_field_overwrites=allow_field_overwrites,
+            log=logger,
+        )
+        num_updated += sum(has_changes)
+        m2m_ids += [existing_id for _, existing_id in duplicates]
+
+        await upsert_m2m_bulk(session=session, item_ids=m2m_ids, import_id=import_id, latest_revision=import_revision, logger=logger, dry_run=dry_run)
+
+    return num_updated
+
+
+async def _import_items_bulk(
+    session: AsyncSession,
+    items: Generator[AcademicItemModel, None, None],
+    n_items: int,
+    batch_size: int,
+    min_text_len: int,
+    index: AnyDuplicateIndex,
+    logger: logging.Logger,
+    on_batch: Callable[[int, int], Awaitable[None]] | None = None,
+    **item_kwargs: Any,
+) -> int:
+    """
+    Run `_import_batch_bulk()` for batches of `items` and retry failed batches item-by-item via `_import_item()`.
+    If set, `on_batch` is called with the number of processed items and created variants so far after each batch.
+
+    :return: Number of created variants
+    """
+    num_updated = 0
+    n_processed = 0
+    for batch in batched(items, batch_size=batch_size):
+        if len(batch) == 0:
+            continue
+        text_matches = _find_text_duplicates(batch, min_text_len=min_text_len, index=index)
+        try:
+            with elapsed_timer(logger, f'Importing batch of AcademicItems ({n_processed:,}/{n_items:,})'):
+                num_updated += await _import_batch_bulk(session=session, batch=batch, text_matches=text_matches, logger=logger, **item_kwargs)
+        except (UniqueViolation, IntegrityError, OperationalError) as e:
+            logger.exception(e)
+            logger.warning(f'Bulk insertion failed, falling back to item-by-item insertion for {len(batch):,} items.')
+            for item, text_match in zip(batch, text_matches, strict=True):
+                try:
+                    async with session.begin_nested():
+                        num_updated += await _import_item(session=session, item=item, text_match=text_match, logger=logger, **item_kwargs)
+                except (UniqueViolation, IntegrityError, OperationalError) as e:
+                    logger.exception(e)
+        n_processed += len(batch)
+        if on_batch is not None:
+            await on_batch(n_processed, num_updated)
+    return num_updated
+
+
+def _checkpoint_path(checkpoint_dir: Path | str, import_id: str, import_revision: int) -> Path:
+    return Path(checkpoint_dir) / import_id / str(import_revision)
+
+
 def _revision_required(num_new_items: int | None, last_revision: ImportRevisionModel | None, min_update_size: int | None, logger: logging.Logger) -> bool:
     if (
         min_update_size is not None
@@ -313,7 +508,7 @@ async def import_academic_items_nodedup_forced(
     return import_id, 1
 
 
-async def import_academic_items(
+async def import_academic_items(  # noqa: C901
     db_engine: DatabaseEngineAsync,
     project_id: str | uuid.UUID,
     new_items: AcademicItemGenerator,
@@ -333,6 +528,10 @@ async def import_academic_items(
     logger: logging.Logger | None = None,
     allow_field_overwrites: bool = False,
     allow_empty_text: bool = False,
+    bulk_insert: bool = False,
+    index_type: DuplicateIndexType = 'milvus',
+    index_dir: Path | str | None = None,
+    checkpoint_dir: Path | str | None = None,
 ) -> tuple[str, int | None]:
     """
     Helper function for programmatically importing `AcademicItem`s into the platform.
@@ -399,6 +598,20 @@ async def import_academic_items(
     :param pipeline_task_id:
     :param allow_empty_text:
     :param allow_field_overwrites:
+    :param bulk_insert: If true, new items and m2m tuples are written in batches of `batch_size` via COPY and
+                        set-based INSERTs instead of one savepoint per item. Batches that fail (e.g. due to a constraint
+                        violation) are retried item-by-item, so revision statistics are the same in both modes.
+    :param index_type: Duplicate detection index for text matches (see `nacsos_data.util.duplicate.get_duplicate_index`);
+                       `minhash` runs in-process with bounded memory and needs no milvus server.
+    :param index_dir: (optional, only for `index_type='minhash'`) Directory to persist the duplicate detection index in.
+                      Each project gets its own sub-directory; the index is updated after each successful import and
+                      only rebuilt from the database when items were deleted or edited in the meantime.
+    :param checkpoint_dir: (optional) Directory to keep the buffer of unknown items, m2m buffer, and vocabulary of
+                           unfinished imports in. Progress is tracked in `ImportRevision.checkpoint` and items are
+                           committed batch by batch (instead of all at the end). If an import fails, running it again
+                           with the same `import_id` and `checkpoint_dir` resumes the unfinished revision after the last
+                           committed batch (the import mutex of the project has to be free).
+                           The duplicate detection index is rebuilt on resume.
     :return: import_id, latest_revision_num (or None if no action taken)
     """
     if logger is None:
@@ -407,7 +620,23 @@ async def import_academic_items(
     if project_id is None:
         raise AttributeError('You have to provide a project ID!')
 
-    with tempfile.NamedTemporaryFile('w+') as duplicate_buffer:
+    if checkpoint_dir is not None and dry_run:
+        logger.warning('Not writing checkpoints in dry-run mode.')
+        checkpoint_dir = None
+
+    checkpoint: ImportCheckpoint | None = None
+    checkpoint_path: Path | None = None
+
+    async def save_checkpoint(session: AsyncSession, **update: Any) -> None:
+        # Persist progress and commit everything up to here in the same transaction
+        nonlocal checkpoint
+        if checkpoint is None:
+            return
+        checkpoint = checkpoint.model_copy(update=update)
+        await set_revision_checkpoint(session=session, revision_id=revision_id, checkpoint=checkpoint)
+        await session.commit()
+
+    with ExitStack() as stack:
         async with db_engine.session() as session:  # type: AsyncSession
             await set_session_mutex(session, project_id=project_id, lock=True)
 
@@ -423,63 +652,115 @@ async def import_academic_items(
             )
             import_id = str(import_orm.import_id)
 
-            revision_id = str(uuid.uuid4())
             last_revision = await get_latest_revision(session=session, import_id=import_id)
-            latest_revision = 1
-            if last_revision is not None:
-                latest_revision = last_revision.import_revision_counter + 1
+            if (
+                checkpoint_dir is not None
+                and last_revision is not None
+                and last_revision.checkpoint is not None
+                and _checkpoint_path(checkpoint_dir, import_id, last_revision.import_revision_counter).exists()
+            ):
+                # Continue the unfinished revision instead of creating a new one
+                checkpoint = last_revision.checkpoint
+                revision_id = str(last_revision.import_revision_id)
+                latest_revision = last_revision.import_revision_counter
+                logger.info(f'Resuming revision {latest_revision} after phase "{checkpoint.phase}" with {checkpoint.n_processed:,} items processed.')
+            else:
+                revision_id = str(uuid.uuid4())
+                latest_revision = 1
+                if last_revision is not None:
+                    latest_revision = last_revision.import_revision_counter + 1
+
+                    # Check if we should even create a new revision based on the difference in the number of query results
+                    if not _revision_required(num_new_items=num_new_items, last_revision=last_revision, min_update_size=min_update_size, logger=logger):
+                        # Free our import mutex
+                        await set_session_mutex(session, project_id=project_id, lock=False)
+                        # Return without committing anything (note, that freeing mutex will roll back session!
+                        return import_id, None
+
+                if checkpoint_dir is not None:
+                    checkpoint = ImportCheckpoint(phase='created')
+
+                # Create a new revision
+                session.add(
+                    ImportRevision(
+                        import_revision_id=revision_id,
+                        import_id=import_id,
+                        import_revision_counter=latest_revision,
+                        pipeline_task_id=pipeline_task_id,
+                        checkpoint=None if checkpoint is None else checkpoint.model_dump(),
+                    ),
+                )
+                await session.commit()  # Note, committing instead of flushing here, so this is persisted for reference even on error
 
-                # Check if we should even create a new revision based on the difference in the number of query results
+            duplicate_buffer: IO[str]
+            if checkpoint_dir is None or checkpoint is None:
+                duplicate_buffer = stack.enter_context(tempfile.NamedTemporaryFile('w+'))
+            else:
+                checkpoint_path = _checkpoint_path(checkpoint_dir, import_id, latest_revision)
+                checkpoint_path.mkdir(parents=True, exist_ok=True)
+                duplicate_buffer = stack.enter_context(open(checkpoint_path / 'unknown.jsonl', 'w+' if checkpoint.phase == 'created' else 'r'))
+
+            vocabulary: list[str] | None = None
+            if checkpoint is None or checkpoint.phase == 'created':
+                with elapsed_timer(logger, 'Checking new items for obvious ID-based duplicates'):
+                    n_unknown_items, num_new_items, token_counts, m2m_buffer = await _find_id_duplicates(
+                        session=session,
+                        project_id=str(project_id),
+                        new_items=new_items,
+                        logger=logger,
+                        fp=duplicate_buffer,
+                        # FIXME: deal with the case where old record has doi+title w/o abstract and new record has all three
+                        allow_empty_text=allow_empty_text,
+                    )
+                logger.info(f'Found {n_unknown_items:,} unknown items and {len(m2m_buffer):,} duplicates in first pass.')
+
+                # Check if we should even create a new revision based on the difference in the number of query results.
+                # This is repeating the previous check in case the `num_new_items` parameter was left empty before.
                 if not _revision_required(num_new_items=num_new_items, last_revision=last_revision, min_update_size=min_update_size, logger=logger):
-                    # Free our import mutex
+                    if checkpoint_path is not None:
+                        shutil.rmtree(checkpoint_path)
+                    # Free our import mutex (note, that freeing mutex will roll back session!)
                     await set_session_mutex(session, project_id=project_id, lock=False)
-                    # Return without committing anything (note, that freeing mutex will roll back session!
+                    # Return without committing anything
                     return import_id, None
 
-            # Create a new revision
-            session.add(
-                ImportRevision(
-                    import_revision_id=revision_id,
-                    import_id=import_id,
-                    import_revision_counter=latest_revision,
-                    pipeline_task_id=pipeline_task_id,
-                ),
-            )
-            await session.commit()  # Note, committing instead of flushing here, so this is persisted for reference even on error
-
-            with elapsed_timer(logger, 'Checking new items for obvious ID-based duplicates'):
-                n_unknown_items, num_new_items, token_counts, m2m_buffer = await _find_id_duplicates(
-                    session=session,
-                    project_id=str(project_id),
-                    new_items=new_items,
-                    logger=logger,
-                    fp=duplicate_buffer,
-                    # FIXME: deal with the case where old record has doi+title w/o abstract and new record has all three
-                    allow_empty_text=allow_empty_text,
-                )
-            logger.info(f'Found {n_unknown_items:,} unknown items and {len(m2m_buffer):,} duplicates in first pass.')
-
-            # Check if we should even create a new revision based on the difference in the number of query results.
-            # This is repeating the previous check in case the `num_new_items` parameter was left empty before.
-            if not _revision_required(num_new_items=num_new_items, last_revision=last_revision, min_update_size=min_update_size, logger=logger):
-                # Free our import mutex (note, that freeing mutex will roll back session!)
-                await set_session_mutex(session, project_id=project_id, lock=False)
-                # Return without committing anything
-                return import_id, None
-
-        index: MilvusDuplicateIndex | None = None
-        if n_unknown_items > 0:
-            with elapsed_timer(logger, f'Constructing vocabulary from {len(token_counts):,} `token_counts`'):
-                vocabulary = extract_vocabulary(token_counts, min_count=1, max_features=max_features, skip_top=0.05)
+                # MinHash index works on token sets directly and needs no vocabulary
+                if n_unknown_items > 0 and vectoriser is None and index_type != 'minhash':
+                    with elapsed_timer(logger, f'Constructing vocabulary from {len(token_counts):,} `token_counts`'):
+                        vocabulary = extract_vocabulary(token_counts, min_count=1, max_features=max_features, skip_top=0.05)
                 del token_counts  # clean up term counts to save RAM
 
-            if vectoriser is None:
+                if checkpoint_path is not None:
+                    duplicate_buffer.flush()
+                    with open(checkpoint_path / 'm2m.json', 'w') as f_m2m:
+                        json.dump(list(m2m_buffer), f_m2m)
+                    with open(checkpoint_path / 'vocabulary.json', 'w') as f_vocab:
+                        json.dump(vocabulary, f_vocab)
+                    await save_checkpoint(session, phase='buffered', num_new_items=num_new_items, n_unknown_items=n_unknown_items)
+            else:
+                assert checkpoint_path is not None and checkpoint.n_unknown_items is not None and checkpoint.num_new_items is not None
+                n_unknown_items = checkpoint.n_unknown_items
+                num_new_items = checkpoint.num_new_items
+                with open(checkpoint_path / 'm2m.json', 'r') as f_m2m:
+                    m2m_buffer = set(json.load(f_m2m))
+                with open(checkpoint_path / 'vocabulary.json', 'r') as f_vocab:
+                    vocabulary = json.load(f_vocab)
+                logger.info(f'Loaded {n_unknown_items:,} unknown items and {len(m2m_buffer):,} duplicates from checkpoint.')
+
+        index: AnyDuplicateIndex | None = None
+        if n_unknown_items > 0:
+            if vocabulary is not None:
                 with elapsed_timer(logger, f'Setting up vectorizer with {len(vocabulary):,} tokens in the vocabulary'):
                     vectoriser = CountVectorizer(vocabulary=vocabulary)
 
-            logger.debug('Constructing Milvus index...')
-            async with db_engine.session() as session:  # type: AsyncSession
-                index = MilvusDuplicateIndex(
+            logger.debug(f'Constructing {index_type} index...')
+            async with db_engine.session() as session:
+                fingerprint = None
+                if index_dir is not None:
+                    fingerprint = await read_item_index_fingerprint(session=session, project_id=project_id, min_text_len=min_text_len)
+
+                index = get_duplicate_index(
+                    index_type=index_type,
                     existing_items=read_item_entries_from_db(
                         session=session,
                         batch_size=batch_size,
@@ -492,22 +773,35 @@ async def import_academic_items(
                     vectoriser=vectoriser,
                     max_slop=max_slop,
                     batch_size=batch_size,
+                    index_dir=None if index_dir is None else Path(index_dir) / str(project_id),
+                    fingerprint=fingerprint,
                 )
 
                 with elapsed_timer(logger, '  -> initialising duplicate detection index...'):
                     await index.init()
+                logger.info(f'Peak memory usage (RSS) after building the index: {get_peak_rss() / 1024**2:,.1f} MB')
 
         logger.info('Finished pre-processing and index building.')
         logger.info('Proceeding to insert new items and creating m2m tuples...')
-        num_updated = 0
-        async with db_engine.session() as session:  # type: AsyncSession
-            with elapsed_timer(logger, f'Inserting {len(m2m_buffer):,} buffered m2m relations'):
-                for item_id in m2m_buffer:
-                    await upsert_m2m(session=session, item_id=item_id, import_id=import_id, latest_revision=latest_revision, logger=logger, dry_run=dry_run)
+        num_updated = 0 if checkpoint is None else checkpoint.num_updated
+        async with db_engine.session() as session:
+            if checkpoint is None or checkpoint.phase == 'buffered':
+                with elapsed_timer(logger, f'Inserting {len(m2m_buffer):,} buffered m2m relations'):
+                    if bulk_insert:
+                        await upsert_m2m_bulk(
+                            session=session, item_ids=m2m_buffer, import_id=import_id, latest_revision=latest_revision, logger=logger, dry_run=dry_run
+                        )
+                    else:
+                        for item_id in m2m_buffer:
+                            await upsert_m2m(
+                                session=session, item_id=item_id, import_id=import_id, latest_revision=latest_revision, logger=logger, dry_run=dry_run
+                            )
+                await save_checkpoint(session, phase='m2m')
 
             if n_unknown_items == 0 or index is None:
                 logger.info('No unknown items found, ending here!')
                 # Commit all changes
+                await set_revision_checkpoint(session=session, revision_id=revision_id, checkpoint=None)
                 await session.commit()
 
                 # Updating revision stats
@@ -524,64 +818,85 @@ async def import_academic_items(
                 # Free our import mutex
                 await set_session_mutex(session, project_id=project_id, lock=False)
 
+                if checkpoint_path is not None:
+                    shutil.rmtree(checkpoint_path)
+
                 # Return to caller
                 return import_id, latest_revision
 
-            with elapsed_timer(logger, f'Loading milvus collection "{index.collection_name}"'):
-                index.client.load_collection(index.collection_name)
-
-            logger.info(f'Inserting (maybe) {n_unknown_items:,} buffered duplicate candidates...')
-            for i, item in enumerate(_read_buffered_items(duplicate_buffer)):
-                try:
-                    async with session.begin_nested():
-                        with elapsed_timer(logger, f'Importing AcademicItem ({i:,}/{n_unknown_items:,}) with doi {item.doi} and title "{item.title}"'):
-                            # Make sure the item fields are complete and clean
-                            item = _ensure_clean_item(item, project_id=str(project_id))
-
-                            # Search for duplicates in the index and the database
-                            existing_id = await _find_duplicate(
-                                session=session,
-                                item=item,
-                                project_id=str(project_id),
-                                min_text_len=min_text_len,
-                                index=index,
-                                logger=logger,
-                            )
+            with elapsed_timer(logger, f'Loading {index_type} duplicate detection index'):
+                index.load()
+
+            # Skip items that were already committed before resuming
+            n_skip = 0 if checkpoint is None else checkpoint.n_processed
+            logger.info(f'Inserting (maybe) {n_unknown_items - n_skip:,} buffered duplicate candidates...')
+            item_kwargs: dict[str, Any] = {
+                'project_id': str(project_id),
+                'import_id': import_id,
+                'import_revision': latest_revision,
+                'dry_run': dry_run,
+                'logger': logger,
+                'allow_field_overwrites': allow_field_overwrites,
+            }
+            if bulk_insert:
+                num_updated_before = num_updated
+
+                async def on_batch(n_processed: int, n_updated: int) -> None:
+                    await save_checkpoint(session, phase='items', n_processed=n_skip + n_processed, num_updated=num_updated_before + n_updated)
+
+                num_updated += await _import_items_bulk(
+                    session=session,
+                    items=(item for item in islice(_read_buffered_items(duplicate_buffer), n_skip, None)),
+                    n_items=n_unknown_items - n_skip,
+                    batch_size=batch_size,
+                    min_text_len=min_text_len,
+                    index=index,
+                    on_batch=on_batch,
+                    **item_kwargs,
+                )
+            else:
+                i = n_skip
+                batch: list[AcademicItemModel]
+                for batch in batched((item for item in islice(_read_buffered_items(duplicate_buffer), n_skip, None)), batch_size=batch_size):
+                    with elapsed_timer(logger, f'Looking up {len(batch):,} items in duplicate detection index'):
+                        text_matches = _find_text_duplicates(batch, min_text_len=min_text_len, index=index)
 
-                            # Insert a new item or an item variant
-                            item_id, has_changes = await _insert_item(
-                                session=session,
-                                item=item,
-                                existing_id=existing_id,
-                                import_id=import_id,
-                                import_revision=latest_revision,
-                                dry_run=dry_run,
-                                logger=logger,
-                                allow_field_overwrites=allow_field_overwrites,
-                            )
-                            num_updated += has_changes
+                    for item, text_match in zip(batch, text_matches, strict=True):
+                        i += 1
+                        try:
+                            async with session.begin_nested():
+                                with elapsed_timer(logger, f'Importing AcademicItem ({i:,}/{n_unknown_items:,}) with doi {item.doi} and title "{item.title}"'):
+                                    num_updated += await _import_item(session=session, item=item, text_match=text_match, **item_kwargs)
 
-                            # UPSERT m2m
-                            await upsert_m2m(
-                                session=session,
-                                item_id=item_id,
-                                import_id=import_id,
-                                latest_revision=latest_revision,
-                                logger=logger,
-                                dry_run=dry_run,
-                            )
+                        except (UniqueViolation, IntegrityError, OperationalError) as e:
+                            logger.exception(e)
 
-                except (UniqueViolation, IntegrityError, OperationalError) as e:
-                    logger.exception(e)
+                    await save_checkpoint(session, phase='items', n_processed=i, num_updated=num_updated)
 
             # All done, commit and finalise import transaction.
             logger.info('Finally committing all changes to the database!')
             await session.commit()
 
-    with elapsed_timer(logger, 'Cleaning up milvus!'):
-        index.client.drop_collection(index.collection_name)
+    if isinstance(index, MinHashDuplicateIndex) and index.index_dir is not None and not dry_run:
+        with elapsed_timer(logger, f'Updating persisted duplicate detection index in {index.index_dir}'):
+            async with db_engine.session() as session:
+                await index.update(
+                    items=read_item_entries_for_revision(
+                        session=session,
+                        import_id=import_id,
+                        import_revision=latest_revision,
+                        batch_size=batch_size,
+                        min_text_len=min_text_len,
+                        log=logger,
+                    ),
+                    fingerprint=await read_item_index_fingerprint(session=session, project_id=project_id, min_text_len=min_text_len),
+                )
 
-    async with db_engine.session() as session:  # type: AsyncSession
+    with elapsed_timer(logger, f'Cleaning up {index_type} duplicate detection index!'):
+        index.close()
+
+    async with db_engine.session() as session:
+        await set_revision_checkpoint(session=session, revision_id=revision_id, checkpoint=None)
         await update_revision_statistics(
             session=session,
             import_id=import_id,
@@ -594,6 +909,9 @@ async def import_academic_items(
         # Free our import mutex
         await set_session_mutex(session, project_id=project_id, lock=False)
 
+    if checkpoint_path is not None:
+        shutil.rmtree(checkpoint_path)
+
     logger.info('Import complete, returning to initiator!')
     return import_id, latest_revision
 
@@ -606,6 +924,7 @@ async def import_wos_files(
     pipeline_task_id: str | None = None,
     min_update_size: int | None = None,
     num_new_items: int | None = None,
+    processes: int | None = None,
     logger: logging.Logger | None = None,
 ) -> tuple[str, int | None]:
     """
@@ -621,6 +940,8 @@ async def import_wos_files(
         The project_id to connect these items to (required)
     **import_id**
         The import_id to connect these items to (required)
+    **processes**
+        If set, parse the files in chunks with this many worker processes (see `ParallelReader`)
     """
 
     from nacsos_data.util.academic.readers.wos import read_wos_file
@@ -638,6 +959,10 @@ async def import_wos_files(
                 itm.item_id = uuid.uuid4()
                 yield itm
 
+    new_items: AcademicItemGenerator = from_sources
+    if processes is not None:
+        new_items = ParallelReader(sources, file_format='wos', project_id=project_id, processes=processes, log=logger)
+
     logger.info(f'Importing articles from web of science files: {sources}')
     if import_id is None:
         raise ValueError('Import ID is not set!')
@@ -648,7 +973,7 @@ async def import_wos_files(
     return await import_academic_items(
         db_engine=db_engine,
         project_id=project_id,
-        new_items=from_sources,
+        new_items=new_items,
         min_update_size=min_update_size,
         num_new_items=num_new_items,
         import_name=None,
@@ -672,6 +997,7 @@ async def import_scopus_csv_file(
     pipeline_task_id: str | None = None,
     min_update_size: int | None = None,
     num_new_items: int | None = None,
+    processes: int | None = None,
     logger: logging.Logger | None = None,
 ) -> tuple[str, int | None]:
     """
@@ -688,6 +1014,8 @@ async def import_scopus_csv_file(
         The project_id to connect these items to (required)
     **import_id**
         The import_id to connect these items to (required)
+    **processes**
+        If set, parse the files in chunks with this many worker processes (see `ParallelReader`)
     """
 
     from nacsos_data.util.academic.readers.scopus import read_scopus_csv_file
@@ -705,6 +1033,10 @@ async def import_scopus_csv_file(
                 itm.item_id = uuid.uuid4()
                 yield itm
 
+    new_items: AcademicItemGenerator = from_sources
+    if processes is not None:
+        new_items = ParallelReader(sources, file_format='scopus-csv', project_id=project_id, processes=processes, log=logger)
+
     logger.info(f'Importing articles from scopus CSV files: {sources}')
     if import_id is None:
         raise ValueError('Import ID is not set!')
@@ -715,7 +1047,7 @@ async def import_scopus_csv_file(
     return await import_academic_items(
         db_engine=db_engine,
         project_id=project_id,
-        new_items=from_sources,
+        new_items=new_items,
         min_update_size=min_update_size,
         num_new_items=num_new_items,
         import_name=None,
@@ -894,6 +1226,7 @@ async def import_openalex_files(
     pipeline_task_id: str | None = None,
     min_update_size: int | None = None,
     num_new_items: int | None = None,
+    processes: int | None = None,
     logger: logging.Logger | None = None,
 ) -> tuple[str, int | None]:
     """
@@ -909,6 +1242,8 @@ async def import_openalex_files(
         The project_id to connect these tweets to
     **import_id**
         The import_id to connect these tweets to
+    **processes**
+        If set, parse the files in chunks with this many worker processes (see `ParallelReader`)
     """
     from nacsos_data.util.academic.apis import OpenAlexSolrAPI
 
@@ -920,6 +1255,10 @@ async def import_openalex_files(
             logger.info(f'Reading from file: {source}')
             yield from OpenAlexSolrAPI.read_translated(source=source, project_id=project_id)
 
+    new_items: AcademicItemGenerator = from_sources
+    if processes is not None:
+        new_items = ParallelReader(sources, file_format='jsonl', project_id=project_id, api=OpenAlexSolrAPI, processes=processes, log=logger)
+
     logger.info(f'Importing articles (WorkSolr-formatted) from files: {sources}')
     if import_id is None:
         raise ValueError('Import ID is not set!')
@@ -930,7 +1269,7 @@ async def import_openalex_files(
     return await import_academic_items(
         db_engine=db_engine,
         project_id=project_id,
-        new_items=from_sources,
+        new_items=new_items,
         min_update_size=min_update_size,
         num_new_items=num_new_items,
         import_name=None,
@@ -74,12 +74,16 @@ def _translate_kw(kws: str | None) -> list[str] | None:
     return [kw.strip() for kw in kws.split(',')]
 
 
+def _middlewares() -> list[BlockMiddleware]:
+    return [EnsureUniqKeyMiddleware(), middlewares.SeparateCoAuthors(), middlewares.SplitNameParts()]
+
+
 def generate_entries_from_bibtex(file: Path, log: logging.Logger | None = None) -> Generator[Entry, None, None]:
     if log is None:
         log = logger
 
     log.info(f'Parsing BibTeX file: {file}')
-    library = bibtexparser.parse_file(str(file), append_middleware=[EnsureUniqKeyMiddleware(), middlewares.SeparateCoAuthors(), middlewares.SplitNameParts()])
+    library = bibtexparser.parse_file(str(file), append_middleware=_middlewares())
 
     yield from library.entries
 
@@ -145,20 +149,24 @@ def generate_items_from_bibtex(
         log = logger
 
     for entry in generate_entries_from_bibtex(file=file, log=log):
-        d = dict(entry.items())
-        yield AcademicItemModel(
-            item_id=None,
-            project_id=project_id,
-            doi=_ensure_http_doi(d.get('doi')),
-            title=d.get('title'),
-            title_slug=str_to_title_slug(d.get('title')),
-            text=d.get('abstract'),
-            publication_year=_tanslate_yr(d.get('year')),
-            source=d.get('journal', d.get('booktitle')),
-            keywords=_translate_kw(d.get('keywords')),
-            authors=_translate_authors(d.get('author')),
-            meta=clear_empty({**d, 'author': [a.__dict__ for a in d.get('author', [])], 'editor': [e.__dict__ for e in d.get('editor', [])]}),
-        )
+        yield translate_bibtex_entry(entry, project_id=project_id)
+
+
+def translate_bibtex_entry(entry: Entry, project_id: str | uuid.UUID | None = None) -> AcademicItemModel:
+    d = dict(entry.items())
+    return AcademicItemModel(
+        item_id=None,
+        project_id=project_id,
+        doi=_ensure_http_doi(d.get('doi')),
+        title=d.get('title'),
+        title_slug=str_to_title_slug(d.get('title')),
+        text=d.get('abstract'),
+        publication_year=_tanslate_yr(d.get('year')),
+        source=d.get('journal', d.get('booktitle')),
+        keywords=_translate_kw(d.get('keywords')),
+        authors=_translate_authors(d.get('author')),
+        meta=clear_empty({**d, 'author': [a.__dict__ for a in d.get('author', [])], 'editor': [e.__dict__ for e in d.get('editor', [])]}),
+    )
 
 
 def ensure_non_duplicate_keys(infile: Path, outfile: Path) -> None:
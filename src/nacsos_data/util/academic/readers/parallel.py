@@ -0,0 +1,243 @@
+import io
+import os
+import re
+import csv
+import sys
+import json
+import uuid
+import logging
+from pathlib import Path
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Generator, Literal, TYPE_CHECKING
+
+from ....models.items import AcademicItemModel
+
+if TYPE_CHECKING:
+    from ..apis.util import AbstractAPI
+
+logger = logging.getLogger('nacsos_data.util.academic.parallel')
+
+FileFormat = Literal['wos', 'scopus-csv', 'bibtex', 'jsonl']
+
+# WoS plain text files need this header (and the `EF` footer) to be parsed
+WOS_HEADER = 'FN Clarivate Analytics Web of Science\nVR 1.0\n'
+BIBTEX_ENTRY = re.compile(r'^\s*@')
+BIBTEX_STRING = re.compile(r'^\s*@string', re.IGNORECASE)
+
+
+def _parse_wos(text: str, project_id: str | uuid.UUID | None) -> list[AcademicItemModel]:
+    from .wos import translate_wos_record
+    from .wosfile.read import PlainTextReader
+    from .wosfile.record import Record
+
+    reader = PlainTextReader(io.StringIO(text))
+    items = []
+    while (record := next(reader, None)) is not None:
+        items.append(translate_wos_record(Record(record), project_id=project_id))
+    return items
+
+
+def _parse_wos_file(source: Path, project_id: str | uuid.UUID | None) -> list[AcademicItemModel]:
+    from .wos import read_wos_file
+
+    return list(read_wos_file(str(source), project_id=project_id))
+
+
+def _parse_scopus_csv(rows: list[dict[str, str]], project_id: str | uuid.UUID | None) -> list[AcademicItemModel]:
+    from .scopus import translate_scopus_csv_row
+
+    return [translate_scopus_csv_row(row, project_id=project_id) for row in rows]
+
+
+def _parse_bibtex(text: str, project_id: str | uuid.UUID | None) -> list[AcademicItemModel]:
+    import bibtexparser
+    from .bibtex import translate_bibtex_entry, _middlewares
+
+    library = bibtexparser.parse_string(text, append_middleware=_middlewares())
+    return [translate_bibtex_entry(entry, project_id=project_id) for entry in library.entries]
+
+
+def _parse_jsonl(lines: list[str], project_id: str | uuid.UUID | None, api: type['AbstractAPI']) -> list[AcademicItemModel]:
+    items = []
+    for line in lines:
+        try:
+            items.append(api.translate_record(record=json.loads(line), project_id=project_id))
+        except json.decoder.JSONDecodeError as e:
+            logger.error(f'Failed to decode record: {e}')
+    return items
+
+
+def _wos_encoding(source: Path) -> str:
+    from .wosfile.read import sniff_encoding
+
+    with open(source, 'rb') as fh_sniff:
+        return sniff_encoding(fh_sniff)
+
+
+def _is_wos_plain_text(source: Path) -> bool:
+    with open(source, encoding=_wos_encoding(source)) as f_in:
+        return f_in.read(3) == 'FN '
+
+
+def _chunks_wos(source: Path, chunk_size: int) -> Generator[str, None, None]:
+    with open(source, encoding=_wos_encoding(source)) as f_in:
+        lines: list[str] = []
+        n_records = 0
+        for line in f_in:
+            if line.startswith(('FN ', 'VR ')):
+                continue
+            if line.startswith('EF'):
+                break
+            lines.append(line)
+            if line.startswith('ER'):
+                n_records += 1
+                if n_records >= chunk_size:
+                    yield WOS_HEADER + ''.join(lines) + 'EF\n'
+                    lines = []
+                    n_records = 0
+        if n_records > 0:
+            yield WOS_HEADER + ''.join(lines) + 'EF\n'
+
+
+def _chunks_scopus_csv(source: Path, chunk_size: int) -> Generator[list[dict[str, str]], None, None]:
+    from ... import batched
+
+    with open(source, mode='r', newline='') as csvfile:
+        csv.field_size_limit(sys.maxsize)
+        rows: list[dict[str, str]]
+        for rows in batched((row for row in csv.DictReader(csvfile)), batch_size=chunk_size):
+            if len(rows) > 0:
+                yield rows
+
+
+def _has_bibtex_strings(source: Path) -> bool:
+    with open(source, 'r') as f_in:
+        return any(BIBTEX_STRING.match(line) for line in f_in)
+
+
+def _chunks_bibtex(source: Path, chunk_size: int) -> Generator[str, None, None]:
+    with open(source, 'r') as f_in:
+        lines: list[str] = []
+        n_entries = 0
+        for line in f_in:
+            if BIBTEX_ENTRY.match(line):
+                if n_entries >= chunk_size:
+                    yield ''.join(lines)
+                    lines = []
+                    n_entries = 0
+                n_entries += 1
+            lines.append(line)
+        if len(lines) > 0:
+            yield ''.join(lines)
+
+
+def _chunks_jsonl(source: Path, chunk_size: int) -> Generator[list[str], None, None]:
+    from ... import batched
+
+    with open(source, 'r') as f_in:
+        for lines in batched((line for line in f_in if len(line.strip()) > 0), batch_size=chunk_size):
+            if len(lines) > 0:
+                yield lines
+
+
+class ParallelReader:
+    """
+    Reads academic items from (large) files by splitting them at record boundaries into chunks of `chunk_size` records,
+    which are parsed and translated in a pool of `processes` worker processes.
+    Items are yielded in the same order as in the files.
+    Items without an `item_id` get a random one, so an instance can be passed as `new_items` to the importer directly.
+
+    Supported formats:
+      - 'wos': Web of Science plain text (tab-delimited files are read sequentially)
+      - 'scopus-csv': Scopus CSV export
+      - 'bibtex': BibTeX (files with `@string` macros are read sequentially, as they might be used across chunks)
+      - 'jsonl': one raw record per line, translated by `api.translate_record()` (e.g. `OpenAlexSolrAPI`)
+    """
+
+    def __init__(
+        self,
+        sources: list[Path],
+        file_format: FileFormat,
+        project_id: str | uuid.UUID | None = None,
+        api: type['AbstractAPI'] | None = None,
+        processes: int | None = None,
+        chunk_size: int = 1000,
+        log: logging.Logger | None = None,
+    ):
+        if file_format == 'jsonl' and api is None:
+            raise ValueError('Need an `api` to translate jsonl records!')
+
+        self.sources = sources
+        self.file_format = file_format
+        self.project_id = project_id
+        self.api = api
+        self.processes = processes or os.process_cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.logger = logger if log is None else log
+
+    def _chunks(self, source: Path) -> Generator[tuple[Callable[..., list[AcademicItemModel]], tuple[Any, ...]], None, None]:
+        if self.file_format == 'wos':
+            if not _is_wos_plain_text(source):
+                self.logger.warning(f'{source} is not a plain text WoS file, reading it sequentially.')
+                yield _parse_wos_file, (source, self.project_id)
+                return
+            for text in _chunks_wos(source, self.chunk_size):
+                yield _parse_wos, (text, self.project_id)
+
+        elif self.file_format == 'scopus-csv':
+            for rows in _chunks_scopus_csv(source, self.chunk_size):
+                yield _parse_scopus_csv, (rows, self.project_id)
+
+        elif self.file_format == 'bibtex':
+            if _has_bibtex_strings(source):
+                self.logger.warning(f'{source} contains @string macros, reading it sequentially.')
+                yield _parse_bibtex, (source.read_text(), self.project_id)
+                return
+            for text in _chunks_bibtex(source, self.chunk_size):
+                yield _parse_bibtex, (text, self.project_id)
+
+        elif self.file_format == 'jsonl':
+            for lines in _chunks_jsonl(source, self.chunk_size):
+                yield _parse_jsonl, (lines, self.project_id, self.api)
+
+        else:
+            raise ValueError(f'Unknown file format: {self.file_format}')
+
+    def _tasks(self) -> Generator[tuple[Callable[..., list[AcademicItemModel]], tuple[Any, ...]], None, None]:
+        self.logger.info(f'Proceeding to read from {len(self.sources)} files!')
+        for source in self.sources:
+            self.logger.info(f'Reading from file: {source}')
+            yield from self._chunks(Path(source))
+
+    def _results(self, executor: Executor) -> Generator[list[AcademicItemModel], None, None]:
+        # Keep a few chunks per process in flight, so workers never idle but we don't read the whole file into memory
+        max_pending = 2 * self.processes
+        pending: deque[Future[list[AcademicItemModel]]] = deque()
+        try:
+            for func, args in self._tasks():
+                pending.append(executor.submit(func, *args))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def __call__(self) -> Generator[AcademicItemModel, None, None]:
+        if self.processes <= 1:
+            results: Generator[list[AcademicItemModel], None, None] = (func(*args) for func, args in self._tasks())
+            yield from self._with_ids(results)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            yield from self._with_ids(self._results(executor))
+
+    @classmethod
+    def _with_ids(cls, results: Generator[list[AcademicItemModel], None, None]) -> Generator[AcademicItemModel, None, None]:
+        for items in results:
+            for item in items:
+                if item.item_id is None:
+                    item.item_id = uuid.uuid4()
+                yield item
@@ -95,78 +95,81 @@ def read_scopus_csv_file(filepath: str, project_id: str | uuid.UUID | None = Non
         csv.field_size_limit(sys.maxsize)
         reader = csv.DictReader(csvfile)
         for row in reader:
-            doi: str | None = _get(row, 'DOI')
-            if doi is not None:
-                doi = doi.replace('https://doi.org/', '')
-
-            meta_info: dict[str, str | list[str]] = {
-                key: _get(row, key)  # type: ignore[misc]
-                for key in [
-                    'Volume',
-                    'Issue',
-                    'Art. No.',
-                    'Page start',
-                    'Page end',
-                    'Page count',
-                    'Cited by',
-                    'Editors',
-                    'Publisher',
-                    'ISSN',
-                    'ISBN',
-                    'CODEN',
-                    'Language of Original Document',
-                    'Document Type',
-                    'Publication Stage',
-                    'Open Access',
-                ]
-                if _get(row, key) is not None
+            yield translate_scopus_csv_row(row, project_id=project_id)
+
+
+def translate_scopus_csv_row(row: dict[str, str], project_id: str | uuid.UUID | None = None) -> AcademicItemModel:
+    doi: str | None = _get(row, 'DOI')
+    if doi is not None:
+        doi = doi.replace('https://doi.org/', '')
+
+    meta_info: dict[str, str | list[str]] = {
+        key: _get(row, key)  # type: ignore[misc]
+        for key in [
+            'Volume',
+            'Issue',
+            'Art. No.',
+            'Page start',
+            'Page end',
+            'Page count',
+            'Cited by',
+            'Editors',
+            'Publisher',
+            'ISSN',
+            'ISBN',
+            'CODEN',
+            'Language of Original Document',
+            'Document Type',
+            'Publication Stage',
+            'Open Access',
+        ]
+        if _get(row, key) is not None
+    }
+
+    # Unfortunately, there's no good way to associate affiliations to authors,
+    # so at least remember all unique affiliations in the meta-data
+    if _get(row, 'Affiliations') is not None:
+        meta_info['affiliations'] = list(
+            {
+                aff.strip()
+                for aff in _get(row, 'Affiliations').split(';')  # type: ignore[union-attr]
             }
-
-            # Unfortunately, there's no good way to associate affiliations to authors,
-            # so at least remember all unique affiliations in the meta-data
-            if _get(row, 'Affiliations') is not None:
-                meta_info['affiliations'] = list(
-                    {
-                        aff.strip()
-                        for aff in _get(row, 'Affiliations').split(';')  # type: ignore[union-attr]
-                    }
-                )
-
-            keywords = None
-            if _get(row, 'Author Keywords') is not None:
-                keywords = [
-                    kw.strip()
-                    for kw in _get(row, 'Author Keywords').split(';')  # type: ignore[union-attr]
-                    if len(kw.strip()) > 0
-                ]
-
-            title = _get(row, 'Titles')
-            title_slug = str_to_title_slug(title)
-            if title is None:
-                title = _get(row, 'Title')
-                title_slug = str_to_title_slug(title)
-
-            authors = _parse_authors(row)
-
-            py: int | None = None
-            if _get(row, 'Year') is not None:
-                py = int(_get(row, 'Year'))  # type: ignore[arg-type]
-
-            doc = AcademicItemModel(
-                project_id=project_id,
-                scopus_id=_get(row, 'EID'),
-                doi=doi,
-                title=title,
-                text=_get(row, 'Abstract'),
-                publication_year=py,
-                keywords=keywords,
-                pubmed_id=_get(row, 'PubMed ID'),
-                title_slug=title_slug,
-                source=_get(row, 'Source title'),
-                authors=authors,
-                meta={'scopus-csv': clear_empty(meta_info)},
-            )
-            yield doc
+        )
+
+    keywords = None
+    if _get(row, 'Author Keywords') is not None:
+        keywords = [
+            kw.strip()
+            for kw in _get(row, 'Author Keywords').split(';')  # type: ignore[union-attr]
+            if len(kw.strip()) > 0
+        ]
+
+    title = _get(row, 'Titles')
+    title_slug = str_to_title_slug(title)
+    if title is None:
+        title = _get(row, 'Title')
+        title_slug = str_to_title_slug(title)
+
+    authors = _parse_authors(row)
+
+    py: int | None = None
+    if _get(row, 'Year') is not None:
+        py = int(_get(row, 'Year'))  # type: ignore[arg-type]
+
+    return AcademicItemModel(
+        project_id=project_id,
+        scopus_id=_get(row, 'EID'),
+        doi=doi,
+        title=title,
+        text=_get(row, 'Abstract'),
+        publication_year=py,
+        keywords=keywords,
+        pubmed_id=_get(row, 'PubMed ID'),
+        title_slug=title_slug,
+        source=_get(row, 'Source title'),
+        authors=authors,
+        meta={'scopus-csv': clear_empty(meta_info)},
+    )
 
 
 # Based on
@@ -1,17 +1,26 @@
-from typing import Iterator
+from typing import Any, Callable, Iterator, Literal
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 
+from scipy.special import betaln, logsumexp
 from scipy.stats import hypergeom, nchypergeom_wallenius
 import numpy as np
 import numpy.typing as npt
 
-from nacsos_data.models.annotation_tracker import H0Series
+from nacsos_data.db.schemas import AnnotationTracker
+from nacsos_data.models.annotation_tracker import H0Series, AnnotationTrackerModel
 
 Array = np.ndarray[tuple[int], np.dtype[np.int64]]
 ArrayOrList = Array | list[int]
 ArrayOrListList = Array | list[list[int]]
 
+# How the hypergeometric cdf is evaluated for unbiased urns (bias=1):
+#   - logsum: only the smallest cdf across urns, via log-space cumulative sums of the pmf (see `_hypergeom_cdf_min()`)
+#   - scipy: `scipy.stats.hypergeom.cdf` for every urn
+H0Method = Literal['logsum', 'scipy']
 
-def calculate_h0(labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95, bias: float = 1.0) -> float | None:
+
+def calculate_h0(labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95, bias: float = 1.0, method: H0Method = 'logsum') -> float | None:
     """
     Calculates a p-score for our null hypothesis h0, that we have missed our recall target `recall_target`.
 
@@ -26,6 +35,7 @@ def calculate_h0(labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95,
         over the likelihood of drawing a random irrelevant document. The higher
         this is, the better our ML has worked. When this is different to 1,
         we calculate the p score using biased urns.
+    :param method: How to evaluate the hypergeometric cdf for unbiased urns (see `H0Method`)
     :return: p-score for our null hypothesis.
              We can reject the null hypothesis (and stop screening) if p is below 1 - our confidence level.
 
@@ -37,7 +47,20 @@ def calculate_h0(labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95,
 
     # Reverse the list so we can later construct the urns
     urns = labels[::-1]  # Urns of previous 1,2,...,N documents
-    urn_sizes = np.arange(urns.shape[0]) + 1  # The sizes of these urns
+
+    return _calculate_h0(urns.cumsum(), r_seen=r_seen, n_docs=n_docs, recall_target=recall_target, bias=bias, method=method)
+
+
+def _calculate_h0(
+    urn_relevant: npt.NDArray[np.int_], r_seen: int | np.integer[Any], n_docs: int, recall_target: float, bias: float, method: H0Method = 'logsum'
+) -> float | None:
+    """
+    Core of `calculate_h0()`.
+
+    :param urn_relevant: Number of relevant documents in the urns of the previous 1,2,...,N documents
+    :param r_seen: Number of relevant documents we have seen
+    """
+    urn_sizes = np.arange(urn_relevant.shape[0]) + 1  # The sizes of these urns
 
     # Now we calculate k_hat, which is the minimum number of documents there would have to be
     # in each of our urns for the urn to be in keeping with our null hypothesis
@@ -47,23 +70,32 @@ def calculate_h0(labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95,
         + 1  # Divide num of relevant documents by our recall target and add 1  # noqa
         - (
             r_seen  # from this we subtract the total relevant documents seen  # noqa
-            - urns.cumsum()  # before each urn
+            - urn_relevant  # before each urn
         )
     )
 
     # Test the null hypothesis that a given recall target has been missed
     p: npt.NDArray[np.float64]
-    if bias == 1:
+    if bias == 1 and method == 'logsum':
+        # Same test, but only the smallest p is computed
+        p_logsum = _hypergeom_cdf_min(
+            urn_relevant,  # the number of relevant documents in the sample
+            n_docs - (urn_relevant.shape[0] - urn_sizes),  # In a population made up out of the urn and all remaining docs
+            k_hat,  # Where K_hat docs in the population are actually relevant
+            urn_sizes,  # After observing this many documents
+        )
+        return None if np.isnan(p_logsum) else p_logsum
+    elif bias == 1:
         p = hypergeom.cdf(  # the probability of observing
-            urns.cumsum(),  # the number of relevant documents in the sample
-            n_docs - (urns.shape[0] - urn_sizes),  # In a population made up out of the urn and all remaining docs
+            urn_relevant,  # the number of relevant documents in the sample
+            n_docs - (urn_relevant.shape[0] - urn_sizes),  # In a population made up out of the urn and all remaining docs
             k_hat,  # Where K_hat docs in the population are actually relevant
             urn_sizes,  # After observing this many documents
         )
     else:
         p = nchypergeom_wallenius.cdf(
-            urns.cumsum(),  # the number of relevant documents in the sample
-            n_docs - (urns.shape[0] - urn_sizes),  # In a population made up out of the urn and all remaining docs
+            urn_relevant,  # the number of relevant documents in the sample
+            n_docs - (urn_relevant.shape[0] - urn_sizes),  # In a population made up out of the urn and all remaining docs
             k_hat,  # Where K_hat docs in the population are actually relevant
             urn_sizes,  # After observing this many documents
             bias,  # Where we are bias times more likely to pick a random relevant document
@@ -77,6 +109,147 @@ def calculate_h0(labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95,
     return p_min
 
 
+def _log_binom(n: npt.NDArray[Any], k: npt.NDArray[Any]) -> npt.NDArray[np.float64]:
+    # log(n choose k)
+    return -np.log1p(n) - betaln(n - k + 1, k + 1)  # type: ignore[no-any-return]
+
+
+def _hypergeom_cdf_min(k: npt.NDArray[Any], M: npt.NDArray[Any], n: npt.NDArray[Any], N: npt.NDArray[Any], block: int = 64) -> float:
+    """
+    Smallest central hypergeometric cdf across many parameter sets, same parametrisation and result as
+    `hypergeom.cdf(k, M, n, N).min()` (NaN if any parameter set is invalid).
+
+    The pmf of each parameter set is summed in log-space, starting at the lower end of its support and advancing
+    `block` terms at a time using the ratio of consecutive pmf terms. Partial sums only grow, so parameter sets whose partial
+    sum already exceeds the smallest completed cdf cannot be the minimum and are dropped early.
+    """
+    if k.shape[0] == 0:
+        raise ValueError('Need at least one urn to compute the cdf for.')
+    if np.any((n < 0) | (n > M) | (N < 0) | (N > M)):
+        return np.nan
+
+    k = k.astype(np.float64)
+    lo = np.maximum(0, N - (M - n))  # Fewest relevant documents that can be in the sample
+    if np.any(k < lo):
+        return 0.0
+
+    log_pmf = _log_binom(n, lo) + _log_binom(M - n, N - lo) - _log_binom(M, N)
+    log_cdf = log_pmf.copy()
+    i = lo.astype(np.float64)
+    best = np.inf
+    steps = np.arange(block)
+    active = np.arange(k.shape[0])
+    while active.shape[0] > 0:
+        done = i[active] >= k[active]
+        if done.any():
+            best = min(best, log_cdf[active[done]].min())
+        active = active[~done & (log_cdf[active] < best)]
+        if active.shape[0] == 0:
+            break
+
+        # pmf(j + 1) / pmf(j) = (n - j)(N - j) / ((j + 1)(M - n - N + j + 1))
+        j = i[active, None] + steps[None, :]
+        valid = j < k[active, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_ratio = (
+                np.log(n[active, None] - j) + np.log(N[active, None] - j) - np.log(j + 1) - np.log(M[active, None] - n[active, None] - N[active, None] + j + 1)
+            )
+        log_terms = log_pmf[active, None] + np.cumsum(np.where(valid, log_ratio, 0.0), axis=1)
+        log_cdf[active] = np.logaddexp(log_cdf[active], logsumexp(np.where(valid, log_terms, -np.inf), axis=1))
+        log_pmf[active] = log_terms[:, -1]
+        i[active] = np.minimum(i[active] + block, k[active])
+
+    return float(min(np.exp(best), 1.0))
+
+
+class BuscarEstimator:
+    """
+    Incremental computation of the p-score for H0 (see `calculate_h0()`) for a growing sequence of screening labels.
+
+    The estimator keeps the running number of relevant documents, so appending labels does not re-process the history,
+    and remembers the p-scores it computed (or was given via `known`) for each number of seen documents.
+    The p-score after `n` documents only depends on the first `n` labels, so for a sequence that grew at the end,
+    only batch boundaries in the new tail have to be computed.
+    Results are the same as for `calculate_h0s()` and `calculate_h0s_for_batches()`.
+    """
+
+    def __init__(
+        self,
+        n_docs: int,
+        recall_target: float = 0.95,
+        bias: float = 1.0,
+        labels: ArrayOrList | None = None,
+        known: H0Series | None = None,
+        method: H0Method = 'logsum',
+    ):
+        """
+        :param n_docs: Number of documents in the corpus (incl unseen)
+        :param recall_target:
+        :param bias:
+        :param labels: Initial sequence of 0s (exclude) and 1s (include) screening annotations
+        :param known: Previously computed p-scores for this sequence (and these parameters) as (n_seen, p) pairs
+        :param method: How to evaluate the hypergeometric cdf for unbiased urns (see `H0Method`)
+        """
+        self.n_docs = n_docs
+        self.recall_target = recall_target
+        self.bias = bias
+        self.method = method
+        # Number of relevant documents among the first i documents (starting with 0 for i=0)
+        self._relevant: npt.NDArray[np.int_] = np.zeros(1, dtype=np.int_)
+        self._known: dict[int, float | None] = {int(n_seen): p for n_seen, p in known} if known is not None else {}
+        if labels is not None:
+            self.append(labels)
+
+    @property
+    def n_seen(self) -> int:
+        return len(self._relevant) - 1
+
+    def append(self, labels: ArrayOrList) -> None:
+        """
+        Append newly screened labels to the sequence.
+        """
+        new_labels: npt.NDArray[np.int_] = labels if type(labels) is np.ndarray else np.array(labels, dtype=np.int_)
+        self._relevant = np.concatenate((self._relevant, self._relevant[-1] + new_labels.cumsum()))
+
+    def h0(self, n_seen: int | None = None) -> float | None:
+        """
+        p-score for H0 after the first `n_seen` documents (all seen documents if None).
+        """
+        if n_seen is None:
+            n_seen = self.n_seen
+        if n_seen not in self._known:
+            r_seen = self._relevant[n_seen]
+            # Relevant documents in the urns of the previous 1,2,...,N documents
+            urn_relevant = r_seen - self._relevant[:n_seen][::-1]
+            self._known[n_seen] = _calculate_h0(
+                urn_relevant, r_seen=r_seen, n_docs=self.n_docs, recall_target=self.recall_target, bias=self.bias, method=self.method
+            )
+        return self._known[n_seen]
+
+    def h0s(self, batch_size: int = 100) -> Iterator[tuple[int, float | None]]:
+        """
+        p-score for H0 after each set of `batch_size` labels (see `calculate_h0s()`).
+        """
+        for n_seen_batch in range(batch_size, self.n_seen, batch_size):
+            p_h0 = self.h0(n_seen_batch)
+            yield n_seen_batch, p_h0
+
+            if p_h0 is not None and p_h0 < (1.0 - self.recall_target):
+                break
+        else:  # Called, when we didn't break (did not meet the target)
+            # There might be one more step if n_seen is not a multiple of batch_size
+            yield self.n_seen, self.h0(self.n_seen)
+
+    def h0s_for_batches(self, batch_sizes: list[int]) -> Iterator[tuple[int, float | None]]:
+        """
+        p-score for H0 after each batch of the given sizes (see `calculate_h0s_for_batches()`).
+        """
+        pos = 0
+        for batch_size in batch_sizes:
+            pos += batch_size
+            yield pos, self.h0(pos)
+
+
 def calculate_h0s(
     labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95, bias: float = 1.0, batch_size: int = 100
 ) -> Iterator[tuple[int, float | None]]:
@@ -90,19 +263,7 @@ def calculate_h0s(
     :param batch_size: H0 will be calculated after each batch
     :return:
     """
-    labels: Array = labels_ if type(labels_) is np.ndarray else np.array(labels_, dtype=np.int_)
-    n_seen = labels.shape[0]
-    for n_seen_batch in range(batch_size, n_seen, batch_size):
-        batch_labels = labels[:n_seen_batch]
-        p_h0 = calculate_h0(batch_labels, n_docs=n_docs, bias=bias, recall_target=recall_target)
-        yield n_seen_batch, p_h0
-
-        if p_h0 is not None and p_h0 < (1.0 - recall_target):
-            break
-    else:  # Called, when we didn't break (did not meet the target)
-        # There might be one more step if n_seen is not a multiple of batch_size
-        p_h0 = calculate_h0(labels, n_docs=n_docs, bias=bias, recall_target=recall_target)
-        yield n_seen, p_h0
+    yield from BuscarEstimator(n_docs=n_docs, recall_target=recall_target, bias=bias, labels=labels_).h0s(batch_size=batch_size)
 
 
 def calculate_h0s_for_batches(labels: list[list[int]], n_docs: int, recall_target: float = 0.95, bias: float = 1.0) -> Iterator[tuple[int, float | None]]:
@@ -118,14 +279,8 @@ def calculate_h0s_for_batches(labels: list[list[int]], n_docs: int, recall_targe
     :param bias:
     :return:
     """
-    pos = 0
-    seen_labels = []
-    for batch_labels in labels:
-        seen_labels += batch_labels
-        p_h0: float | None = calculate_h0(seen_labels, n_docs=n_docs, bias=bias, recall_target=recall_target)
-
-        pos += len(batch_labels)
-        yield pos, p_h0
+    estimator = BuscarEstimator(n_docs=n_docs, recall_target=recall_target, bias=bias, labels=[label for batch_labels in labels for label in batch_labels])
+    yield from estimator.h0s_for_batches([len(batch_labels) for batch_labels in labels])
 
 
 def calculate_stopping_metric_for_batches(
@@ -145,6 +300,41 @@ def calculate_stopping_metric_for_batches(
     return p_h0s, compute_recall(labels[-1])
 
 
+def update_tracker_buscar(tracker: AnnotationTrackerModel | AnnotationTracker, labels: list[list[int]], reuse: bool = True) -> None:
+    """
+    Update `labels`, `recall`, and `buscar` of an annotation tracker for a new sequence of labels (one list per source).
+
+    If the sequence only grew at the end and the BUSCAR parameters (`n_items_total`, `recall_target`, `bias`) did not change
+    since the last update (see `buscar_params`), p-scores in the stored `buscar` series are reused and only batch boundaries
+    in the new tail are computed.
+
+    :param tracker: Tracker (pydantic model or ORM object) to update in-place
+    :param labels: array of arrays of 0s (exclude) and 1s (include) screening annotations
+    :param reuse: Reuse p-scores stored in the tracker if possible
+    :return:
+    """
+    params = {'n_items_total': tracker.n_items_total, 'recall_target': tracker.recall_target, 'bias': tracker.bias}
+    flat_labels = [label for batch_labels in labels for label in batch_labels]
+
+    known: H0Series | None = None
+    if reuse and tracker.labels is not None and tracker.buscar is not None and tracker.buscar_params == params:
+        # Stored p-scores are only valid if all previously seen labels are unchanged
+        # (batch borders may have moved, so compare the flat sequences)
+        flat_old = [label for batch_labels in tracker.labels for label in batch_labels]
+        if flat_labels[: len(flat_old)] == flat_old:
+            known = tracker.buscar
+
+    estimator = BuscarEstimator(n_docs=tracker.n_items_total, recall_target=tracker.recall_target, bias=tracker.bias, labels=flat_labels, known=known)
+    if tracker.batch_size <= 0:
+        # Use the borders of sources as batches
+        tracker.buscar = list(estimator.h0s_for_batches([len(batch_labels) for batch_labels in labels]))
+    else:
+        tracker.buscar = list(estimator.h0s(batch_size=tracker.batch_size))
+    tracker.buscar_params = params
+    tracker.recall = compute_recall(flat_labels)
+    tracker.labels = labels
+
+
 def calculate_stopping_metric(
     labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95, bias: float = 1.0, batch_size: int = 100
 ) -> tuple[H0Series, list[float | None]]:
@@ -178,11 +368,21 @@ def compute_recall(labels_: ArrayOrList) -> list[float | None]:
     return [ri if not np.isnan(ri) else None for ri in recall_lst]
 
 
+def _map_h0(func: Callable[[Any], float | None], args: list[Any], processes: int | None) -> Iterator[float | None]:
+    # Evaluate lazily in this process or (eagerly) in a pool of `processes` worker processes, results are in order of `args`
+    if processes is None or processes <= 1:
+        yield from (func(arg) for arg in args)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(func, args, chunksize=max(1, len(args) // (4 * processes)))
+
+
 def recall_frontier(
     labels_: ArrayOrList,
     n_docs: int,
     bias: float = 1.0,
     max_iter: int = 150,
+    processes: int | None = None,
 ) -> tuple[list[float], list[float]]:
     """
     Calculates a p-score for our null hypothesis h0, that we have missed our recall target `recall_target`, across a range of recall_targets.
@@ -197,31 +397,37 @@ def recall_frontier(
         this is, the better our ML has worked. When this is different to 1,
         we calculate the p score using biased urns.
     :param max_iter: Fuse to prevent endless loop
+    :param processes: If set, compute p-scores for recall targets in parallel with this many worker processes
     :return: A dictionary containing a list of recall targets: `recall_target`.
         alongside a list of p-scores: `p`.
     """
+    labels: npt.NDArray[np.int_] = labels_ if type(labels_) is np.ndarray else np.array(labels_, dtype=np.int_)
 
+    candidates: list[float] = []
     recall_target = 0.99
+    while recall_target > 0 and len(candidates) < max_iter:
+        candidates.append(recall_target)
+        recall_target -= 0.005
+
     recall_targets: list[float] = []
     p_scores: list[float] = []
-    it = 0
-    while recall_target > 0:
-        it += 1
-        if it > max_iter:
-            break
-        p = calculate_h0(labels_, n_docs, recall_target, bias)
-
+    for recall_target, p in zip(candidates, _map_h0(partial(calculate_h0, labels, n_docs, bias=bias), candidates, processes), strict=True):
         if p is not None:
             p_scores.append(p)
             recall_targets.append(recall_target)
 
-        recall_target -= 0.005
-
     return recall_targets, p_scores
 
 
 def retrospective_h0(
-    labels_: ArrayOrList, n_docs: int, recall_target: float = 0.95, bias: float = 1.0, batch_size: int = 1000, confidence_level: float = 0.95
+    labels_: ArrayOrList,
+    n_docs: int,
+    recall_target: float = 0.95,
+    bias: float = 1.0,
+    batch_size: int = 1000,
+    confidence_level: float = 0.95,
+    early_stop: bool = False,
+    processes: int | None = None,
 ) -> tuple[list[int], list[float]]:
     """
     Calculates a p-score for our null hypothesis h0, that we have missed our recall target `recall_target`, every `batch_size` documents
@@ -240,8 +446,10 @@ def retrospective_h0(
     :param batch_size: The size of the batches for which we will calculate our
         stopping criteria. Smaller batches = greater granularity = more
         computation time.
-    :param confidence_level: The score will be calculated until p is smaller
+    :param confidence_level: With `early_stop`, the score will be calculated until p is smaller
         than 1-`confidence_level`
+    :param early_stop: Stop once p is smaller than 1-`confidence_level` (otherwise, the score is calculated for all batches)
+    :param processes: If set, compute p-scores for batches in parallel with this many worker processes
     :return: A dictionary containing a list of batch sizes: `batch_sizes`.
         alongside a list of p-scores: `p`.
     """
@@ -250,11 +458,13 @@ def retrospective_h0(
     n_seen_batch: list[int] = []
     batch_ps: list[float] = []
 
-    for n_seen in list(range(0, labels.shape[0], batch_size))[1:] + [labels.shape[0]]:
-        batch_labels = labels[:n_seen]
-        p = calculate_h0(batch_labels, n_docs=n_docs, recall_target=recall_target, bias=bias)
+    batches = list(range(0, labels.shape[0], batch_size))[1:] + [labels.shape[0]]
+    h0 = partial(calculate_h0, n_docs=n_docs, recall_target=recall_target, bias=bias)
+    for n_seen, p in zip(batches, _map_h0(h0, [labels[:n_seen] for n_seen in batches], processes), strict=True):
         if p is not None:
             n_seen_batch.append(n_seen)
             batch_ps.append(p)
+            if early_stop and p < (1.0 - confidence_level):
+                break
 
     return n_seen_batch, batch_ps
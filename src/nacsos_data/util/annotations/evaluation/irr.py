@@ -16,6 +16,14 @@ from nacsos_data.models.annotation_quality import AnnotationQualityModel
 from nacsos_data.models.annotations import AnnotationSchemeModel, FlatLabel, AnnotationSchemeLabelTypes
 from nacsos_data.util.annotations.label_transform import get_annotations, annotations_to_sequence, SortedAnnotationLabel
 from nacsos_data.util.annotations.validation import labels_from_scheme
+from nacsos_data.util.annotations.evaluation.irr_tensor import (
+    COUNT_METRICS,
+    annotation_tensor,
+    multi_rater_kappas,
+    pairwise_kappas,
+    pairwise_tables,
+    table_statistics,
+)
 from nacsos_data.util.errors import NotFoundError
 
 logger = logging.getLogger('nacsos_data.util.annotations.evaluation.irr')
@@ -24,6 +32,9 @@ AnnotationRaw: TypeAlias = int | list[int] | None
 AnnotationsRaw: TypeAlias = list[int | None] | list[list[int] | None]
 Annotation: TypeAlias = int | list[int]
 Annotations: TypeAlias = list[int] | list[list[int]]
+AnnotationMap: TypeAlias = dict[str, dict[str, dict[str, SortedAnnotationLabel]]]
+
+IRREngine = Literal['pairwise', 'tensor']
 
 
 def get_value_raw(annotation: SortedAnnotationLabel | None, label: FlatLabel) -> AnnotationRaw:
@@ -320,11 +331,15 @@ def aggregate_qualities(
     resolution_id: str | uuid.UUID | None,
     project_id: str | uuid.UUID | None,
     user_annotations_raw: dict[str, list[int | None]] | None = None,
+    kappas: tuple[float | None, float | None, float | None] | None = None,
 ) -> AnnotationQualityModel:
     fleiss = None
     randolph = None
     krippendorff = None
-    if label_kind != 'multi' and user_annotations_raw is not None:
+    if label_kind != 'multi' and kappas is not None:
+        # Multi-rater scores already computed by the caller (Fleiss, Randolph, Krippendorff)
+        fleiss, randolph, krippendorff = kappas
+    elif label_kind != 'multi' and user_annotations_raw is not None:
         fleiss = compute_fleiss(user_annotations_raw, method='fleiss')
         randolph = compute_fleiss(user_annotations_raw, method='randolph')
         krippendorff = compute_krippendorff(user_annotations_raw, 'nominal')
@@ -380,6 +395,7 @@ async def compute_irr_scores(  # noqa: C901
     resolution_id: str | uuid.UUID | None = None,
     project_id: str | uuid.UUID | None = None,
     include_key: str = '-[include]-',
+    engine: IRREngine = 'tensor',
 ) -> list[AnnotationQualityModel]:
     scheme: AnnotationSchemeModel | None = await read_annotation_scheme_for_scope(assignment_scope_id=assignment_scope_id, session=session)
     if not scheme:
@@ -399,7 +415,7 @@ async def compute_irr_scores(  # noqa: C901
         labels.append(
             FlatLabel(path=[], repeat=1, path_key=f'{include_key}|1', name='Inclusion Rule', key=include_key, required=True, max_repeat=1, kind='bool')
         )
-    annotation_map: dict[str, dict[str, dict[str, SortedAnnotationLabel]]] = {}
+    annotation_map: AnnotationMap = {}
     annotators = []
     item_order = []
     for ai, annotation in enumerate(annotations):
@@ -424,6 +440,76 @@ async def compute_irr_scores(  # noqa: C901
 
     logger.debug(annotators)
 
+    return irr_scores_from_annotations(
+        labels=labels,
+        annotation_map=annotation_map,
+        annotators=annotators,
+        item_order=item_order,
+        assignment_scope_id=assignment_scope_id,
+        resolution_id=resolution_id,
+        project_id=project_id,
+        engine=engine,
+    )
+
+
+def irr_scores_from_annotations(
+    labels: list[FlatLabel],
+    annotation_map: AnnotationMap,
+    annotators: list[str],
+    item_order: list[str],
+    assignment_scope_id: str | uuid.UUID,
+    resolution_id: str | uuid.UUID | None = None,
+    project_id: str | uuid.UUID | None = None,
+    engine: IRREngine = 'tensor',
+) -> list[AnnotationQualityModel]:
+    """
+    Compute inter-rater reliability scores for all pairs of annotators (and aggregates across all annotators).
+
+    Engines:
+      - `pairwise`: loops over all pairs of users, labels, and choices and computes each metric separately
+      - `tensor`: builds one (label × item × user) tensor and computes the metrics for all pairs at once
+                  from their contingency tables (see `irr_tensor`); results are the same
+
+    :param labels: Labels to compute scores for (`str` and `float` labels are skipped)
+    :param annotation_map: item_id -> user -> label key -> annotation
+    :param annotators: Users (pairs are formed in this order)
+    :param item_order: Items (order of `annotations_base` and `annotations_target`)
+    :param assignment_scope_id:
+    :param resolution_id:
+    :param project_id:
+    :param engine:
+    :return:
+    """
+    if engine == 'tensor':
+        return _irr_scores_tensor(
+            labels=labels,
+            annotation_map=annotation_map,
+            annotators=annotators,
+            item_order=item_order,
+            assignment_scope_id=assignment_scope_id,
+            resolution_id=resolution_id,
+            project_id=project_id,
+        )
+    return _irr_scores_pairwise(
+        labels=labels,
+        annotation_map=annotation_map,
+        annotators=annotators,
+        item_order=item_order,
+        assignment_scope_id=assignment_scope_id,
+        resolution_id=resolution_id,
+        project_id=project_id,
+    )
+
+
+def _irr_scores_pairwise(  # noqa: C901
+    labels: list[FlatLabel],
+    annotation_map: AnnotationMap,
+    annotators: list[str],
+    item_order: list[str],
+    assignment_scope_id: str | uuid.UUID,
+    resolution_id: str | uuid.UUID | None,
+    project_id: str | uuid.UUID | None,
+) -> list[AnnotationQualityModel]:
     qualities: list[AnnotationQualityModel] = []
     for label in labels:
         logger.debug(f'Computing IRR for label {label.path_key}')
@@ -581,3 +667,139 @@ async def compute_irr_scores(  # noqa: C901
             )
 
     return qualities
+
+
+def _metric_rows(stats: dict[str, np.ndarray[Any, Any]]) -> list[dict[str, Any]]:
+    # Metrics per pair as keyword arguments for `AnnotationQualityModel` (floats, None if undefined)
+    n_rows = len(next(iter(stats.values())))
+    return [{key: float(values[ri]) if key in COUNT_METRICS else fix(values[ri]) for key, values in stats.items()} for ri in range(n_rows)]
+
+
+def _irr_scores_tensor(  # noqa: C901
+    labels: list[FlatLabel],
+    annotation_map: AnnotationMap,
+    annotators: list[str],
+    item_order: list[str],
+    assignment_scope_id: str | uuid.UUID,
+    resolution_id: str | uuid.UUID | None,
+    project_id: str | uuid.UUID | None,
+) -> list[AnnotationQualityModel]:
+    supported: list[FlatLabel] = []
+    for label in labels:
+        if label.kind == 'str' or label.kind == 'float':
+            logger.info(f'Skipping label {label.path_key} for scope {assignment_scope_id} because "{label.kind}" is not supported!')
+        else:
+            supported.append(label)
+
+    annotations_raw: list[dict[str, list[Any]]] = [
+        {annotator: [get_value_raw(annotation_map[item_id].get(annotator, {}).get(label.key), label) for item_id in item_order] for annotator in annotators}
+        for label in supported
+    ]
+    if len(annotators) == 0:
+        return []
+
+    scalar_labels = [li for li, label in enumerate(supported) if label.kind != 'multi']
+    codes, values = annotation_tensor([annotations_raw[li] for li in scalar_labels], users=annotators, n_items=len(item_order))
+    tensor_index = {li: ti for ti, li in enumerate(scalar_labels)}
+
+    qualities: list[AnnotationQualityModel] = []
+    for li, label in enumerate(supported):
+        logger.debug(f'Computing IRR for label {label.path_key}')
+        user_annotations_raw = annotations_raw[li]
+        choices = label.choices or []
+
+        kappas: tuple[float | None, float | None, float | None] | None = None
+        memberships: list[np.ndarray[Any, np.dtype[np.int64]]] = []
+        if label.kind == 'multi':
+            present = np.array([[-1 if v is None else 0 for v in user_annotations_raw[user]] for user in annotators], dtype=np.int64).T
+            base_users, target_users, _, _ = pairwise_tables(present, 1)
+            if len(base_users) == 0:
+                continue
+            pair_rows: list[dict[str, Any]] = []
+            for ub, ut in zip(base_users, target_users, strict=True):
+                base, target = get_overlap(user_annotations_raw[annotators[ub]], user_annotations_raw[annotators[ut]])
+                num_agree, num_disagree, perc_agree = compute_agreement(base, target)
+                overlap_mean, overlap_median, overlap_std = compute_multi_overlap(base, target)  # type: ignore[arg-type] # FIXME
+                pair_rows.append(
+                    {
+                        'num_overlap': float(len(base)),
+                        'num_agree': float(num_agree),
+                        'num_disagree': float(num_disagree),
+                        'perc_agree': perc_agree,
+                        'multi_overlap_mean': overlap_mean,
+                        'multi_overlap_median': overlap_median,
+                        'multi_overlap_std': overlap_std,
+                    }
+                )
+            for choice in choices:
+                memberships.append(
+                    np.array([[-1 if v is None else int(choice.value in v) for v in user_annotations_raw[user]] for user in annotators], dtype=np.int64).T
+                )
+        else:
+            ti = tensor_index[li]
+            base_users, target_users, tables, user_counts = pairwise_tables(codes[ti], len(values[ti]))
+            if len(base_users) == 0:
+                continue
+            stats = table_statistics(tables, values[ti], average='binary' if label.kind == 'bool' else 'macro')
+            stats['fleiss'], stats['randolph'], stats['krippendorff'] = pairwise_kappas(tables, user_counts[base_users], user_counts[target_users])
+            pair_rows = _metric_rows(stats)
+            kappas = multi_rater_kappas(codes[ti], len(values[ti]))
+            for choice in choices:
+                memberships.append(np.where(codes[ti] < 0, -1, values[ti][codes[ti]] == int(choice.value)).astype(np.int64))
+
+        # Same missing annotations as for the label itself, so the pairs line up
+        choice_rows = [_metric_rows(table_statistics(pairwise_tables(membership, 2)[2], np.array([0, 1]), average='binary')) for membership in memberships]
+
+        label_qualities: list[AnnotationQualityModel] = []
+        choice_qualities: dict[int, list[AnnotationQualityModel]] = {}
+        for pi, (ub, ut) in enumerate(zip(base_users, target_users, strict=True)):
+            user_base, user_target = annotators[ub], annotators[ut]
+            pair: dict[str, Any] = {
+                'assignment_scope_id': assignment_scope_id,
+                'bot_annotation_metadata_id': resolution_id,
+                'project_id': project_id,
+                'user_base': user_base,
+                'annotations_base': user_annotations_raw[user_base],
+                'user_target': user_target,
+                'annotations_target': user_annotations_raw[user_target],
+                'label_key': label.key,
+                'num_items': float(len(item_order)),
+            }
+            # Values are already of the right type, skip validation of the (long) annotation lists for every pair
+            quality = AnnotationQualityModel.model_construct(**pair, label_value=None, **pair_rows[pi])
+            qualities.append(quality)
+            label_qualities.append(quality)
+
+            for choice, rows in zip(choices, choice_rows, strict=True):
+                choice_quality = AnnotationQualityModel.model_construct(**pair, label_value=int(choice.value), **rows[pi])
+                qualities.append(choice_quality)
+                choice_qualities.setdefault(choice.value, []).append(choice_quality)
+
+        if len(label_qualities) > 0:
+            qualities.append(
+                aggregate_qualities(
+                    label_qualities,
+                    label_kind=label.kind,
+                    label_key=label.key,
+                    label_value=None,
+                    project_id=project_id,
+                    resolution_id=resolution_id,
+                    assignment_scope_id=assignment_scope_id,
+                    kappas=kappas,
+                )
+            )
+        for label_value, label_choice_qualities in choice_qualities.items():
+            qualities.append(
+                aggregate_qualities(
+                    label_choice_qualities,
+                    label_kind=label.kind,
+                    label_key=label.key,
+                    label_value=label_value,
+                    project_id=project_id,
+                    resolution_id=resolution_id,
+                    assignment_scope_id=assignment_scope_id,
+                    kappas=kappas,
+                )
+            )
+
+    return qualities
@@ -0,0 +1,285 @@
+from typing import Any, Literal, TypeAlias
+
+import numpy as np
+from scipy.stats import beta, kendalltau, norm, t as student_t
+
+IntArray: TypeAlias = np.ndarray[Any, np.dtype[np.int64]]
+FloatArray: TypeAlias = np.ndarray[Any, np.dtype[np.float64]]
+
+# Metrics in `table_statistics()` that are counts (all others are floats, NaN if undefined)
+COUNT_METRICS = {'num_overlap', 'num_agree', 'num_disagree'}
+
+
+def annotation_tensor(annotations: list[dict[str, list[int | None]]], users: list[str], n_items: int) -> tuple[IntArray, list[IntArray]]:
+    """
+    Stack the raw annotations (one dict per label, see `get_value_raw()`) into one (label × item × user) integer tensor.
+    Values of each label are mapped to 0, 1, 2, ... in ascending order of the raw value; -1 marks missing annotations.
+
+    :param annotations: Raw annotations per label and user (lists aligned to the same item order)
+    :param users: Users (order of the last axis)
+    :param n_items: Number of items
+    :return: Tensor of value indices and the raw values per label
+    """
+    codes = np.full((len(annotations), n_items, len(users)), -1, dtype=np.int64)
+    values: list[IntArray] = []
+    for li, label_annotations in enumerate(annotations):
+        label_values = sorted({v for user in users for v in label_annotations[user] if v is not None})
+        index = {v: vi for vi, v in enumerate(label_values)}
+        for ui, user in enumerate(users):
+            codes[li, :, ui] = [-1 if v is None else index[v] for v in label_annotations[user]]
+        values.append(np.array(label_values, dtype=np.int64))
+    return codes, values
+
+
+def pairwise_tables(codes: IntArray, n_values: int) -> tuple[IntArray, IntArray, IntArray, IntArray]:
+    """
+    Contingency tables for all pairs of users (base before target, same order as iterating `users[i]`, `users[i + 1:]`)
+    computed at once from the one-hot encoded (item × user) matrix of value indices.
+    Pairs without overlapping annotations are dropped.
+
+    :param codes: (item × user) matrix of value indices, -1 for missing annotations
+    :param n_values: Number of distinct values
+    :return: Index of base and target user, (pair × value × value) contingency tables (rows: base, columns: target),
+             and (user × value) number of annotations per user and value
+    """
+    n_items, n_users = codes.shape
+    onehot = np.zeros((n_items, n_users, n_values))
+    rows, cols = np.nonzero(codes >= 0)
+    onehot[rows, cols, codes[rows, cols]] = 1.0
+
+    flat = onehot.reshape(n_items, n_users * n_values)
+    full = np.rint(flat.T @ flat).astype(np.int64).reshape(n_users, n_values, n_users, n_values).transpose(0, 2, 1, 3)
+
+    base, target = np.triu_indices(n_users, k=1)
+    tables = full[base, target]
+    overlap = tables.sum(axis=(1, 2)) > 0
+    return base[overlap], target[overlap], tables[overlap], onehot.sum(axis=0).astype(np.int64)
+
+
+def table_statistics(tables: IntArray, values: IntArray, average: Literal['macro', 'binary']) -> dict[str, FloatArray]:
+    """
+    Agreement statistics for a stack of contingency tables (pair × value × value; rows: base, columns: target).
+    Equivalent to `compute_agreement()`, `compute_cohen()`, `precision_recall_f1()`, and `compute_correlation()`
+    on the overlapping annotations of each pair; undefined results are NaN.
+
+    :param tables: Contingency tables, see `pairwise_tables()`
+    :param values: Raw values in order of the table rows/columns (ascending)
+    :param average: Averaging for precision/recall/f1 (binary uses 1 as the positive label)
+    :return: Metric name -> value per pair
+    """
+    base_counts = tables.sum(axis=2)
+    target_counts = tables.sum(axis=1)
+    n = base_counts.sum(axis=1)
+    agree = np.trace(tables, axis1=1, axis2=2)
+
+    stats: dict[str, FloatArray] = {'num_overlap': n.astype(np.float64), 'num_agree': agree.astype(np.float64), 'num_disagree': (n - agree).astype(np.float64)}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats['perc_agree'] = (agree / n) * 100
+
+        # Cohen's kappa: 1 - observed / expected disagreement (expected from the marginals)
+        expected = (n * n - (base_counts * target_counts).sum(axis=1)) / n
+        stats['cohen'] = np.where(expected > 0, 1 - (n - agree) / expected, np.nan)
+
+        stats.update(_precision_recall_f1(tables, base_counts, target_counts, values, average))
+        stats.update(_correlations(tables, base_counts, target_counts))
+    return stats
+
+
+def _precision_recall_f1(
+    tables: IntArray, base_counts: IntArray, target_counts: IntArray, values: IntArray, average: Literal['macro', 'binary']
+) -> dict[str, FloatArray]:
+    tp = np.diagonal(tables, axis1=1, axis2=2)
+    if average == 'binary':
+        positive = np.flatnonzero(values == 1)
+        if len(positive) == 0:
+            nans = np.full(tables.shape[0], np.nan)
+            return {'precision': nans, 'recall': nans, 'f1': nans}
+        tp, n_true, n_pred = tp[:, positive[0]], base_counts[:, positive[0]], target_counts[:, positive[0]]
+        undefined = (n_true == 0) | (n_pred == 0)
+        precision = tp / n_pred
+        recall = tp / n_true
+        f1 = 2 * tp / (n_true + n_pred)
+    else:
+        # Macro average over all values used by either user; any undefined value makes the whole average undefined
+        present = (base_counts + target_counts) > 0
+        undefined = (present & ((base_counts == 0) | (target_counts == 0))).any(axis=1)
+        n_labels = present.sum(axis=1)
+        precision = np.where(present, tp / target_counts, 0).sum(axis=1) / n_labels
+        recall = np.where(present, tp / base_counts, 0).sum(axis=1) / n_labels
+        f1 = np.where(present, 2 * tp / (base_counts + target_counts), 0).sum(axis=1) / n_labels
+    return {
+        'precision': np.where(undefined, np.nan, precision),
+        'recall': np.where(undefined, np.nan, recall),
+        'f1': np.where(undefined, np.nan, f1),
+    }
+
+
+def _pearson(tables: IntArray, base_counts: IntArray, target_counts: IntArray, base_scores: FloatArray, target_scores: FloatArray) -> FloatArray:
+    # Pearson correlation of the (implicit) pairs of scores, each table cell stands for `count` identical pairs
+    n = base_counts.sum(axis=1)
+    base_dev = base_scores - ((base_counts * base_scores).sum(axis=1) / n)[:, None]
+    target_dev = target_scores - ((target_counts * target_scores).sum(axis=1) / n)[:, None]
+    cov = np.einsum('pk,pkl,pl->p', base_dev, tables, target_dev)
+    var_base = (base_counts * base_dev * base_dev).sum(axis=1)
+    var_target = (target_counts * target_dev * target_dev).sum(axis=1)
+    correlation: FloatArray = np.clip(cov / np.sqrt(var_base * var_target), -1.0, 1.0)
+    return correlation
+
+
+def _correlations(tables: IntArray, base_counts: IntArray, target_counts: IntArray) -> dict[str, FloatArray]:
+    n = base_counts.sum(axis=1)
+    # Correlations are undefined for constant annotations (this includes a single overlapping item)
+    constant = ((base_counts > 0).sum(axis=1) <= 1) | ((target_counts > 0).sum(axis=1) <= 1)
+
+    # Pearson on values "compressed" to 0, 1, 2, ... (among values used by either user, see `compress_annotations()`)
+    dense = (np.cumsum((base_counts + target_counts) > 0, axis=1) - 1).astype(np.float64)
+    pearson = _pearson(tables, base_counts, target_counts, dense, dense)
+    ab = n / 2 - 1
+    pearson_p = 2 * beta.sf(np.abs(pearson), ab, ab, loc=-1, scale=2)
+    # scipy special-cases two observations
+    pearson = np.where(n == 2, np.sign(pearson), pearson)
+    pearson_p = np.where(n == 2, 1.0, pearson_p)
+
+    # Spearman is pearson on the (average) ranks
+    base_ranks = np.cumsum(base_counts, axis=1) - base_counts + (base_counts + 1) / 2
+    target_ranks = np.cumsum(target_counts, axis=1) - target_counts + (target_counts + 1) / 2
+    spearman = _pearson(tables, base_counts, target_counts, base_ranks, target_ranks)
+    dof = n - 2
+    t = spearman * np.sqrt((dof / ((spearman + 1.0) * (1.0 - spearman))).clip(0))
+    spearman_p = 2 * student_t.sf(np.abs(t), dof)
+
+    kendall, kendall_p = _kendall(tables, base_counts, target_counts)
+
+    return {
+        'pearson': np.where(constant, np.nan, pearson),
+        'pearson_p': np.where(constant, np.nan, pearson_p),
+        'kendall': kendall,
+        'kendall_p': kendall_p,
+        'spearman': np.where(constant, np.nan, spearman),
+        'spearman_p': np.where(constant, np.nan, spearman_p),
+    }
+
+
+def _kendall(tables: IntArray, base_counts: IntArray, target_counts: IntArray) -> tuple[FloatArray, FloatArray]:
+    # Kendall's tau-b with the same tie corrections and p-values as `scipy.stats.kendalltau()`
+    n = base_counts.sum(axis=1).astype(np.float64)
+    tot = n * (n - 1) / 2
+    x_tie, x0, x1 = _tie_counts(base_counts)
+    y_tie, y0, y1 = _tie_counts(target_counts)
+    n_tie = (tables * (tables - 1) // 2).sum(axis=(1, 2))
+
+    # Discordant pairs: base value greater and target value smaller
+    later = np.cumsum(tables[:, ::-1, :], axis=1)[:, ::-1, :] - tables
+    later_below = np.cumsum(later, axis=2) - later
+    dis = (tables * later_below).sum(axis=(1, 2)).astype(np.float64)
+
+    undefined = (x_tie == tot) | (y_tie == tot)
+    con_minus_dis = tot - x_tie - y_tie + n_tie - 2 * dis
+    tau = np.clip(con_minus_dis / np.sqrt(tot - x_tie) / np.sqrt(tot - y_tie), -1.0, 1.0)
+
+    m = n * (n - 1.0)
+    var = (m * (2 * n + 5) - x1 - y1) / 18 + (2 * x_tie * y_tie) / m + x0 * y0 / (9 * m * (n - 2))
+    p = 2 * norm.sf(np.abs(con_minus_dis / np.sqrt(var)))
+
+    # scipy uses the exact distribution for small samples without ties; those are rare here, so delegate
+    exact = ~undefined & (x_tie == 0) & (y_tie == 0) & ((n <= 33) | (np.minimum(dis, tot - dis) <= 1))
+    for pi in np.flatnonzero(exact):
+        rows, cols = np.nonzero(tables[pi])
+        counts = tables[pi][rows, cols]
+        result = kendalltau(np.repeat(rows, counts), np.repeat(cols, counts))
+        tau[pi], p[pi] = result.statistic, result.pvalue
+
+    return np.where(undefined, np.nan, tau), np.where(undefined, np.nan, p)
+
+
+def _tie_counts(counts: IntArray) -> tuple[FloatArray, FloatArray, FloatArray]:
+    c = counts.astype(np.float64)
+    return (
+        (c * (c - 1) / 2).sum(axis=1),
+        (c * (c - 1) * (c - 2)).sum(axis=1),
+        (c * (c - 1) * (2 * c + 5)).sum(axis=1),
+    )
+
+
+def pairwise_kappas(tables: IntArray, base_user_counts: IntArray, target_user_counts: IntArray) -> tuple[FloatArray, FloatArray, FloatArray]:
+    """
+    Fleiss' and Randolph's kappa and Krippendorff's alpha (nominal) for pairs of users.
+    Equivalent to `compute_fleiss()` and `compute_krippendorff()` with `users=[user_base, user_target]`, which
+    also consider items only one of the two users annotated.
+
+    :param tables: Contingency tables of the overlapping annotations, see `pairwise_tables()`
+    :param base_user_counts: (pair × value) number of annotations of the base user per value (on all items)
+    :param target_user_counts: (pair × value) number of annotations of the target user per value (on all items)
+    :return: Fleiss' kappa, Randolph's kappa, Krippendorff's alpha per pair
+    """
+    n = tables.sum(axis=(1, 2))
+    agree = np.trace(tables, axis1=1, axis2=2)
+    n_base = base_user_counts.sum(axis=1)
+    n_target = target_user_counts.sum(axis=1)
+    user_counts = base_user_counts + target_user_counts
+
+    # Items annotated by both contribute 1 (agree) or 0 (disagree), items annotated by only one -0.5
+    p_mean = (agree - 0.5 * (n_base + n_target - 2 * n)) / (n_base + n_target - n)
+    p_cat = user_counts / (n_base + n_target)[:, None]
+    expected_fleiss = (p_cat * p_cat).sum(axis=1)
+    expected_randolph = 1 / (user_counts > 0).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fleiss = np.where(expected_fleiss == 1, 1.0, (p_mean - expected_fleiss) / (1 - expected_fleiss))
+        randolph = np.where(expected_randolph == 1, 1.0, (p_mean - expected_randolph) / (1 - expected_randolph))
+
+        # Coincidences only come from items annotated by both users
+        coincidence_sum = tables.sum(axis=2) + tables.sum(axis=1)
+        n_total = coincidence_sum.sum(axis=1)
+        observed = (n - agree).astype(np.float64)
+        expected = (n_total * n_total - (coincidence_sum * coincidence_sum).sum(axis=1)) / 2
+        krippendorff = np.where(expected == 0, 1.0, 1.0 - (n_total - 1.0) * (observed / expected))
+
+    return fleiss, randolph, krippendorff
+
+
+def multi_rater_kappas(codes: IntArray, n_values: int) -> tuple[float | None, float | None, float | None]:
+    """
+    Fleiss' and Randolph's kappa and Krippendorff's alpha (nominal) across all users.
+    Equivalent to `compute_fleiss()` and `compute_krippendorff()` without `users`.
+
+    :param codes: (item × user) matrix of value indices, -1 for missing annotations
+    :param n_values: Number of distinct values
+    :return: Fleiss' kappa, Randolph's kappa, Krippendorff's alpha
+    """
+    rows, cols = np.nonzero(codes >= 0)
+    table = np.zeros((codes.shape[0], n_values))
+    np.add.at(table, (rows, codes[rows, cols]), 1)
+    table = table[table.sum(axis=1) > 0]
+    table = table[:, table.sum(axis=0) > 0]
+
+    n_sub, n_cat = table.shape
+    if n_sub == 0 or n_cat == 0:
+        return None, None, 1.0
+
+    n_rater = table.sum(axis=1)
+    n_rat = n_rater.max()
+
+    fleiss: float | None = None
+    randolph: float | None = None
+    if n_rat > 1:
+        p_cat = table.sum(axis=0) / table.sum()
+        p_mean = (((table * table).sum(axis=1) - n_rat) / (n_rat * (n_rat - 1.0))).mean()
+        expected_fleiss = (p_cat * p_cat).sum()
+        fleiss = 1.0 if expected_fleiss == 1 else float((p_mean - expected_fleiss) / (1 - expected_fleiss))
+        randolph = 1.0 if n_cat == 1 else float((p_mean - 1 / n_cat) / (1 - 1 / n_cat))
+
+    # Coincidence matrix: each pair of annotations on an item with m annotations counts 1 / (m - 1)
+    multiple = n_rater > 1
+    weights = 1 / (n_rater[multiple] - 1)
+    table = table[multiple]
+    coincidence = np.einsum('ik,il,i->kl', table, table, weights) - np.diag((table * weights[:, None]).sum(axis=0))
+    coincidence_sum = coincidence.sum(axis=0)
+    observed = np.tril(coincidence, k=-1).sum()
+    expected = (coincidence_sum.sum() ** 2 - (coincidence_sum * coincidence_sum).sum()) / 2
+    if expected == 0:
+        return fleiss, randolph, 1.0
+    return fleiss, randolph, float(1.0 - (coincidence_sum.sum() - 1.0) * (observed / expected))
+
+
+__all__ = ['annotation_tensor', 'pairwise_tables', 'table_statistics', 'pairwise_kappas', 'multi_rater_kappas', 'COUNT_METRICS']
@@ -1,7 +1,9 @@
+import json
 import uuid
 import logging
+from pathlib import Path
 from collections import defaultdict
-from typing import Type, TYPE_CHECKING, Generator
+from typing import Any, AsyncGenerator, Type, TYPE_CHECKING, Generator, Literal, Mapping, Sequence
 
 from pydantic import BaseModel
 import sqlalchemy as sa
@@ -21,6 +23,7 @@ from ...models.nql import NQLFilter
 
 if TYPE_CHECKING:
     import pandas as pd
+    import pyarrow as pa
 
 logger = logging.getLogger('nacsos_data.util.annotations.export')
 
@@ -371,21 +374,23 @@ def _generate_keys(key: str, val: dict[str, None | bool | int | list[int]]) -> G
         raise RuntimeError('No annotation in label')
 
 
-@ensure_session_async
-async def wide_export_table(
+def _label_entries(r: Mapping[Any, Any], prefix: dict[str, str]) -> Generator[tuple[str, bool | str], None, None]:
+    for resolution in get(r, 'labels_resolved', default=[]):
+        for k, v in resolution.items():
+            for key, val in _generate_keys(k, v):
+                yield f'res|{prefix.get(k, "")}{key}', val
+    for usr, annotation in get(r, 'labels_unresolved', default={}).items():
+        for k, v in annotation.items():
+            for key, val in _generate_keys(k, v):
+                yield f'{usr}|{prefix.get(k, "")}{key}', val
+
+
+async def _wide_export_stmt(
     session: DBSession | AsyncSession,
     nql_filter: NQLFilter | None,
-    scope_ids: list[str] | list[uuid.UUID],
     project_id: str | uuid.UUID,
     limit: int | None = None,
-    prefix: dict[str, str] | None = None,
-    include_meta: bool = False,
-) -> tuple[list[str], list[str], 'pd.DataFrame']:
-    import pandas as pd
-
-    if prefix is None:
-        prefix = {}
-
+) -> sa.Select:  # type: ignore[type-arg]
     stmt_labels = (
         sa.text("""
                 WITH
@@ -459,7 +464,25 @@ async def wide_export_table(
     )
     if limit:
         stmt = stmt.limit(limit)
+    return stmt
+
+
+@ensure_session_async
+async def wide_export_table(
+    session: DBSession | AsyncSession,
+    nql_filter: NQLFilter | None,
+    scope_ids: list[str] | list[uuid.UUID],
+    project_id: str | uuid.UUID,
+    limit: int | None = None,
+    prefix: dict[str, str] | None = None,
+    include_meta: bool = False,
+) -> tuple[list[str], list[str], 'pd.DataFrame']:
+    import pandas as pd
 
+    if prefix is None:
+        prefix = {}
+
+    stmt = await _wide_export_stmt(session=session, nql_filter=nql_filter, project_id=project_id, limit=limit)
     rslt = (await session.execute(stmt, {'scopes': scope_ids})).mappings().all()
     logger.debug(f'Result lines (limit: {limit}) from DB: {len(rslt):,}')
 
@@ -480,18 +503,7 @@ async def wide_export_table(
                 'publication_date': r.get('publication_date'),
                 'doi': r.get('doi'),
                 'py': r.get('publication_year'),
-                **{
-                    f'res|{prefix.get(k, "")}{key}': val
-                    for resolution in get(r, 'labels_resolved', default=[])
-                    for k, v in resolution.items()
-                    for key, val in _generate_keys(k, v)
-                },
-                **{
-                    f'{usr}|{prefix.get(k, "")}{key}': val
-                    for usr, annotation in get(r, 'labels_unresolved', default={}).items()
-                    for k, v in annotation.items()
-                    for key, val in _generate_keys(k, v)
-                },
+                **dict(_label_entries(r, prefix)),
             }
             for r in rslt
         ],
@@ -525,3 +537,204 @@ async def wide_export_table(
     # df = df.replace({np.nan: None})
 
     return base_cols, label_cols, df.reindex(base_cols + label_cols, axis=1)
+
+
+ExportFormat = Literal['parquet', 'feather']
+
+# Base columns of the wide export table and their type in arrow (`None` = serialised JSON)
+ARROW_BASE_COLUMNS: dict[str, tuple[str, str | None]] = {
+    # name in export: (name in query, arrow type)
+    'scope_order': ('scope_order', 'int16'),
+    'item_order': ('item_order', 'int32'),
+    'item_id': ('item_id', 'string'),
+    'wos_id': ('wos_id', 'string'),
+    'openalex_id': ('openalex_id', 'string'),
+    'scopus_id': ('scopus_id', 'string'),
+    'doi': ('doi', 'string'),
+    'title': ('title', 'string'),
+    'text': ('text', 'string'),
+    'teaser': ('teaser', 'string'),
+    'authors': ('authors', None),
+    'source': ('source', 'string'),
+    'py': ('publication_year', 'int16'),
+}
+
+
+async def _wide_export_columns(
+    session: DBSession | AsyncSession, scope_ids: list[str] | list[uuid.UUID], prefix: dict[str, str]
+) -> tuple[list[str], list[str]]:
+    # All label columns that can appear in the export (from all annotations in the scopes, same joins as the export query)
+    stmt = sa.text("""
+        WITH scopes as (SELECT unnest(:scopes ::uuid[]) as scope_id)
+        SELECT DISTINCT 'res' as owner, ba.key, ba.value_bool, ba.value_int, ba.multi_int, ba.value_str IS NOT NULL as is_str
+        FROM bot_annotation ba
+             JOIN scopes scope ON scope.scope_id = ba.bot_annotation_metadata_id
+        UNION
+        SELECT DISTINCT u.username as owner, a.key, a.value_bool, a.value_int, a.multi_int, a.value_str IS NOT NULL as is_str
+        FROM annotation a
+             JOIN "user" u ON u.user_id = a.user_id
+             JOIN assignment ass ON a.item_id = ass.item_id
+             JOIN scopes scope ON scope.scope_id = ass.assignment_scope_id;
+    """)
+    str_cols: set[str] = set()
+    label_cols: set[str] = set()
+    for row in (await session.execute(stmt, {'scopes': scope_ids})).mappings():
+        val = {'bool': row['value_bool'], 'int': row['value_int'], 'multi': row['multi_int'], 'str': True if row['is_str'] else None}
+        if all(v is None for v in val.values()):
+            continue
+        for key, _ in _generate_keys(row['key'], val):
+            col = f'{row["owner"]}|{prefix.get(row["key"], "")}{key}'
+            (str_cols if '|STR|' in col else label_cols).add(col)
+    return sorted(str_cols), sorted(label_cols)
+
+
+def _arrow_json(value: Any) -> str | None:
+    return None if value is None else json.dumps(value, default=str)
+
+
+def _wide_export_batch(
+    rows: Sequence[Mapping[Any, Any]], base_cols: list[str], str_cols: list[str], label_cols: list[str], schema: 'pa.Schema', prefix: dict[str, str]
+) -> 'pa.RecordBatch':
+    import numpy as np
+    import pyarrow as pa
+
+    n_rows = len(rows)
+    columns: dict[str, Any] = {}
+    for col in base_cols:
+        src, arrow_type = ARROW_BASE_COLUMNS.get(col, (col, None))
+        if arrow_type is None:
+            columns[col] = [_arrow_json(r.get(src)) for r in rows]
+        elif col == 'item_id':
+            columns[col] = [str(r[src]) for r in rows]
+        else:
+            columns[col] = [r.get(src) for r in rows]
+
+    str_values: dict[str, list[str | None]] = {col: [None] * n_rows for col in str_cols}
+    label_index = {col: ci for ci, col in enumerate(label_cols)}
+    # Label values (1 = set, 0 = implicitly not set, -1 = missing)
+    labels = np.full((n_rows, len(label_cols)), -1, dtype=np.int8)
+    groups = sorted({col.split(':')[0] for col in label_cols})
+    group_of = np.array([groups.index(col.split(':')[0]) for col in label_cols], dtype=np.int32)
+    present = np.zeros((n_rows, len(groups)), dtype=bool)
+
+    for ri, r in enumerate(rows):
+        for col, val in _label_entries(r, prefix):
+            if col in str_values:
+                str_values[col][ri] = val  # type: ignore[assignment]
+            elif col in label_index:
+                ci = label_index[col]
+                labels[ri, ci] = 1
+                present[ri, group_of[ci]] = True
+
+    # Setting implicit False values to False (instead of leaving them empty)
+    labels[(labels < 0) & present[:, group_of]] = 0
+
+    arrays = [pa.array(columns[col], type=schema.field(col).type) for col in base_cols]
+    arrays += [pa.array(str_values[col], type=pa.string()) for col in str_cols]
+    arrays += [pa.array(labels[:, ci], mask=labels[:, ci] < 0, type=pa.int8()) for ci in range(len(label_cols))]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+async def wide_export_batches(
+    session: DBSession | AsyncSession,
+    nql_filter: NQLFilter | None,
+    scope_ids: list[str] | list[uuid.UUID],
+    project_id: str | uuid.UUID,
+    limit: int | None = None,
+    prefix: dict[str, str] | None = None,
+    include_meta: bool = False,
+    batch_size: int = 5000,
+) -> tuple[list[str], list[str], 'pa.Schema', AsyncGenerator['pa.RecordBatch', None]]:
+    """
+    Same table as `wide_export_table()`, but streamed from the database (server-side cursor) in typed arrow record batches,
+    so memory does not grow with the number of items.
+    Label columns are determined upfront from all annotations in the scopes (label columns for values that only
+    appear on items excluded by the `nql_filter` or `limit` are empty). JSON columns (authors, meta) are serialised to strings.
+
+    :return: base columns, label columns, arrow schema, and generator of record batches
+    """
+    import pyarrow as pa
+
+    if prefix is None:
+        prefix = {}
+
+    str_cols, label_cols = await _wide_export_columns(session=session, scope_ids=scope_ids, prefix=prefix)
+    base_cols = list(ARROW_BASE_COLUMNS.keys()) + (['meta'] if include_meta else [])
+    schema = pa.schema(
+        [pa.field(col, pa.type_for_alias(ARROW_BASE_COLUMNS[col][1] or 'string') if col in ARROW_BASE_COLUMNS else pa.string()) for col in base_cols]
+        + [pa.field(col, pa.string()) for col in str_cols]
+        + [pa.field(col, pa.int8()) for col in label_cols]
+    )
+    stmt = await _wide_export_stmt(session=session, nql_filter=nql_filter, project_id=project_id, limit=limit)
+
+    async def batches() -> AsyncGenerator['pa.RecordBatch', None]:
+        rslt = (await session.stream(stmt.execution_options(yield_per=batch_size), {'scopes': scope_ids})).mappings().partitions()
+        async for partition in rslt:
+            yield _wide_export_batch(partition, base_cols=base_cols, str_cols=str_cols, label_cols=label_cols, schema=schema, prefix=prefix)
+
+    return base_cols + str_cols, label_cols, schema, batches()
+
+
+@ensure_session_async
+async def write_wide_export(
+    session: DBSession | AsyncSession,
+    target: Path | str,
+    nql_filter: NQLFilter | None,
+    scope_ids: list[str] | list[uuid.UUID],
+    project_id: str | uuid.UUID,
+    file_format: ExportFormat = 'parquet',
+    limit: int | None = None,
+    prefix: dict[str, str] | None = None,
+    include_meta: bool = False,
+    batch_size: int = 5000,
+) -> tuple[list[str], list[str], int]:
+    """
+    Write the wide export table batch by batch to a parquet or feather (arrow IPC) file.
+    Note, that the file has a column for every label in the scopes (see `wide_export_batches()`), including labels
+    that only appear on items excluded by `nql_filter` or `limit`, so it may contain columns without any values.
+    :return: base columns, label columns, and number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    base_cols, label_cols, schema, batches = await wide_export_batches(
+        session=session,
+        nql_filter=nql_filter,
+        scope_ids=scope_ids,
+        project_id=project_id,
+        limit=limit,
+        prefix=prefix,
+        include_meta=include_meta,
+        batch_size=batch_size,
+    )
+
+    n_rows = 0
+    writer: pq.ParquetWriter | pa.ipc.RecordBatchFileWriter
+    with pq.ParquetWriter(target, schema) if file_format == 'parquet' else pa.ipc.new_file(target, schema) as writer:
+        async for batch in batches:
+            writer.write_batch(batch)
+            n_rows += batch.num_rows
+    logger.debug(f'Wrote {n_rows:,} rows to {target}')
+    return base_cols, label_cols, n_rows
+
+
+def arrow_to_pandas(table: 'pa.Table') -> 'pd.DataFrame':
+    """
+    Convert the (streamed) wide export to a data frame with the same (nullable) dtypes as `wide_export_table()`.
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    types = {pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype()}
+    return table.to_pandas(types_mapper=types.get)
+
+
+def drop_unused_label_cols(df: 'pd.DataFrame', label_cols: list[str]) -> list[str]:
+    """
+    Drop label columns (in place) that are not set for any row, so the columns match those of `wide_export_table()`,
+    which only has columns for labels that appear in the exported rows.
+    :return: remaining label columns
+    """
+    unused = [col for col in label_cols if not (df[col] == 1).any()]
+    df.drop(columns=unused, inplace=True)
+    return [col for col in label_cols if col not in unused]
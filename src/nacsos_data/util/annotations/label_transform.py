@@ -1,5 +1,8 @@
 import uuid
-from typing import Literal, TypeVar, Callable
+import operator
+from functools import cache, lru_cache
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Literal, TypeVar, Callable
 from uuid import UUID
 from lark import Lark, Transformer, Tree, Token
 from pydantic import BaseModel
@@ -7,6 +10,9 @@ from sqlalchemy import text
 
 from nacsos_data.db.engine import ensure_session_async, DBSession
 
+if TYPE_CHECKING:
+    import numpy as np
+
 GRAMMAR = """
 ?clause: expr
        | clause _and clause             -> and
@@ -67,14 +73,26 @@ class TypeTransformer(Transformer):  # type: ignore[type-arg]
         return tok.update(value=True if tok.lower() == 'true' else False)
 
 
+@cache
+def _parser() -> Lark:
+    return Lark(GRAMMAR, parser='earley', start='clause')
+
+
 def parse_rule(query: str) -> Tree[Token]:
-    parser = Lark(GRAMMAR, parser='earley', start='clause')
     transformer = TypeTransformer()
-    tree = parser.parse(query)
+    tree = _parser().parse(query)
     tree = transformer.transform(tree)
     return tree  # type: ignore[no-any-return]
 
 
+@lru_cache(maxsize=256)
+def compile_rule(query: str) -> Tree[Token]:
+    """
+    Cached `parse_rule()`, the returned tree must not be modified.
+    """
+    return parse_rule(query)
+
+
 class SortedAnnotationLabel(BaseModel):
     value_int: int | None = None
     values_int: list[int] | None = None
@@ -258,17 +276,97 @@ def test_entry(
     raise SyntaxError('Invalid inclusion query.')
 
 
-def annotations_to_sequence(inclusion_rule: str, annotations: list[SortedAnnotation], majority: bool = True) -> list[int]:
+COMPARATORS: dict[str, Callable[[Any, Any], Any]] = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '=': operator.eq,
+    '<': operator.lt,
+    '<=': operator.le,
+    '!=': operator.ne,
+}
+
+
+def _rule_fields(subtree: Tree | Token) -> set[tuple[str, str]]:  # type: ignore[type-arg]
+    if not isinstance(subtree, Tree):
+        return set()
+    if subtree.data == 'int_clause':
+        return {(str(subtree.children[0]), 'value_int')}
+    if subtree.data == 'bool_clause':
+        return {(str(subtree.children[0]), 'value_bool')}
+    return {key_field for child in subtree.children for key_field in _rule_fields(child)}
+
+
+class AnnotationColumns:
+    """
+    Columnar view of `SortedAnnotation.labels` for the label keys and fields (`value_int`, `value_bool`) used in a rule:
+    one float array per key and field with NaN for missing values.
+    """
+
+    def __init__(self, annotations: list[SortedAnnotation], fields: set[tuple[str, str]]):
+        import numpy as np
+
+        self.n_rows = len(annotations)
+
+        columns: dict[tuple[str, str], list[float]] = {key_field: [np.nan] * self.n_rows for key_field in sorted(fields)}
+        key_columns: dict[str, list[tuple[Callable[[SortedAnnotationLabel], int | bool | None], list[float]]]] = defaultdict(list)
+        for (key, field), values in columns.items():
+            key_columns[key].append((operator.attrgetter(field), values))
+
+        # Fill all columns in a single pass over the annotations (one label lookup per key and annotation)
+        for row, anno in enumerate(annotations):
+            labels = anno.labels
+            for key, pluckers in key_columns.items():
+                label = labels.get(key)
+                if label is None:
+                    continue
+                for pluck, values in pluckers:
+                    value = pluck(label)
+                    if value is not None:
+                        values[row] = value
+
+        self.columns: dict[tuple[str, str], np.ndarray] = {key_field: np.array(values, dtype='float64') for key_field, values in columns.items()}
+
+    def evaluate(self, subtree: Tree | Token) -> 'np.ndarray':  # type: ignore[type-arg]
+        """
+        Vectorised equivalent of `test_entry()` (with `pluck_value_nest` and majority=True) for all rows at once.
+        """
+        import numpy as np
+
+        if isinstance(subtree, Tree):
+            if subtree.data == 'and':
+                return self.evaluate(subtree.children[0]) & self.evaluate(subtree.children[1])  # type: ignore[no-any-return]
+            if subtree.data == 'or':
+                return self.evaluate(subtree.children[0]) | self.evaluate(subtree.children[1])  # type: ignore[no-any-return]
+            if subtree.data == 'not':
+                return ~self.evaluate(subtree.children[0])
+
+            if subtree.data in {'int_clause', 'bool_clause'}:
+                field = 'value_int' if subtree.data == 'int_clause' else 'value_bool'
+                values = self.columns[(str(subtree.children[0]), field)]
+                op = COMPARATORS.get(str(subtree.children[1]))
+                if op is None:
+                    raise ValueError(f'Unexpected comparator "{subtree.children[1]}".')
+                # Missing values never match (see `cmp()`)
+                return op(values, float(subtree.children[2].value)) & ~np.isnan(values)  # type: ignore[union-attr,no-any-return]
+
+        raise SyntaxError('Invalid inclusion query.')
+
+
+def annotations_to_sequence(inclusion_rule: str, annotations: list[SortedAnnotation], majority: bool = True, compiled: bool = True) -> list[int]:
     """
     Transform labels to sequence when using the annotation-matrix-style format
     (e.g. via `get_annotations_by_user` `get_annotations`)
     :param inclusion_rule:
     :param annotations:
     :param majority: if True, make decision based on majority vote; else, consider all values and test for best fit
+    :param compiled: if True, evaluate the (cached) rule on all annotations at once; else, test each annotation on its own
     :return:
     """
     if not majority:
         raise NotImplementedError('any matching not implemented, yet')
 
-    rule_tree = parse_rule(inclusion_rule)
+    rule_tree = compile_rule(inclusion_rule)
+    if compiled:
+        columns = AnnotationColumns(annotations, fields=_rule_fields(rule_tree))
+        return columns.evaluate(rule_tree).astype(int).tolist()  # type: ignore[no-any-return]
     return [int(test_entry(rule_tree, annotation=anno.labels, plucker=pluck_value_nest, majority=majority)) for anno in annotations]
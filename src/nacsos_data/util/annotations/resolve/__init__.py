@@ -1,5 +1,7 @@
 import logging
 import uuid
+from typing import Literal
+
 from sqlalchemy import text, select
 
 from nacsos_data.db.engine import ensure_session_async, DBSession
@@ -22,11 +24,18 @@ from nacsos_data.models.bot_annotations import (
 from nacsos_data.models.users import UserModel
 from nacsos_data.util.annotations import read_item_annotations, read_bot_annotations, get_ordering
 from nacsos_data.util.annotations.resolve.majority_vote import naive_majority_vote
+from nacsos_data.util.annotations.resolve.columnar import ColumnarMatrix
 from nacsos_data.util.annotations.validation import resolve_bot_annotation_parents, labels_from_scheme, path_to_string, same_values
 from nacsos_data.util.errors import NotFoundError
 
 logger = logging.getLogger('nacsos_data.util.annotations.resolve')
 
+# How the resolution matrix is computed:
+#   - dict: `ResolutionMatrix` with one `ResolutionCell` per item and label from the start
+#   - columnar: annotations in a data frame, vectorised votes, cells only for the requested items (see `ColumnarMatrix`)
+#               (same resolutions as 'dict', see `nacsos_data.scripts.check_resolution_engines`)
+ResolutionEngine = Literal['dict', 'columnar']
+
 
 @ensure_session_async
 async def read_labels(session: DBSession, assignment_scope_id: str | uuid.UUID, ignore_hierarchy: bool = True, ignore_repeat: bool = True) -> list[list[Label]]:
@@ -247,6 +256,7 @@ async def get_resolved_item_annotations(  # noqa: C901
     bot_meta: BotAnnotationResolution | None = None,
     include_new: bool = False,
     update_existing: bool = False,
+    engine: ResolutionEngine = 'dict',
 ) -> ResolutionProposal:
     """
     This method retrieves all annotations that match the selected filters and constructs a matrix
@@ -263,8 +273,19 @@ async def get_resolved_item_annotations(  # noqa: C901
     :param bot_meta: Link to existing resolution
     :param include_new: When `existing_resolution` is set, should I include new items?
     :param update_existing: When `existing_resolution` is set, should I update existing resolutions?
+    :param engine: Use the columnar engine for new resolutions (existing resolutions always use the dict-based matrix)
     :return:
     """
+    if bot_meta is None and engine == 'columnar':
+        return await get_resolved_item_annotations_columnar(
+            strategy=strategy,
+            assignment_scope_id=assignment_scope_id,
+            ignore_hierarchy=ignore_hierarchy,
+            ignore_repeat=ignore_repeat,
+            include_empty=include_empty,
+            session=session,
+        )
+
     logger.debug(f'Fetching all annotations in scope {assignment_scope_id} with ignore_hierarchy={ignore_hierarchy} and ignore_repeat={ignore_repeat}.')
     scheme: AnnotationSchemeModel
     labels: list[FlatLabel]
@@ -369,3 +390,50 @@ async def get_resolved_item_annotations(  # noqa: C901
         ordering=[ResolutionOrdering(**o.model_dump()) for o in item_order],
         matrix=annotation_map,
     )
+
+
+@ensure_session_async
+async def get_resolved_item_annotations_columnar(
+    session: DBSession,
+    strategy: ResolutionMethod,
+    assignment_scope_id: str | uuid.UUID,
+    ignore_hierarchy: bool = False,
+    ignore_repeat: bool = False,
+    include_empty: bool = True,
+    offset: int = 0,
+    limit: int | None = None,
+) -> ResolutionProposal:
+    """
+    Same as `get_resolved_item_annotations()` for new resolutions (without `bot_meta`), but votes are computed
+    on a `ColumnarMatrix` and the matrix only contains the items in `ordering[offset:offset + limit]`.
+
+    :param offset: Skip the first N items (after dropping empty items)
+    :param limit: Number of items to include in the matrix (all if None)
+    """
+    logger.debug(f'Fetching all annotations in scope {assignment_scope_id} with ignore_hierarchy={ignore_hierarchy} and ignore_repeat={ignore_repeat}.')
+    scheme, labels, annotators, assignments, annotations, item_order = await _get_aux_data(
+        assignment_scope_id=assignment_scope_id, ignore_hierarchy=ignore_hierarchy, ignore_repeat=ignore_repeat, session=session
+    )
+    matrix = ColumnarMatrix(item_order=item_order, labels=labels, assignments=assignments, annotations=annotations)
+
+    if strategy == 'majority':
+        matrix.majority_vote()
+    else:
+        raise NotImplementedError(f'Resolution strategy "{strategy}" not implemented (yet)!')
+
+    # If requested, drop items without annotation from the order
+    if not include_empty:
+        items_with_annotation = {str(anno.item_id) for anno in annotations}
+        item_order = [o for o in item_order if str(o.item_id) in items_with_annotation]
+
+    item_order = item_order[offset : None if limit is None else offset + limit]
+    row_index = {item_key: ri for ri, item_key in enumerate(matrix.item_keys)}
+    rows = list(dict.fromkeys(row_index[o.item_id] for o in item_order))
+
+    return ResolutionProposal(
+        scheme_info=AnnotationSchemeInfo(**scheme.model_dump()),
+        labels=labels,
+        annotators=annotators,
+        ordering=[ResolutionOrdering(**o.model_dump()) for o in item_order],
+        matrix=matrix.to_resolution_matrix(rows=rows),
+    )
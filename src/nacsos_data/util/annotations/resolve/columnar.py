@@ -0,0 +1,171 @@
+import uuid
+import logging
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from nacsos_data.models.annotations import AnnotationSchemeLabelTypes, FlatLabel, ItemAnnotation
+from nacsos_data.models.bot_annotations import (
+    AssignmentMap,
+    BotAnnotationModel,
+    OrderingEntry,
+    ResolutionCell,
+    ResolutionMatrix,
+    ResolutionStatus,
+    ResolutionUserEntry,
+)
+from nacsos_data.util.annotations.validation import path_to_string, resolve_bot_annotation_parents
+
+logger = logging.getLogger('nacsos_data.util.annotations.resolve')
+
+VALUE_FIELDS = ['value_bool', 'value_int', 'value_float', 'value_str', 'multi_int']
+# Label kinds and the field they are resolved on
+KIND_FIELDS: dict[AnnotationSchemeLabelTypes, str] = {'bool': 'value_bool', 'single': 'value_int', 'multi': 'multi_int', 'str': 'value_str'}
+
+
+class ColumnarMatrix:
+    """
+    Columnar counterpart to the `ResolutionMatrix`.
+    Instead of one `ResolutionCell` per item and label, annotations are kept in a data frame with one row per annotation
+    (`row`: index in `item_keys`, `col`: index in `labels`, `user_id`, `idx`: index in `annotations`, and the values).
+    Votes are computed for all cells at once (see `majority_vote()`) and cells are only materialised for the rows
+    that are actually needed (see `to_resolution_matrix()`).
+    """
+
+    def __init__(self, item_order: list[OrderingEntry], labels: list[FlatLabel], assignments: AssignmentMap, annotations: list[ItemAnnotation]):
+        self.labels = labels
+        self.label_map = {label.path_key: label for label in labels}
+        self.annotations = annotations
+        self.assignments = assignments
+
+        # Same semantics as the dict-based matrix: later entries for the same item override earlier ones
+        identifiers = {entry.item_id: entry.identifier for entry in item_order}
+        self.item_keys = list(identifiers.keys())
+        self.identifiers = list(identifiers.values())
+        row_index = {item_key: ri for ri, item_key in enumerate(self.item_keys)}
+        col_index = {label.path_key: ci for ci, label in enumerate(labels)}
+
+        columns: dict[str, list[Any]] = {'row': [], 'col': [], 'user_id': [], 'idx': [], **{field: [] for field in VALUE_FIELDS}}
+        for idx, annotation in enumerate(annotations):
+            _, order_entry = assignments[str(annotation.assignment_id)]
+            row = row_index.get(order_entry.item_id)
+            col = col_index.get(path_to_string(annotation.path))
+            if row is None or col is None:
+                logger.warning(
+                    f'Ignoring potentially dangerous incoherent labels during resolution ({order_entry.item_id} -> {path_to_string(annotation.path)})'
+                )
+                continue
+            columns['row'].append(row)
+            columns['col'].append(col)
+            columns['user_id'].append(str(annotation.user_id))
+            columns['idx'].append(idx)
+            for field in VALUE_FIELDS:
+                columns[field].append(getattr(annotation, field))
+
+        self.frame = pd.DataFrame({key: pd.Series(values, dtype='int64' if key in {'row', 'col', 'idx'} else object) for key, values in columns.items()})
+        # Position of each annotation in the order the dict-based engine sees them in a cell
+        # (grouped by user in order of their first annotation, then in order of annotations)
+        user_first = self.frame.groupby(['row', 'col', 'user_id'])['idx'].transform('min')
+        order = np.lexsort((self.frame['idx'].to_numpy(), user_first.to_numpy(), self.frame['col'].to_numpy(), self.frame['row'].to_numpy()))
+        seq = np.empty_like(order)
+        seq[order] = np.arange(len(order))
+        self.frame['seq'] = seq
+
+        self.votes: pd.DataFrame | None = None
+
+    def majority_vote(self) -> pd.DataFrame:
+        """
+        Vectorised equivalent of `naive_majority_vote()`:
+          - bool/single: most common value (ties go to the value seen first)
+          - multi: union of all choices
+          - str: all non-empty texts joined with a separator
+        :return: Data frame indexed by (row, col) with one column per value field
+        """
+        frame = self.frame[self.frame[VALUE_FIELDS].map(_has_value).any(axis=1)]
+        kinds = np.array([label.kind for label in self.labels])
+        kind_of_col = kinds[frame['col'].to_numpy()] if len(kinds) > 0 else np.array([], dtype=object)
+
+        unsupported = set(kind_of_col) - set(KIND_FIELDS.keys())
+        if len(unsupported) > 0:
+            raise NotImplementedError(f'Majority vote for {unsupported} not implemented')
+
+        votes = []
+        for kind, field in KIND_FIELDS.items():
+            sub = frame[kind_of_col == kind]
+            sub = sub[sub[field].notna()]
+            if kind == 'str':
+                sub = sub[sub[field].str.len() > 0]
+            if len(sub) == 0:
+                continue
+
+            if kind == 'multi':
+                values = sub[['row', 'col', field]].explode(field).dropna()
+                voted = values.groupby(['row', 'col'])[field].agg(lambda choices: list(set(choices)))
+            elif kind == 'str':
+                voted = sub.sort_values('seq').groupby(['row', 'col'])[field].agg('\n----\n'.join)
+            else:
+                counts = sub.groupby(['row', 'col', field], sort=False).agg(count=('idx', 'size'), first=('seq', 'min')).reset_index()
+                counts = counts.sort_values(['row', 'col', 'count', 'first'], ascending=[True, True, False, True])
+                voted = counts.drop_duplicates(['row', 'col']).set_index(['row', 'col'])[field]
+            # Cast before the concat: int columns would otherwise become float when the other fields are filled with NaN
+            votes.append(voted.astype(object).to_frame(field))
+
+        if len(votes) == 0:
+            self.votes = pd.DataFrame(columns=VALUE_FIELDS, index=pd.MultiIndex.from_tuples([], names=['row', 'col']))
+        else:
+            self.votes = pd.concat(votes).reindex(columns=VALUE_FIELDS).astype(object)
+            self.votes = self.votes.where(self.votes.notna(), None)
+        return self.votes
+
+    def to_resolution_matrix(self, rows: list[int] | None = None) -> ResolutionMatrix:
+        """
+        Materialise `ResolutionCell`s (including votes, if computed) for the given rows (all if None).
+        """
+        if rows is None:
+            rows = list(range(len(self.item_keys)))
+
+        frame = self.frame[self.frame['row'].isin(rows)].sort_values('seq')
+        votes: dict[tuple[int, int], dict[str, Any]] = {}
+        if self.votes is not None:
+            vote_rows = self.votes[self.votes.index.get_level_values('row').isin(rows)]
+            votes = vote_rows.to_dict('index')
+
+        matrix: ResolutionMatrix = {}
+        for row in rows:
+            item_key = self.item_keys[row]
+            matrix[item_key] = {}
+            for col, label in enumerate(self.labels):
+                cell = ResolutionCell(
+                    labels={},
+                    resolution=BotAnnotationModel(
+                        bot_annotation_id=str(uuid.uuid4()), item_id=item_key, order=self.identifiers[row], key=label.key, repeat=label.repeat
+                    ),
+                    status=ResolutionStatus.NEW,
+                )
+                vote = votes.get((row, col))
+                if vote is not None:
+                    for field in VALUE_FIELDS:
+                        setattr(cell.resolution, field, vote[field])
+                    cell.status = ResolutionStatus.CHANGED
+                matrix[item_key][label.path_key] = cell
+
+        for row, col, user_id, idx in frame[['row', 'col', 'user_id', 'idx']].itertuples(index=False):
+            annotation = self.annotations[idx]
+            assignment, _ = self.assignments[str(annotation.assignment_id)]
+            matrix[self.item_keys[row]][self.labels[col].path_key].labels.setdefault(user_id, []).append(
+                ResolutionUserEntry(annotation=annotation, assignment=assignment)
+            )
+
+        return resolve_bot_annotation_parents(matrix, self.label_map)
+
+
+def _has_value(value: Any) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, list):
+        return len(value) > 0
+    return True
+
+
+__all__ = ['ColumnarMatrix']
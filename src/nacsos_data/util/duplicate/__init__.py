@@ -1,4 +1,67 @@
+import uuid
+from pathlib import Path
+from typing import Generator, AsyncGenerator, Literal, TypeAlias
+
+from sklearn.feature_extraction.text import CountVectorizer
+
 from .index_pynn import DuplicateIndex as PynndescentDuplicateIndex
 from .index_milvus import MilvusDuplicateIndex
+from .index_minhash import MinHashDuplicateIndex
+from ...models.items import ItemEntry, ItemIndexFingerprint
+
+DuplicateIndexType = Literal['milvus', 'minhash', 'pynndescent']
+AnyDuplicateIndex: TypeAlias = PynndescentDuplicateIndex | MilvusDuplicateIndex | MinHashDuplicateIndex
+
+
+def get_duplicate_index(
+    index_type: DuplicateIndexType,
+    existing_items: AsyncGenerator[list[ItemEntry], None],
+    new_items: Generator[ItemEntry, None, None],
+    project_id: str | uuid.UUID,
+    vectoriser: CountVectorizer | None = None,
+    max_slop: float = 0.02,
+    batch_size: int = 10000,
+    index_dir: Path | str | None = None,
+    fingerprint: ItemIndexFingerprint | None = None,
+) -> AnyDuplicateIndex:
+    """
+    Construct a duplicate detection index of the given type (call `.init()` on the result before use).
+
+    - `milvus`: sparse vector search on an external milvus server
+    - `minhash`: in-process MinHash-LSH on token sets (`vectoriser` is not used);
+                 can be persisted in `index_dir` (valid as long as the project matches the `fingerprint`)
+    - `pynndescent`: in-process approximate nearest neighbour graph (holds all vectors in memory)
+    """
+    if index_dir is not None and index_type != 'minhash':
+        raise ValueError(f'Persisting the duplicate index is not supported for `{index_type}`')
+    if index_type == 'milvus':
+        return MilvusDuplicateIndex(
+            existing_items=existing_items,
+            new_items=new_items,
+            project_id=project_id,
+            vectoriser=vectoriser,
+            max_slop=max_slop,
+            batch_size=batch_size,
+        )
+    if index_type == 'minhash':
+        return MinHashDuplicateIndex(
+            existing_items=existing_items,
+            new_items=new_items,
+            max_slop=max_slop,
+            batch_size=batch_size,
+            index_dir=index_dir,
+            fingerprint=fingerprint,
+        )
+    if index_type == 'pynndescent':
+        return PynndescentDuplicateIndex(existing_items=existing_items, new_items=new_items, vectoriser=vectoriser, max_slop=max_slop, batch_size=batch_size)
+    raise ValueError(f'Unknown duplicate index type: {index_type}')
+
 
-__all__ = ['PynndescentDuplicateIndex', 'MilvusDuplicateIndex']
+__all__ = [
+    'PynndescentDuplicateIndex',
+    'MilvusDuplicateIndex',
+    'MinHashDuplicateIndex',
+    'AnyDuplicateIndex',
+    'DuplicateIndexType',
+    'get_duplicate_index',
+]
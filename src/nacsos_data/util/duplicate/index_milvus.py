@@ -1,9 +1,10 @@
 import uuid
 import logging
-from typing import TYPE_CHECKING, Generator, AsyncGenerator
+from collections import defaultdict
+from typing import TYPE_CHECKING, Generator, AsyncGenerator, Any
 
 import numpy as np
-from scipy.sparse import vstack, csr_matrix
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import CountVectorizer
 
 from .. import batched
@@ -16,15 +17,20 @@ if TYPE_CHECKING:
 logger = logging.getLogger('nacsos_data.util.deduplicate.index')
 
 
-def _get_vector_rep(x: csr_matrix, i: int) -> dict[str, int | np.ndarray]:
-    if x.nnz > 0:
-        return {
-            'id': i,
-            'sparse_vector': x,
-            'magnitude': np.sqrt(x.dot(x.T).data[0]),
-        }
-    else:
-        return {'id': i, 'sparse_vector': x, 'magnitude': 0}
+def _sparse_vectors(x: csr_matrix) -> list[dict[int, float]]:
+    """
+    Convert rows of `x` into the sparse vector format of milvus, read straight from the CSR arrays.
+    """
+    indptr, indices, data = x.indptr, x.indices.tolist(), x.data.astype(np.float32).tolist()
+    return [dict(zip(indices[indptr[i] : indptr[i + 1]], data[indptr[i] : indptr[i + 1]], strict=True)) for i in range(x.shape[0])]
+
+
+def _sparse_rows(x: csr_matrix, offset: int) -> list[dict[str, Any]]:
+    """
+    Convert rows of `x` into milvus entities with ids starting at `offset`; empty rows are skipped.
+    """
+    magnitudes = np.sqrt(x.multiply(x).sum(axis=1).A1)
+    return [{'id': offset + i, 'magnitude': float(magnitudes[i]), 'sparse_vector': vector} for i, vector in enumerate(_sparse_vectors(x)) if len(vector) > 0]
 
 
 class MilvusDuplicateIndex:
@@ -40,6 +46,12 @@ class MilvusDuplicateIndex:
     CHAR_LIMIT = 800
     # Number of candidates to look at during query time
     N_CANDIDATES = 5
+    # Candidates need a magnitude within this fraction of the query magnitude
+    MAGNITUDE_SLACK = 0.1
+    # Queries in `test_many()` are grouped by magnitude into buckets of this (geometric) width to share the range filter
+    MAGNITUDE_BUCKET_RATIO = 1.02
+    # Number of vectors per insert request
+    INSERT_CHUNK = 10000
 
     def __init__(
         self,
@@ -72,6 +84,7 @@ class MilvusDuplicateIndex:
         self.item_ids_nw_inv: dict[int, str] | None = None
 
         self.saved: dict[str, str] = {}
+        self._loaded = False
 
     async def _load_vectors_batched_async(self, generator: AsyncGenerator[list[ItemEntry], None]) -> AsyncGenerator[tuple[list[str], csr_matrix], None]:
         async for batch in generator:
@@ -107,29 +120,9 @@ class MilvusDuplicateIndex:
 
             yield item_ids, vectors
 
-    async def init(self) -> None:
+    def _create_collection(self) -> None:
         from pymilvus import DataType
 
-        logger.info('Loading items from database...')
-        db_data = [r async for r in self._load_vectors_batched_async(self.existing_items)]
-
-        self.item_ids_db = {r: i for i, r in enumerate(bid for batch_ids, _ in db_data for bid in batch_ids)}
-        self.item_ids_db_inv = {v: k for k, v in self.item_ids_db.items()}
-        offset = len(self.item_ids_db)
-        logger.info(f'Found {offset:,} documents already in the database.')
-
-        logger.info('Loading items from new source...')
-        nw_data = list(self._load_vectors_sync(self.new_items))
-
-        self.item_ids_nw = {r: i + offset for i, r in enumerate(bid for batch_ids, _ in nw_data for bid in batch_ids)}
-        self.item_ids_nw_inv = {v: k for k, v in self.item_ids_nw.items()}
-        logger.info(f'Found {len(self.item_ids_nw):,} ({len(nw_data):,}) documents in the file.')
-
-        logger.info('Constructing nearest neighbour lookup...')
-        vectors = vstack([batch_vectors for _, batch_vectors in db_data] + [batch_vectors for _, batch_vectors in nw_data])
-        # Using Jaccard dissimilarity, defined as: 1 - (token set intersection divided by token set union)
-        logger.info(f'document-word matrix has shape: {vectors.shape}')
-
         self.collection_name = f'c_{self.project_id}'.replace('-', '_')
         if self.client.has_collection(collection_name=self.collection_name):
             self.client.drop_collection(collection_name=self.collection_name)
@@ -145,22 +138,50 @@ class MilvusDuplicateIndex:
         schema.add_field(field_name='sparse_vector', datatype=DataType.SPARSE_FLOAT_VECTOR)
 
         self.client.create_collection(collection_name=self.collection_name, schema=schema)
+        self._loaded = False
+
+    def _insert_vectors(self, vectors: csr_matrix, offset: int) -> int:
+        """
+        Insert non-empty rows of `vectors` in chunks of `INSERT_CHUNK`, row i gets id `offset + i`.
+
+        :return: Number of inserted vectors
+        """
+        n_inserted = 0
+        for start in range(0, vectors.shape[0], self.INSERT_CHUNK):
+            rows = _sparse_rows(vectors[start : start + self.INSERT_CHUNK], offset=offset + start)
+            if len(rows) > 0:
+                self.client.insert(collection_name=self.collection_name, data=rows)
+                n_inserted += len(rows)
+        return n_inserted
 
-        rowlen = vectors.sum(axis=1).A1
-        non_empty = list(np.argwhere(rowlen > 0).ravel())
-        vectors = vectors[non_empty, :]
+    async def init(self) -> None:
+        """
+        Vectorise existing and new items and insert them into a fresh collection.
+        Batches are pushed to milvus as they arrive from the generators, so only one batch of vectors is held in memory at a time.
+        """
+        self._create_collection()
+
+        n_vectors = 0
+        n_inserted = 0
+        self.item_ids_db = {}
+        logger.info('Loading items from database...')
+        async for batch_ids, vectors in self._load_vectors_batched_async(self.existing_items):
+            n_inserted += self._insert_vectors(vectors, offset=n_vectors)
+            self.item_ids_db.update({bid: n_vectors + i for i, bid in enumerate(batch_ids)})
+            n_vectors += len(batch_ids)
+        self.item_ids_db_inv = {v: k for k, v in self.item_ids_db.items()}
+        logger.info(f'Found {len(self.item_ids_db):,} documents already in the database.')
+
+        self.item_ids_nw = {}
+        logger.info('Loading items from new source...')
+        for batch_ids, vectors in self._load_vectors_sync(self.new_items):
+            n_inserted += self._insert_vectors(vectors, offset=n_vectors)
+            self.item_ids_nw.update({bid: n_vectors + i for i, bid in enumerate(batch_ids)})
+            n_vectors += len(batch_ids)
+        self.item_ids_nw_inv = {v: k for k, v in self.item_ids_nw.items()}
+        logger.info(f'Found {len(self.item_ids_nw):,} documents in the file.')
+        logger.info(f'Inserted {n_inserted:,} non-empty vectors (out of {n_vectors:,}) into collection "{self.collection_name}".')
 
-        chunk: int = 10000
-        i: int
-        chunks = np.arange(vectors.shape[0], step=chunk)  # type: ignore[call-overload,unused-ignore]
-        for i in chunks:
-            self.client.insert(
-                collection_name=self.collection_name,
-                data=[
-                    _get_vector_rep(vectors.getrow(j + i), non_empty[j + i])  # type: ignore[arg-type]
-                    for j in range(vectors[i : i + chunk].shape[0])
-                ],
-            )
         index_params = self.client.prepare_index_params()
 
         index_params.add_index(
@@ -174,6 +195,63 @@ class MilvusDuplicateIndex:
         # Create index
         self.client.create_index(collection_name=self.collection_name, index_params=index_params)
 
+    def load(self) -> None:
+        """
+        Load the collection into memory for searching; this only happens once per index lifetime.
+        """
+        if not self._loaded:
+            self.client.load_collection(self.collection_name)
+            self._loaded = True
+
+    def close(self) -> None:
+        """
+        Drop the collection from milvus; the index can't be used afterwards.
+        """
+        self.client.drop_collection(self.collection_name)
+        self._loaded = False
+
+    def _search_params(self) -> dict[str, Any]:
+        return {
+            'metric_type': 'IP',
+            'params': {'drop_ratio_search': 0.2},  # the ratio of small vector values to be dropped during search.
+        }
+
+    def _check_hits(self, item: ItemEntry, magnitude: float, hits: list[dict[str, Any]]) -> str | None:
+        if self.item_ids_db_inv is None or self.item_ids_nw_inv is None:
+            raise RuntimeError('Lookups are not initialised, yet!')
+
+        for hit in hits:
+            # Shared range filters might be wider than what we are looking for
+            if abs(hit['entity']['magnitude'] - magnitude) >= magnitude * self.MAGNITUDE_SLACK:
+                continue
+
+            dist = 1 - hit['distance'] / (magnitude * hit['entity']['magnitude'])
+
+            # Likely not a duplicate
+            if dist > self.max_slop:
+                logger.debug(f' -> No close text match with >{1 - self.max_slop} overlap')
+                continue  # We no longer stop here in case there is a document with a lower inner product but higher cosine similarity
+
+            item_id_db = self.item_ids_db_inv.get(hit['entity']['id'])
+            item_id_nw = self.item_ids_nw_inv.get(hit['entity']['id'])
+
+            # Looking at itself, continue
+            if (item_id_db == item.item_id) or (item_id_nw == item.item_id):
+                continue
+
+            # See, if we already stored this in the database ahead of time
+            if item_id_db is not None:
+                logger.debug(' -> Found text match in database')
+                return item_id_db
+
+            # See, if we've seen this and saved this already in the process
+            if item_id_nw is not None and item_id_nw in self.saved:
+                logger.debug(' -> Found text match in new items (but we sent it to the database earlier)')
+                return self.saved[item_id_nw]
+
+            # else: false positive, it's a duplicate and we just saw the first one of them
+        return None
+
     def test(self, item: ItemEntry) -> str | None:
         if self.collection_name is None:
             raise RuntimeError('Index is not initialised, yet!')
@@ -181,56 +259,74 @@ class MilvusDuplicateIndex:
             raise RuntimeError('Lookups are not initialised, yet!')
 
         if item.text is not None and len(item.text) > self.MIN_TEXT_LEN:
-            vector = self.vectoriser.transform([item.text]).getrow(0)
+            vector = self.vectoriser.transform([item.text]).tocsr()
 
-            if vector.sum() == 0:
+            if vector.nnz == 0:
                 return None
 
-            magnitude = np.sqrt(vector.dot(vector.T).data[0])
+            magnitude = np.sqrt(vector.multiply(vector).sum())
 
-            search_params = {
-                'metric_type': 'IP',
-                'params': {'drop_ratio_search': 0.2},  # the ratio of small vector values to be dropped during search.
-            }
-
-            self.client.load_collection(self.collection_name)
+            self.load()
 
             search_res = self.client.search(
                 collection_name=self.collection_name,
-                data=[vector],
-                limit=5,
+                data=_sparse_vectors(vector),
+                limit=self.N_CANDIDATES,
                 output_fields=['id', 'magnitude'],
-                search_params=search_params,
-                filter=f'magnitude < {magnitude * 1.1} and magnitude > {magnitude * 0.9}',
+                search_params=self._search_params(),
+                filter=f'magnitude < {magnitude * (1 + self.MAGNITUDE_SLACK)} and magnitude > {magnitude * (1 - self.MAGNITUDE_SLACK)}',
             )
             for hits in search_res:
-                for hit in hits:
-                    dist = 1 - hit['distance'] / (magnitude * hit['entity']['magnitude'])
+                existing_id = self._check_hits(item, magnitude, hits)
+                if existing_id is not None:
+                    return existing_id
+        return None
 
-                    # Likely not a duplicate
-                    if dist > self.max_slop:
-                        logger.debug(f' -> No close text match with >{1 - self.max_slop} overlap')
-                        continue  # We no longer stop here in case there is a document with a lower inner product but higher cosine similarity
+    def test_many(self, items: list[ItemEntry]) -> list[str | None]:
+        """
+        Same as `test()`, but for a block of items at once.
+        All texts are vectorised together and queries with similar magnitude are submitted
+        as one multi-vector search that shares the (slightly wider) range filter.
 
-                    item_id_db = self.item_ids_db_inv.get(hit['entity']['id'])
-                    item_id_nw = self.item_ids_nw_inv.get(hit['entity']['id'])
+        :param items:
+        :return: For each item, the item_id of the duplicate (or None)
+        """
+        if self.collection_name is None:
+            raise RuntimeError('Index is not initialised, yet!')
+        if self.item_ids_db_inv is None or self.item_ids_nw_inv is None:
+            raise RuntimeError('Lookups are not initialised, yet!')
 
-                    # Looking at itself, continue
-                    if (item_id_db == item.item_id) or (item_id_nw == item.item_id):
-                        continue
+        results: list[str | None] = [None] * len(items)
+        queries = [i for i, item in enumerate(items) if item.text is not None and len(item.text) > self.MIN_TEXT_LEN]
+        if len(queries) == 0:
+            return results
 
-                    # See, if we already stored this in the database ahead of time
-                    if item_id_db is not None:
-                        logger.debug(' -> Found text match in database')
-                        return item_id_db
+        vectors = self.vectoriser.transform([items[i].text for i in queries]).tocsr()
+        magnitudes = np.sqrt(vectors.multiply(vectors).sum(axis=1).A1)
 
-                    # See, if we've seen this and saved this already in the process
-                    if item_id_nw is not None and item_id_nw in self.saved:
-                        logger.debug(' -> Found text match in new items (but we sent it to the database earlier)')
-                        return self.saved[item_id_nw]
+        buckets: defaultdict[int, list[int]] = defaultdict(list)
+        for qi, magnitude in enumerate(magnitudes):
+            if magnitude > 0:
+                buckets[int(np.floor(np.log(magnitude) / np.log(self.MAGNITUDE_BUCKET_RATIO)))].append(qi)
 
-                # else: false positive, it's a duplicate and we just saw the first one of them
-        return None
+        self.load()
+
+        for bucket in buckets.values():
+            mag_min = magnitudes[bucket].min()
+            mag_max = magnitudes[bucket].max()
+            search_res = self.client.search(
+                collection_name=self.collection_name,
+                data=_sparse_vectors(vectors[bucket]),
+                # Fetch a few more, since hits outside the per-query range are dropped afterwards
+                limit=2 * self.N_CANDIDATES,
+                output_fields=['id', 'magnitude'],
+                search_params=self._search_params(),
+                filter=f'magnitude < {mag_max * (1 + self.MAGNITUDE_SLACK)} and magnitude > {mag_min * (1 - self.MAGNITUDE_SLACK)}',
+            )
+            for qi, hits in zip(bucket, search_res, strict=True):
+                results[queries[qi]] = self._check_hits(items[queries[qi]], magnitudes[qi], hits)
+
+        return results
 
     # Follow chains of duplicate reference if needed to resolve to the "origin" duplicate
     def _resolve(self, cid: str) -> str:
@@ -0,0 +1,428 @@
+import os
+import uuid
+import zlib
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+from typing import Generator, AsyncGenerator, Sequence, BinaryIO
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel
+
+from .. import batched
+from ..text import preprocess_text, tokenise_text
+from ...models.items import ItemEntry, ItemIndexFingerprint
+
+logger = logging.getLogger('nacsos_data.util.deduplicate.index')
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def token_hashes(text: str, max_tokens: int = 80) -> npt.NDArray[np.uint64]:
+    """
+    Stable 32-bit hashes of the set of tokens in `text` (same tokenisation as used for the vocabulary in imports).
+    """
+    tokens = set(tokenise_text(preprocess_text(text), lowercase=True, max_tokens=max_tokens))
+    return np.fromiter((zlib.crc32(tok.encode()) for tok in tokens), dtype=np.uint64, count=len(tokens))
+
+
+class SegmentInfo(BaseModel):
+    name: str
+    num_items: int
+
+
+class IndexMeta(BaseModel):
+    num_perm: int
+    num_bands: int
+    max_tokens: int
+    seed: int
+    fingerprint: ItemIndexFingerprint
+    segments: list[SegmentInfo]
+
+
+class IndexSegment:
+    """
+    Block of MinHash signatures and LSH buckets (keys sorted per band for binary search), backed by files in `path`.
+    Segments are immutable, except for the `alive` mask, which is used to retire outdated signatures.
+    """
+
+    def __init__(self, path: Path, num_items: int, num_perm: int, num_bands: int):
+        self.path = path
+        self.num_items = num_items
+        self.item_ids = np.memmap(path / 'ids.bin', dtype='S36', mode='r', shape=(num_items,))
+        self.id_order = np.memmap(path / 'id_order.bin', dtype=np.uint32, mode='r', shape=(num_items,))
+        self.signatures = np.memmap(path / 'signatures.bin', dtype=np.uint32, mode='r', shape=(num_items, num_perm))
+        self.bucket_keys = np.memmap(path / 'bucket_keys.bin', dtype=np.uint64, mode='r', shape=(num_bands, num_items))
+        self.bucket_order = np.memmap(path / 'bucket_order.bin', dtype=np.uint32, mode='r', shape=(num_bands, num_items))
+        self.alive = np.memmap(path / 'alive.bin', dtype=np.bool_, mode='r+', shape=(num_items,))
+
+    def candidates(self, keys: npt.NDArray[np.uint64], max_bucket_size: int) -> npt.NDArray[np.uint32]:
+        """
+        Positions of (alive) signatures that share at least one band key with `keys`.
+        """
+        positions = [np.empty(0, dtype=np.uint32)]
+        for band, key in enumerate(keys):
+            lo = np.searchsorted(self.bucket_keys[band], key, side='left')
+            hi = np.searchsorted(self.bucket_keys[band], key, side='right')
+            positions.append(self.bucket_order[band, lo : min(hi, lo + max_bucket_size)])
+        candidates = np.unique(np.concatenate(positions))
+        return candidates[self.alive[candidates]]
+
+    def find(self, item_ids: npt.NDArray[np.bytes_]) -> tuple[npt.NDArray[np.bool_], npt.NDArray[np.uint32]]:
+        """
+        :return: Mask for `item_ids` that are in this segment and their positions
+        """
+        pos = np.minimum(np.searchsorted(self.item_ids, item_ids, sorter=self.id_order), self.num_items - 1)
+        found = self.item_ids[self.id_order[pos]] == item_ids
+        return found, self.id_order[pos[found]]
+
+
+class SegmentWriter:
+    """
+    Streams signatures of one segment to disk and sorts the buckets in `close()`.
+    """
+
+    def __init__(self, path: Path, num_bands: int):
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.num_bands = num_bands
+        self.num_items = 0
+        self._ids: BinaryIO = open(path / 'ids.bin', 'wb')
+        self._signatures: BinaryIO = open(path / 'signatures.bin', 'wb')
+        self._keys: BinaryIO = open(path / 'keys.tmp', 'wb')
+
+    def write(self, item_ids: Sequence[str] | npt.NDArray[np.bytes_], signatures: npt.NDArray[np.uint32], keys: npt.NDArray[np.uint64]) -> None:
+        self._ids.write(np.asarray(item_ids, dtype='S36').tobytes())
+        self._signatures.write(np.ascontiguousarray(signatures, dtype=np.uint32).tobytes())
+        self._keys.write(np.ascontiguousarray(keys, dtype=np.uint64).tobytes())
+        self.num_items += len(item_ids)
+
+    def close(self) -> int:
+        self._ids.close()
+        self._signatures.close()
+        self._keys.close()
+
+        n_items = self.num_items
+        if n_items > 0:
+            keys = np.memmap(self.path / 'keys.tmp', dtype=np.uint64, mode='r', shape=(n_items, self.num_bands))
+            bucket_keys = np.memmap(self.path / 'bucket_keys.bin', dtype=np.uint64, mode='w+', shape=(self.num_bands, n_items))
+            bucket_order = np.memmap(self.path / 'bucket_order.bin', dtype=np.uint32, mode='w+', shape=(self.num_bands, n_items))
+            for band in range(self.num_bands):
+                band_keys = np.array(keys[:, band])
+                order = np.argsort(band_keys, kind='stable')
+                bucket_order[band] = order
+                bucket_keys[band] = band_keys[order]
+            bucket_keys.flush()
+            bucket_order.flush()
+            del keys, bucket_keys, bucket_order
+
+            item_ids = np.memmap(self.path / 'ids.bin', dtype='S36', mode='r', shape=(n_items,))
+            np.argsort(item_ids, kind='stable').astype(np.uint32).tofile(self.path / 'id_order.bin')
+            np.ones(n_items, dtype=np.bool_).tofile(self.path / 'alive.bin')
+        (self.path / 'keys.tmp').unlink()
+        return n_items
+
+
+class MinHashDuplicateIndex:
+    """
+    In-process alternative to `MilvusDuplicateIndex` based on MinHash signatures of token sets
+    and banded locality-sensitive hashing (LSH).
+
+    Signatures and buckets are kept in memory-mapped files, so memory usage stays bounded even for millions of items.
+    Items from the database can be persisted in `index_dir` and are only re-read from the database
+    when the project changed in ways the index doesn't know about (see `ItemIndexFingerprint`);
+    call `update()` after an import to add new items to the persisted index.
+    """
+
+    # Texts shorter than N characters will always be assumed unique (excluded from deduplication)
+    MIN_TEXT_LEN = 10
+    # Max. number of tokens per text (see `tokenise_text()`)
+    MAX_TOKENS = 80
+    # Number of hash functions per signature
+    NUM_PERM = 64
+    # Number of LSH bands (`NUM_PERM` has to be divisible by this);
+    # 8 bands with 8 rows each make texts with a Jaccard similarity of ~0.77 a candidate in 50% of cases
+    NUM_BANDS = 8
+    # Max. number of candidates to take from one bucket in one band
+    MAX_BUCKET_SIZE = 50
+    # Number of texts to hash at once (peak memory is roughly `HASH_CHUNK` x `MAX_TOKENS` x `NUM_PERM` x 8 bytes)
+    HASH_CHUNK = 500
+    # Merge all persisted segments into one when there are more than N segments
+    MAX_SEGMENTS = 10
+    # Seed for the hash functions
+    SEED = 42
+
+    def __init__(
+        self,
+        existing_items: AsyncGenerator[list[ItemEntry], None],
+        new_items: Generator[ItemEntry, None, None],
+        max_slop: float = 0.02,
+        batch_size: int = 10000,
+        index_dir: Path | str | None = None,
+        fingerprint: ItemIndexFingerprint | None = None,
+    ):
+        if self.NUM_PERM % self.NUM_BANDS != 0:
+            raise ValueError(f'Number of permutations ({self.NUM_PERM}) is not divisible by number of bands ({self.NUM_BANDS})')
+        if index_dir is not None and fingerprint is None:
+            raise ValueError('Persisted index requires a fingerprint to check if it is still valid!')
+
+        self.existing_items = existing_items
+        self.new_items = new_items
+        self.max_slop = max_slop
+        self.batch_size = batch_size
+        self.index_dir = None if index_dir is None else Path(index_dir)
+        self.fingerprint = fingerprint
+
+        rng = np.random.default_rng(self.SEED)
+        self._perm_a = rng.integers(1, _MAX_HASH, size=self.NUM_PERM, dtype=np.uint64)
+        self._perm_b = rng.integers(0, _MAX_HASH, size=self.NUM_PERM, dtype=np.uint64)
+        self._band_weights = rng.integers(1, np.iinfo(np.uint64).max, size=self.NUM_PERM // self.NUM_BANDS, dtype=np.uint64) | np.uint64(1)
+
+        self.item_ids_nw: dict[str, int] | None = None
+        self.item_ids_nw_inv: dict[int, str] | None = None
+
+        self._tmp_dir: tempfile.TemporaryDirectory[str] | None = None
+        self._segments_db: list[IndexSegment] = []
+        self._segment_nw: IndexSegment | None = None
+
+        self.saved: dict[str, str] = {}
+
+    def signatures(self, texts: list[str]) -> tuple[npt.NDArray[np.bool_], npt.NDArray[np.uint32]]:
+        """
+        Compute MinHash signatures for `texts`.
+
+        :return: Mask for texts that have any tokens and signatures for those texts
+        """
+        hashes = [token_hashes(text, max_tokens=self.MAX_TOKENS) for text in texts]
+        valid = np.array([len(h) > 0 for h in hashes], dtype=bool)
+        hashes = [h for h in hashes if len(h) > 0]
+
+        chunks = [np.empty((0, self.NUM_PERM), dtype=np.uint32)]
+        for chunk in batched(hashes, batch_size=self.HASH_CHUNK):
+            if len(chunk) == 0:
+                continue
+            offsets = np.cumsum([0] + [len(h) for h in chunk[:-1]])
+            permuted = ((np.outer(np.concatenate(chunk), self._perm_a) + self._perm_b) % _MERSENNE_PRIME) & _MAX_HASH
+            chunks.append(np.minimum.reduceat(permuted, offsets, axis=0).astype(np.uint32))
+        return valid, np.vstack(chunks)
+
+    def band_keys(self, signatures: npt.NDArray[np.uint32]) -> npt.NDArray[np.uint64]:
+        """
+        Reduce each band of each signature into one key; same keys within a band put items into the same bucket.
+        """
+        rows = signatures.reshape(signatures.shape[0], self.NUM_BANDS, -1).astype(np.uint64)
+        return (rows * self._band_weights).sum(axis=2, dtype=np.uint64)
+
+    def _write_batch(self, writer: SegmentWriter, batch: list[ItemEntry]) -> list[str]:
+        valid, signatures = self.signatures([entry.text for entry in batch])
+        item_ids = [entry.item_id for entry, is_valid in zip(batch, valid, strict=True) if is_valid]
+        writer.write(item_ids, signatures, self.band_keys(signatures))
+        return item_ids
+
+    def _close_segment(self, writer: SegmentWriter) -> IndexSegment | None:
+        n_items = writer.close()
+        if n_items == 0:
+            shutil.rmtree(writer.path)
+            return None
+        return IndexSegment(writer.path, num_items=n_items, num_perm=self.NUM_PERM, num_bands=self.NUM_BANDS)
+
+    def _read_meta(self) -> IndexMeta | None:
+        if self.index_dir is None or not (self.index_dir / 'meta.json').exists():
+            return None
+        meta = IndexMeta.model_validate_json((self.index_dir / 'meta.json').read_text())
+        if (meta.num_perm, meta.num_bands, meta.max_tokens, meta.seed) != (self.NUM_PERM, self.NUM_BANDS, self.MAX_TOKENS, self.SEED):
+            logger.info('Persisted index was built with different parameters.')
+            return None
+        if meta.fingerprint != self.fingerprint:
+            logger.info(f'Persisted index is outdated ({meta.fingerprint} vs {self.fingerprint}).')
+            return None
+        return meta
+
+    def _write_meta(self) -> None:
+        if self.index_dir is None or self.fingerprint is None:
+            raise RuntimeError('Index is not persisted!')
+        for segment in self._segments_db:
+            segment.alive.flush()
+        meta = IndexMeta(
+            num_perm=self.NUM_PERM,
+            num_bands=self.NUM_BANDS,
+            max_tokens=self.MAX_TOKENS,
+            seed=self.SEED,
+            fingerprint=self.fingerprint,
+            segments=[SegmentInfo(name=segment.path.name, num_items=segment.num_items) for segment in self._segments_db],
+        )
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        # Write to temporary file first, so a crash will never leave a broken index behind
+        (self.index_dir / 'meta.json.tmp').write_text(meta.model_dump_json())
+        os.replace(self.index_dir / 'meta.json.tmp', self.index_dir / 'meta.json')
+
+    def _clear_index_dir(self) -> None:
+        if self.index_dir is None:
+            return
+        (self.index_dir / 'meta.json').unlink(missing_ok=True)
+        for path in self.index_dir.glob('segment-*'):
+            shutil.rmtree(path)
+
+    async def init(self) -> None:
+        self.close()
+        self._tmp_dir = tempfile.TemporaryDirectory(prefix='nacsos-minhash-')
+
+        meta = self._read_meta()
+        if self.index_dir is not None and meta is not None:
+            logger.info(f'Loading persisted index from {self.index_dir}...')
+            self._segments_db = [IndexSegment(self.index_dir / info.name, info.num_items, self.NUM_PERM, self.NUM_BANDS) for info in meta.segments]
+            await self.existing_items.aclose()
+        else:
+            self._clear_index_dir()
+            logger.info('Loading items from database...')
+            writer = SegmentWriter((self.index_dir or Path(self._tmp_dir.name)) / f'segment-{uuid.uuid4()}', num_bands=self.NUM_BANDS)
+            async for batch in self.existing_items:
+                logger.debug(f'Received batch with {len(batch)} entries.')
+                self._write_batch(writer, batch)
+            segment = self._close_segment(writer)
+            self._segments_db = [] if segment is None else [segment]
+            if self.index_dir is not None:
+                self._write_meta()
+        logger.info(f'Found {sum(int(segment.alive.sum()) for segment in self._segments_db):,} documents already in the database.')
+
+        logger.info('Loading items from new source...')
+        writer = SegmentWriter(Path(self._tmp_dir.name) / 'new', num_bands=self.NUM_BANDS)
+        item_ids_nw = [item_id for batch in batched(self.new_items, batch_size=self.batch_size) for item_id in self._write_batch(writer, batch)]
+        self._segment_nw = self._close_segment(writer)
+        self.item_ids_nw = {item_id: i for i, item_id in enumerate(item_ids_nw)}
+        self.item_ids_nw_inv = {v: k for k, v in self.item_ids_nw.items()}
+        logger.info(f'Found {len(self.item_ids_nw):,} documents in the file.')
+
+    async def update(self, items: AsyncGenerator[list[ItemEntry], None], fingerprint: ItemIndexFingerprint) -> None:
+        """
+        Add new (or changed) items from the database to the persisted index, which is then valid for `fingerprint`.
+        Outdated signatures in older segments are retired; segments are merged once there are more than `MAX_SEGMENTS`.
+        """
+        if self.index_dir is None:
+            raise RuntimeError('Index is not persisted, nothing to update!')
+
+        writer = SegmentWriter(self.index_dir / f'segment-{uuid.uuid4()}', num_bands=self.NUM_BANDS)
+        async for batch in items:
+            valid, signatures = self.signatures([entry.text for entry in batch])
+            item_ids = np.array([entry.item_id for entry, is_valid in zip(batch, valid, strict=True) if is_valid], dtype='S36')
+
+            changed = np.ones(len(item_ids), dtype=np.bool_)
+            for segment in self._segments_db:
+                found, positions = segment.find(item_ids)
+                unchanged = (segment.signatures[positions] == signatures[found]).all(axis=1) & segment.alive[positions]
+                changed[np.flatnonzero(found)[unchanged]] = False
+                segment.alive[positions[~unchanged]] = False
+
+            writer.write(item_ids[changed], signatures[changed], self.band_keys(signatures[changed]))
+        new_segment = self._close_segment(writer)
+        logger.info(f'Added {0 if new_segment is None else new_segment.num_items:,} new or changed documents to the index.')
+
+        if new_segment is not None:
+            self._segments_db.append(new_segment)
+        self.fingerprint = fingerprint
+        self._write_meta()
+
+        if len(self._segments_db) > self.MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Merge all persisted segments into one and drop retired signatures.
+        """
+        if self.index_dir is None:
+            raise RuntimeError('Index is not persisted, nothing to compact!')
+
+        logger.info(f'Merging {len(self._segments_db)} index segments...')
+        writer = SegmentWriter(self.index_dir / f'segment-{uuid.uuid4()}', num_bands=self.NUM_BANDS)
+        for segment in self._segments_db:
+            for start in range(0, segment.num_items, self.batch_size):
+                positions = np.flatnonzero(segment.alive[start : start + self.batch_size]) + start
+                signatures = np.array(segment.signatures[positions])
+                writer.write(segment.item_ids[positions], signatures, self.band_keys(signatures))
+
+        merged = self._close_segment(writer)
+        outdated = self._segments_db
+        self._segments_db = [] if merged is None else [merged]
+        self._write_meta()
+        for segment in outdated:
+            shutil.rmtree(segment.path)
+
+    def load(self) -> None:
+        # Nothing to do, the index lives in (memory-mapped) files
+        pass
+
+    def close(self) -> None:
+        for segment in self._segments_db:
+            segment.alive.flush()
+        self._segments_db = []
+        self._segment_nw = None
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+
+    def _lookup(self, item: ItemEntry, signature: npt.NDArray[np.uint32]) -> str | None:
+        keys = self.band_keys(signature[None, :])[0]
+
+        # Tuples of (similarity, item_id_db, item_id_nw)
+        hits: list[tuple[float, str | None, str | None]] = []
+        for segment in self._segments_db:
+            positions = segment.candidates(keys, max_bucket_size=self.MAX_BUCKET_SIZE)
+            # Estimated Jaccard similarity is the proportion of matching hashes
+            similarities = (segment.signatures[positions] == signature).mean(axis=1)
+            hits += [(sim, segment.item_ids[pos].decode(), None) for pos, sim in zip(positions.tolist(), similarities.tolist(), strict=True)]
+        if self._segment_nw is not None:
+            positions = self._segment_nw.candidates(keys, max_bucket_size=self.MAX_BUCKET_SIZE)
+            similarities = (self._segment_nw.signatures[positions] == signature).mean(axis=1)
+            hits += [(sim, None, self._segment_nw.item_ids[pos].decode()) for pos, sim in zip(positions.tolist(), similarities.tolist(), strict=True)]
+
+        for similarity, item_id_db, item_id_nw in sorted(hits, key=lambda hit: hit[0], reverse=True):
+            # Too dissimilar, we can stop right here (note: list is sorted desc)
+            if 1 - similarity > self.max_slop:
+                logger.debug(f' -> No close text match with >{1 - self.max_slop} overlap')
+                return None
+
+            # Looking at itself, continue
+            if (item_id_db == item.item_id) or (item_id_nw == item.item_id):
+                continue
+
+            # See, if we already stored this in the database ahead of time
+            if item_id_db is not None:
+                logger.debug(' -> Found text match in database')
+                return item_id_db
+
+            # See, if we've seen this and saved this already in the process
+            if item_id_nw is not None and item_id_nw in self.saved:
+                logger.debug(' -> Found text match in new items (but we sent it to the database earlier)')
+                return self.saved[item_id_nw]
+
+            # else: false positive, it's a duplicate and we just saw the first one of them
+        return None
+
+    def test(self, item: ItemEntry) -> str | None:
+        return self.test_many([item])[0]
+
+    def test_many(self, items: list[ItemEntry]) -> list[str | None]:
+        if self._tmp_dir is None:
+            raise RuntimeError('Index is not initialised, yet!')
+
+        results: list[str | None] = [None] * len(items)
+        queries = [i for i, item in enumerate(items) if item.text is not None and len(item.text) > self.MIN_TEXT_LEN]
+        valid, signatures = self.signatures([items[i].text for i in queries])
+        for i, signature in zip([i for i, is_valid in zip(queries, valid, strict=True) if is_valid], signatures, strict=True):
+            results[i] = self._lookup(items[i], signature)
+        return results
+
+    # Follow chains of duplicate reference if needed to resolve to the "origin" duplicate
+    def _resolve(self, cid: str) -> str:
+        if cid in self.saved:
+            return self._resolve(self.saved[cid])
+        return cid
+
+    def register_stored(self, new_id: str, existing_id: str | None) -> None:
+        if existing_id is None:
+            self.saved[new_id] = new_id
+        else:
+            self.saved[new_id] = self._resolve(existing_id)
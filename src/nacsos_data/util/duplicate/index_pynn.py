@@ -111,6 +111,13 @@ class DuplicateIndex:
         logger.info(f'document-word matrix has shape: {vectors.shape}')
         self.index = pynndescent.NNDescent(vectors, metric='jaccard')
 
+    def load(self) -> None:
+        # Nothing to do, the index lives in memory
+        pass
+
+    def close(self) -> None:
+        self.index = None
+
     def test(self, item: ItemEntry) -> str | None:
         if self.index is None:
             raise RuntimeError('Index is not initialised, yet!')
@@ -147,6 +154,9 @@ class DuplicateIndex:
                 # else: false positive, it's a duplicate and we just saw the first one of them
         return None
 
+    def test_many(self, items: list[ItemEntry]) -> list[str | None]:
+        return [self.test(item) for item in items]
+
     # Follow chains of duplicate reference if needed to resolve to the "origin" duplicate
     def _resolve(self, cid: str) -> str:
         if cid in self.saved:
@@ -11,8 +11,8 @@ from psycopg.errors import UniqueViolation, OperationalError
 from nacsos_data.db.engine import DatabaseEngineAsync
 from nacsos_data.db.schemas import Item, LexisNexisItem, LexisNexisItemSource
 
-from .. import elapsed_timer
-from ..duplicate import MilvusDuplicateIndex
+from .. import elapsed_timer, get_peak_rss
+from ..duplicate import AnyDuplicateIndex, DuplicateIndexType, get_duplicate_index
 from ..text import extract_vocabulary, tokenise_item
 from ...db.crud.imports import get_or_create_import, set_session_mutex, get_latest_revision, upsert_m2m, update_revision_statistics
 from ...db.schemas.imports import ImportRevision
@@ -124,14 +124,15 @@ async def import_lexis_nexis(  # noqa: C901
     max_features: int = 5000,
     logger: logging.Logger | None = None,
     allow_empty_text: bool = False,
+    index_type: DuplicateIndexType = 'milvus',
 ) -> tuple[str, int]:
     """
     Imports and deduplicates lexisnexis items.
 
     - Create revision
     - Check for ID duplicates (LexisNexisItemSource.lexis_id)
-    - Create milvus index
-    - Initialise milvus index with existing LexisNexisItem.text and new ones
+    - Create duplicate detection index (milvus by default, see `index_type`)
+    - Initialise index with existing LexisNexisItem.text and new ones
     - for each new item
        - check for ID duplicate
        - check for duplicate in index
@@ -140,6 +141,7 @@ async def import_lexis_nexis(  # noqa: C901
 
 
     :param max_text_len: For similarity check, cut texts longer than that; no need to compare more than that
+    :param index_type: Duplicate detection index for text matches (see `nacsos_data.util.duplicate.get_duplicate_index`)
     """
 
     if logger is None:
@@ -198,16 +200,18 @@ async def import_lexis_nexis(  # noqa: C901
         del token_counts  # clean up term counts to save RAM
     logger.info(f'Processed {n_unknown_items:,} items to build vocabulary.')
 
-    if vectoriser is None:
+    # MinHash index works on token sets directly and needs no vectoriser
+    if vectoriser is None and index_type != 'minhash':
         with elapsed_timer(logger, f'Setting up vectorizer with {len(vocabulary):,} tokens in the vocabulary'):
             vectoriser = CountVectorizer(vocabulary=vocabulary)
 
-    index: MilvusDuplicateIndex | None = None
+    index: AnyDuplicateIndex | None = None
 
-    logger.debug('Constructing Milvus index...')
+    logger.debug(f'Constructing {index_type} index...')
     async with db_engine.session() as session:  # type: AsyncSession
         with elapsed_timer(logger, '  -> preparing duplicate detection index...'):
-            index = MilvusDuplicateIndex(
+            index = get_duplicate_index(
+                index_type=index_type,
                 existing_items=_item_entries_from_db(
                     session=session,
                     batch_size=batch_size,
@@ -230,6 +234,7 @@ async def import_lexis_nexis(  # noqa: C901
 
         with elapsed_timer(logger, '  -> initialising duplicate detection index...'):
             await index.init()
+        logger.info(f'Peak memory usage (RSS) after building the index: {get_peak_rss() / 1024**2:,.1f} MB')
 
     logger.info('Finished pre-processing and index building.')
     logger.info('Proceeding to insert new items and creating m2m tuples...')
@@ -339,8 +344,8 @@ async def import_lexis_nexis(  # noqa: C901
         # Free our import mutex
         await set_session_mutex(session, project_id=project_id, lock=False)
 
-    with elapsed_timer(logger, 'Cleaning up milvus!'):
-        index.client.drop_collection(index.collection_name)
+    with elapsed_timer(logger, f'Cleaning up {index_type} duplicate detection index!'):
+        index.close()
 
     # Return to caller
     return import_id, revision_counter
@@ -1,5 +1,16 @@
-from typing import Type, Sequence
+import json
+from enum import Enum
+from time import time
+from functools import cache
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Generator, Type, Sequence, Literal
+from uuid import UUID
 import sqlalchemy as sa
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import Executable, ClauseElement
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import MappedColumn, InstrumentedAttribute, Session
 
@@ -7,6 +18,8 @@ from nacsos_data.db.engine import DBSession
 from nacsos_data.db.schemas import (
     AcademicItem,
     Annotation,
+    AnnotationScheme,
+    Import,
     BotAnnotation,
     BotAnnotationMetaData,
     Assignment,
@@ -19,7 +32,10 @@ from nacsos_data.db.schemas import (
     Project,
     AnyItemSchema,
 )
+from nacsos_data.db.schemas.imports import ImportRevision
+from nacsos_data.db.schemas.items.base import TS_CONFIG, ts_document
 from nacsos_data.models.items import AcademicItemModel, LexisNexisItemModel, GenericItemModel, FullLexisNexisItemModel, AnyItemModel
+from nacsos_data.models.items.lexis_nexis import LexisNexisItemSourceModel
 from nacsos_data.models.nql import (
     NQLFilter,
     SetComparator,
@@ -40,13 +56,46 @@ from nacsos_data.models.nql import (
     MetaFilterStr,
     AbstractFilter,
 )
+from nacsos_data.db.crud import keyset_paginate, next_cursor
 from nacsos_data.db.crud.items.lexis_nexis import lexis_orm_to_model
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from nacsos_data.util.similarity import SimilarityIndex
+
+
+# How free-text filters (title/abstract) are compiled:
+#   - like: `ILIKE '%value%'` (accelerated by the trigram indices, if they exist)
+#   - fts: full-text search via `@@ websearch_to_tsquery(value)` (needs the `_tsv` indices to be fast)
+SearchMode = Literal['like', 'fts']
+
+# Full-text indices for columns that can be searched in 'fts' mode
+FTS_INDICES = {'ix_item_text_tsv', 'ix_academic_item_title_tsv'}
+
+# How the filter tree is compiled to SQL:
+#   - cte: one CTE per node, combined via (outer) joins on the project items
+#   - flat: a single WHERE clause with EXISTS semi-joins for filters on related tables (see `NQLQuery._flatten()`)
+# Both return the same items (see `nacsos_data.scripts.check_nql_compilers`); 'cte' stays the default for now.
+NQLCompiler = Literal['cte', 'flat']
+
+# Filters that become semi-joins in the flat compiler (and are worth sharing when they appear more than once)
+SEMI_JOIN_FILTERS = (LabelFilterMulti, LabelFilterInt, LabelFilterBool, AssignmentFilter, AnnotationFilter, ImportFilter)
+
 
 class InvalidNQLError(Exception):
     pass
 
 
+async def detect_search_mode(session: DBSession | AsyncSession) -> SearchMode:
+    """
+    Use full-text search if the respective indices exist in the database, otherwise fall back to ILIKE.
+    """
+    indices = set((await session.execute(sa.text('SELECT indexname FROM pg_indexes WHERE indexname = ANY(:names)'), {'names': list(FTS_INDICES)})).scalars())
+    if indices == FTS_INDICES:
+        return 'fts'
+    return 'like'
+
+
 def _field_cmp(cmp: ComparatorExt, value: int | float | bool | str, field: InstrumentedAttribute | sa.Function) -> sa.ColumnExpressionArgument:  # type: ignore[type-arg]
     if cmp == '>':
         return sa.and_(field > value, field.isnot(None))
@@ -81,6 +130,120 @@ def _field_cmp_lst(cmp: SetComparator, values: list[int], field: MappedColumn) -
     raise InvalidNQLError(f'Unexpected comparator "{cmp}".')
 
 
+def _leaves(query: NQLFilter) -> Generator[NQLFilter, None, None]:
+    if isinstance(query, SubQuery):
+        for child in [query.not_] if query.not_ is not None else (query.and_ or query.or_ or []):
+            yield from _leaves(child)
+    else:
+        yield query
+
+
+def _node_key(query: NQLFilter) -> str:
+    key: str = query.model_dump_json()
+    return key
+
+
+def _label_value_where(
+    subquery: LabelFilterMulti | LabelFilterBool | LabelFilterInt,
+    annotation: Type[Annotation | BotAnnotation],
+) -> sa.ColumnExpressionArgument | MappedColumn:  # type: ignore[type-arg]
+    if isinstance(subquery, LabelFilterBool):
+        if subquery.value_bool is None:
+            raise InvalidNQLError('Missing value!')
+        return annotation.value_bool == subquery.value_bool
+    if isinstance(subquery, LabelFilterInt):
+        if subquery.value_int is None:
+            raise InvalidNQLError('Missing value!')
+        return _field_cmp(subquery.comp, subquery.value_int, annotation.value_int)
+    if isinstance(subquery, LabelFilterMulti):
+        if subquery.multi_int is None:
+            raise InvalidNQLError('Missing value!')
+        return _field_cmp_lst(subquery.comp, subquery.multi_int, annotation.multi_int)  # type: ignore[arg-type]
+    raise ValueError('Unexpected annotation label value filter clause.')
+
+
+class Explain(Executable, ClauseElement):
+    """
+    `EXPLAIN [ANALYZE]` for a statement, so query plans can be inspected with the same bind parameters as the statement itself.
+    Execute it like any other statement; each row is one line of the plan (or a single row with the plan if `format_json` is set).
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: sa.Select, analyze: bool = False, format_json: bool = False):  # type: ignore[type-arg]
+        self.statement = statement
+        self.analyze = analyze
+        self.format_json = format_json
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    options = [option for option, enabled in [('ANALYZE', element.analyze), ('FORMAT JSON', element.format_json)] if enabled]
+    prefix = f'EXPLAIN ({", ".join(options)})' if len(options) > 0 else 'EXPLAIN'
+    return f'{prefix} {compiler.process(element.statement, **kw)}'
+
+
+# How ORM rows are turned into models:
+#   - validate: `model_validate()` for each row
+#   - bulk: one `TypeAdapter(list[Model])` validation for the whole page
+#   - construct: `model_construct()` without any validation, only for trusted database rows (nested JSON fields stay plain dicts/lists)
+TransformMode = Literal['validate', 'bulk', 'construct']
+
+
+@cache
+def _list_adapter(Model: type[BaseModel]) -> TypeAdapter[list[Any]]:
+    return TypeAdapter(list[Model])  # type: ignore[valid-type]
+
+
+def _row_dict(obj: Any, fields: set[str]) -> dict[str, Any]:
+    return {key: value for key, value in obj.__dict__.items() if key in fields}
+
+
+def _arrow_value(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict | list):
+        return json.dumps(value, default=str)
+    return value
+
+
+def rows_to_record_batch(columns: list[str], rows: Sequence[Sequence[Any]]) -> 'pa.RecordBatch':
+    """
+    Convert results from `NQLQuery.results_raw()` to an arrow record batch.
+    UUIDs and enums become strings and nested JSON (e.g. authors) becomes serialised JSON strings.
+    """
+    import pyarrow as pa
+
+    return pa.RecordBatch.from_pydict({column: [_arrow_value(row[ci]) for row in rows] for ci, column in enumerate(columns)})
+
+
+# Counts are cached per filter and project state (see `NQLQuery._watermark_stmt()`), so edits invalidate them right away.
+# The TTL is only a safety net for changes the watermarks don't cover (e.g. manually edited items).
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 512
+_count_cache: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
+
+def _cached_count(key: str) -> int | None:
+    if key not in _count_cache:
+        return None
+    timestamp, count = _count_cache[key]
+    if time() - timestamp > COUNT_CACHE_TTL:
+        del _count_cache[key]
+        return None
+    _count_cache.move_to_end(key)
+    return count
+
+
+def _cache_count(key: str, count: int) -> None:
+    _count_cache[key] = time(), count
+    _count_cache.move_to_end(key)
+    while len(_count_cache) > COUNT_CACHE_SIZE:
+        _count_cache.popitem(last=False)
+
+
 def get_select_base(project_type: ItemType | str = ItemType.academic) -> tuple[Type[AnyItemSchema], Type[AnyItemModel], sa.Select]:  # type: ignore[type-arg]
     if project_type == ItemType.academic:
         return (  # type: ignore[return-value]
@@ -114,19 +277,42 @@ def get_select_base(project_type: ItemType | str = ItemType.academic) -> tuple[T
 
 
 class NQLQuery:
-    def __init__(self, project_id: str, query: NQLFilter | None = None, project_type: ItemType | str = ItemType.academic):
+    def __init__(
+        self,
+        project_id: str,
+        query: NQLFilter | None = None,
+        project_type: ItemType | str = ItemType.academic,
+        search_mode: SearchMode = 'like',
+        compiler: NQLCompiler = 'cte',
+        similarity_index: 'SimilarityIndex | None' = None,
+        similar_top_k: int = 100,
+        similar_threshold: float = 0.0,
+    ):
         self.project_id = project_id
         self.project_type = project_type
+        self.search_mode = search_mode
+        self.compiler = compiler
+        # Lookup for the `SIMILAR` operator (needs to be initialised)
+        self.similarity_index = similarity_index
+        self.similar_top_k = similar_top_k
+        self.similar_threshold = similar_threshold
+        self._shared: set[str] = set()
+        self._shared_ctes: dict[str, sa.CTE] = {}
 
         self.query = query
-        self.Schema, self.Model, _stmt = get_select_base(project_type=project_type)
-        self._project_items = sa.select(Item.item_id).where(Item.project_id == project_id).cte('project_items')
+        self.Schema, self.Model, _ = get_select_base(project_type=project_type)
+        self._stmt = self._compile()
 
-        if query is not None:
-            filter_cte = self._assemble_filters(query)
-            self._stmt = _stmt.where(Item.project_id == project_id).join(filter_cte, filter_cte.c.item_id == Item.item_id)
-        else:
-            self._stmt = _stmt.where(Item.project_id == project_id)
+    def _compile(self) -> sa.Select:  # type: ignore[type-arg]
+        _, _, stmt = get_select_base(project_type=self.project_type)
+        self._project_items = sa.select(Item.item_id).where(Item.project_id == self.project_id).cte('project_items')
+
+        if self.query is not None and self.compiler == 'flat':
+            return stmt.where(Item.project_id == self.project_id, self._flatten(self.query))
+        if self.query is not None:
+            filter_cte = self._assemble_filters(self.query)
+            return stmt.where(Item.project_id == self.project_id).join(filter_cte, filter_cte.c.item_id == Item.item_id)
+        return stmt.where(Item.project_id == self.project_id)
 
     def __str__(self) -> str:
         return str(self.query)
@@ -138,6 +324,11 @@ class NQLQuery:
         project_id: str,
         project_type: ItemType | None = None,
         query: NQLFilter | None = None,
+        search_mode: SearchMode | Literal['auto'] = 'like',
+        compiler: NQLCompiler = 'cte',
+        similarity_index: 'SimilarityIndex | None' = None,
+        similar_top_k: int = 100,
+        similar_threshold: float = 0.0,
     ) -> 'NQLQuery':
         if project_type is None:
             project_type = await session.scalar(sa.select(Project.type).where(Project.project_id == project_id))
@@ -145,7 +336,19 @@ class NQLQuery:
             if project_type is None:
                 raise KeyError(f'Found no matching project for {project_id}. This should NEVER happen!')
 
-        return cls(query=query, project_id=str(project_id), project_type=project_type)
+        if search_mode == 'auto':
+            search_mode = await detect_search_mode(session)
+
+        return cls(
+            query=query,
+            project_id=str(project_id),
+            project_type=project_type,
+            search_mode=search_mode,
+            compiler=compiler,
+            similarity_index=similarity_index,
+            similar_top_k=similar_top_k,
+            similar_threshold=similar_threshold,
+        )
 
     @property
     def stmt(self) -> sa.Select:  # type: ignore[type-arg]
@@ -173,6 +376,24 @@ class NQLQuery:
 
         raise InvalidNQLError(f'Field "{field}" in {self.project_type} is not valid.')
 
+    def _similar_where(self, value: int | str, col: InstrumentedAttribute) -> sa.ColumnExpressionArgument:  # type: ignore[type-arg]
+        if not (col is Item.text or col is AcademicItem.title):
+            raise InvalidNQLError('"SIMILAR" is only supported for title and abstract.')
+        if self.similarity_index is None:
+            raise InvalidNQLError('"SIMILAR" needs a similarity index for this project.')
+        hits = self.similarity_index.query(str(value), top_k=self.similar_top_k, min_similarity=self.similar_threshold)
+        if len(hits) == 0:
+            return sa.false()
+        # Candidates from the nearest neighbour lookup are passed as one array parameter
+        return Item.item_id == sa.any_(sa.literal([UUID(item_id) for item_id, _ in hits], ARRAY(PGUUID(as_uuid=True))))
+
+    def _field_where(self, comp: ComparatorExt, value: int | str, col: InstrumentedAttribute) -> sa.ColumnExpressionArgument:  # type: ignore[type-arg]
+        if comp == 'SIMILAR':
+            return self._similar_where(value, col)
+        if comp == 'LIKE' and self.search_mode == 'fts' and (col is Item.text or col is AcademicItem.title):
+            return ts_document(col).op('@@')(sa.func.websearch_to_tsquery(sa.literal_column(f"'{TS_CONFIG}'"), str(value)))
+        return _field_cmp(comp, value, col)
+
     def _assemble_filters(self, subquery: NQLFilter) -> sa.CTE:  # noqa: C901
         if isinstance(subquery, SubQuery):
             #  | query __ AND __ query             {% (d) => ({ filter: "sub", "and_": [d[0], d[4]]            }) %}
@@ -208,14 +429,14 @@ class NQLQuery:
             #   | SRC      ":" _ dqstring           {% (d) => ({ filter: "field", field: "source",      value:  d[3], comp: "LIKE" }) %}
             schema, col = self._get_column(subquery.field)
             comp = subquery.comp
-            if subquery.field in {'title', 'text', 'abstract'}:
+            if subquery.field in {'title', 'text', 'abstract'} and comp != 'SIMILAR':
                 comp = 'LIKE'
             if comp is None:
                 raise InvalidNQLError(f'Missing comparator: {subquery}!')
             return (
                 sa.select(self._project_items.c.item_id)
                 .join(schema, schema.item_id == self._project_items.c.item_id)
-                .where(_field_cmp(comp, subquery.value, col))
+                .where(self._field_where(comp, subquery.value, col))
                 .cte()
             )
 
@@ -366,19 +587,7 @@ class NQLQuery:
     def _label_filter(self, subquery: LabelFilterMulti | LabelFilterBool | LabelFilterInt) -> sa.CTE:  # noqa: C901
 
         def _value_where(annotation: Type[Annotation | BotAnnotation]) -> sa.ColumnExpressionArgument | MappedColumn:  # type: ignore[type-arg]
-            if isinstance(subquery, LabelFilterBool):
-                if subquery.value_bool is None:
-                    raise InvalidNQLError('Missing value!')
-                return annotation.value_bool == subquery.value_bool
-            if isinstance(subquery, LabelFilterInt):
-                if subquery.value_int is None:
-                    raise InvalidNQLError('Missing value!')
-                return _field_cmp(subquery.comp, subquery.value_int, annotation.value_int)
-            if isinstance(subquery, LabelFilterMulti):
-                if subquery.multi_int is None:
-                    raise InvalidNQLError('Missing value!')
-                return _field_cmp_lst(subquery.comp, subquery.multi_int, annotation.multi_int)  # type: ignore[arg-type]
-            raise ValueError('Unexpected annotation label value filter clause.')
+            return _label_value_where(subquery, annotation)
 
         if subquery.type in {'resolved', 'bot'}:
             if subquery.users is not None:
@@ -434,32 +643,343 @@ class NQLQuery:
                 return query.cte()
             return _annotation().cte()
 
-    def count(self, session: Session) -> int:
+    def _flatten(self, query: NQLFilter) -> sa.ColumnElement[bool]:
+        """
+        Compiles the filter tree into a single WHERE clause on the outer query (rather than one CTE per node).
+        Field filters become plain predicates on the item row, filters on related tables become EXISTS semi-joins.
+        Only nodes that appear more than once in the tree are materialised as a CTE.
+        """
+        keys = Counter(_node_key(node) for node in _leaves(query) if isinstance(node, SEMI_JOIN_FILTERS))
+        self._shared = {key for key, cnt in keys.items() if cnt > 1}
+        self._shared_ctes = {}
+        return self._flat_where(query)
+
+    def _flat_where(self, subquery: NQLFilter) -> sa.ColumnElement[bool]:
+        if isinstance(subquery, SubQuery):
+            if subquery.not_ is not None:
+                # Filters on the item row can be NULL (e.g. missing meta keys), which would not be negated by NOT.
+                # The CTE compiler used set semantics (not in the child set), which we get with coalesce.
+                return sa.not_(sa.func.coalesce(self._flat_where(subquery.not_), sa.false()))
+            if subquery.and_ is not None:
+                return sa.and_(*(self._flat_where(child) for child in subquery.and_))
+            if subquery.or_ is not None:
+                return sa.or_(*(self._flat_where(child) for child in subquery.or_))
+            raise InvalidNQLError('Missing subquery!')
+
+        key = _node_key(subquery)
+        if key not in self._shared:
+            return self._flat_leaf(subquery)
+
+        if key not in self._shared_ctes:
+            self._shared_ctes[key] = sa.select(Item.item_id).where(Item.project_id == self.project_id, self._flat_leaf(subquery)).cte()
+        cte = self._shared_ctes[key]
+        return sa.select(cte.c.item_id).where(cte.c.item_id == Item.item_id).exists()
+
+    def _flat_leaf(self, subquery: NQLFilter) -> sa.ColumnElement[bool]:  # noqa: C901
+        if isinstance(subquery, FieldFilter):
+            schema, col = self._get_column(subquery.field)
+            comp = subquery.comp
+            if subquery.field in {'title', 'text', 'abstract'} and comp != 'SIMILAR':
+                comp = 'LIKE'
+            if comp is None:
+                raise InvalidNQLError(f'Missing comparator: {subquery}!')
+            where = self._field_where(comp, subquery.value, col)
+            if schema is LexisNexisItemSource:
+                # Sources are aggregated in the outer query, so they can't be filtered there directly
+                return Item.item_id.in_(sa.select(LexisNexisItemSource.item_id).where(where).correlate(None))
+            return sa.and_(where)
+
+        if isinstance(subquery, FieldFilters):
+            if subquery.values is None:
+                raise InvalidNQLError('Missing values!')
+            schema, col = self._get_column(subquery.field)
+            if schema is LexisNexisItemSource:
+                return Item.item_id.in_(sa.select(LexisNexisItemSource.item_id).where(col.in_(subquery.values)).correlate(None))
+            return col.in_(subquery.values)
+
+        if isinstance(subquery, MetaFilterBool) or isinstance(subquery, MetaFilterInt) or isinstance(subquery, MetaFilterStr):
+            schema, col = self._get_column('meta')
+            if isinstance(subquery, MetaFilterBool):
+                return sa.and_(col[subquery.field].as_boolean() == bool(subquery.value))
+            if isinstance(subquery, MetaFilterInt):
+                return sa.and_(col[subquery.field].as_integer() == subquery.value)
+            return sa.and_(col[subquery.field].isnot(None), col[subquery.field].as_string().ilike(f'%{subquery.value}%'))
+
+        if isinstance(subquery, LabelFilterMulti) or isinstance(subquery, LabelFilterInt) or isinstance(subquery, LabelFilterBool):
+            return self._flat_label(subquery)
+
+        if isinstance(subquery, AssignmentFilter):
+            return self._flat_assignment(subquery)
+
+        if isinstance(subquery, AnnotationFilter):
+            if subquery.scheme is None and subquery.scopes is None:
+                annotated = sa.select(Annotation.item_id).where(Annotation.item_id == Item.item_id).exists()
+                return annotated if subquery.incl else sa.not_(annotated)
+
+            assignments = sa.select(Assignment.assignment_id).where(Assignment.item_id == Item.item_id)
+            if subquery.scheme is not None:
+                assignments = assignments.where(Assignment.annotation_scheme_id == subquery.scheme)
+            else:
+                assignments = assignments.where(Assignment.assignment_scope_id.in_(subquery.scopes))  # type: ignore[arg-type]
+            has_annotation = sa.select(Annotation.item_id).where(Annotation.assignment_id == Assignment.assignment_id).exists()
+            if subquery.incl:
+                return assignments.where(has_annotation).exists()
+            # Same as the outer joins in the CTE compiler: no such assignment at all or one without annotations
+            return sa.or_(sa.not_(assignments.exists()), assignments.where(sa.not_(has_annotation)).exists())
+
+        if isinstance(subquery, AbstractFilter):
+            if subquery.comp is not None and subquery.size is not None:
+                return sa.and_(Item.text.isnot(None), _field_cmp(subquery.comp, subquery.size, sa.func.char_length(Item.text)))
+            if subquery.empty is True:
+                return Item.text.is_(None)
+            if subquery.empty is False:
+                return Item.text.isnot(None)
+
+        if isinstance(subquery, ImportFilter):
+            wheres: list[sa.ColumnElement[bool]] = []
+            include_ids = [iid.uuid for iid in subquery.import_ids if iid.incl]
+            if len(include_ids) > 0:
+                wheres.append(
+                    sa.select(m2m_import_item_table.c.item_id)
+                    .where(m2m_import_item_table.c.item_id == Item.item_id, m2m_import_item_table.c.import_id.in_(include_ids))
+                    .exists()
+                )
+            exclude_ids = [iid.uuid for iid in subquery.import_ids if not iid.incl]
+            if len(exclude_ids) > 0:
+                wheres.append(
+                    ~sa.select(m2m_import_item_table.c.item_id)
+                    .where(m2m_import_item_table.c.item_id == Item.item_id, m2m_import_item_table.c.import_id.in_(exclude_ids))
+                    .exists()
+                )
+            return sa.and_(sa.true(), *wheres)
+
+        raise InvalidNQLError(f'Not sure what to do with this: {subquery}!')
+
+    def _flat_assignment(self, subquery: AssignmentFilter) -> sa.ColumnElement[bool]:
+        assignments = sa.select(Assignment.item_id).where(Assignment.item_id == Item.item_id)
+        if subquery.mode == 1:
+            return assignments.exists()
+        if subquery.mode == 2:
+            if subquery.scopes is None:
+                raise InvalidNQLError('No scopes defined!')
+            return assignments.where(Assignment.assignment_scope_id.in_(subquery.scopes)).exists()
+        if subquery.mode == 3:
+            if subquery.scopes is None:
+                raise InvalidNQLError('No scopes defined!')
+            raise NotImplementedError('"IS ASSIGNED BUT NOT IN" filter not implemented yet')
+        if subquery.mode == 4:
+            return sa.not_(assignments.exists())
+        if subquery.mode == 5:
+            if subquery.scopes is None:
+                raise InvalidNQLError('No scopes defined!')
+            # FIXME: The CTE compiler inner joins assignments and then asks for them to be NULL, so this never matches anything.
+            #        Kept for consistent results between both compilers.
+            return sa.false()
+        if subquery.mode == 6 or subquery.mode == 7:
+            if subquery.scheme is None:
+                raise InvalidNQLError('No scheme defined!')
+            if subquery.mode == 6:
+                return assignments.where(Assignment.annotation_scheme_id == subquery.scheme).exists()
+            return assignments.where(Assignment.annotation_scheme_id != subquery.scheme).exists()
+        raise InvalidNQLError(f'Unknown assignment filter mode: {subquery.mode}')
+
+    def _flat_label(self, subquery: LabelFilterMulti | LabelFilterBool | LabelFilterInt) -> sa.ColumnElement[bool]:
+        if subquery.type in {'resolved', 'bot'}:
+            if subquery.users is not None:
+                raise InvalidNQLError('You cannot filter by users for BotAnnotations!')
+            query = (
+                sa.select(BotAnnotation.item_id)
+                .join(
+                    BotAnnotationMetaData,
+                    sa.and_(
+                        BotAnnotationMetaData.bot_annotation_metadata_id == BotAnnotation.bot_annotation_metadata_id,
+                        BotAnnotationMetaData.kind == 'RESOLVE' if subquery.type == 'resolved' else BotAnnotationMetaData.kind != 'RESOLVE',
+                    ),
+                )
+                .where(BotAnnotation.item_id == Item.item_id, BotAnnotation.key == subquery.key, _label_value_where(subquery, BotAnnotation))
+            )
+            if subquery.repeats is not None:
+                query = query.where(BotAnnotation.repeat.in_(subquery.repeats))
+            if subquery.scopes is not None:
+                return query.where(BotAnnotation.bot_annotation_metadata_id.in_(subquery.scopes)).exists()
+            if subquery.scheme is not None:
+                return query.where(BotAnnotationMetaData.annotation_scheme_id == subquery.scheme).exists()
+            return query.exists()
+
+        query = sa.select(Annotation.item_id).where(
+            Annotation.item_id == Item.item_id, Annotation.key == subquery.key, _label_value_where(subquery, Annotation)
+        )
+        # Same precedence as in the CTE compiler
+        if subquery.repeats is not None:
+            query = query.where(Annotation.repeat.in_(subquery.repeats))
+        elif subquery.scheme is not None:
+            query = query.where(Annotation.annotation_scheme_id == subquery.scheme)
+        elif subquery.scopes is not None:
+            query = query.join(Assignment, sa.and_(Assignment.assignment_id == Annotation.assignment_id, Assignment.assignment_scope_id.in_(subquery.scopes)))
+
+        if subquery.users is not None and subquery.users.mode == 'ANY':
+            return query.where(Annotation.user_id.in_(subquery.users.user_ids)).exists()
+        if subquery.users is not None and subquery.users.mode == 'ALL':
+            return sa.and_(sa.true(), *(query.where(Annotation.user_id == user).exists() for user in subquery.users.user_ids))
+        return query.exists()
+
+    def _count_stmt(self) -> sa.Select:  # type: ignore[type-arg]
         stmt = self.stmt.subquery()
-        cnt_stmt = sa.func.count(stmt.c.item_id)
-        return session.execute(cnt_stmt).scalar()  # type: ignore[return-value]
+        return sa.select(sa.func.count(stmt.c.item_id))
+
+    def _watermark_stmt(self) -> sa.Select:  # type: ignore[type-arg]
+        """
+        Latest import revision, assignment, and annotation changes in this project; if any of these change, cached counts are outdated.
+        Counts are included to also notice deletions.
+        """
+        revisions = sa.select(sa.func.max(ImportRevision.time_created), sa.func.count()).join(Import, Import.import_id == ImportRevision.import_id)
+        # Assignments have no timestamps, but new ones get a higher `order`
+        assignments = sa.select(sa.func.max(Assignment.order), sa.func.count()).join(
+            AnnotationScheme, AnnotationScheme.annotation_scheme_id == Assignment.annotation_scheme_id
+        )
+        annotations = sa.select(sa.func.max(sa.func.coalesce(Annotation.time_updated, Annotation.time_created)), sa.func.count()).join(
+            AnnotationScheme, AnnotationScheme.annotation_scheme_id == Annotation.annotation_scheme_id
+        )
+        bot_annotations = sa.select(sa.func.max(sa.func.coalesce(BotAnnotation.time_updated, BotAnnotation.time_created)), sa.func.count()).join(
+            BotAnnotationMetaData, BotAnnotationMetaData.bot_annotation_metadata_id == BotAnnotation.bot_annotation_metadata_id
+        )
+        return sa.select(
+            sa.func.json_build_array(*revisions.where(Import.project_id == self.project_id).subquery().c),
+            sa.func.json_build_array(*assignments.where(AnnotationScheme.project_id == self.project_id).subquery().c),
+            sa.func.json_build_array(*annotations.where(AnnotationScheme.project_id == self.project_id).subquery().c),
+            sa.func.json_build_array(*bot_annotations.where(BotAnnotationMetaData.project_id == self.project_id).subquery().c),
+        )
+
+    def _count_key(self, estimate: bool, watermark: Sequence[Any]) -> str:
+        query = self.query.model_dump(mode='json') if self.query is not None else None
+        # Results of `SIMILAR` also depend on the lookup parameters and the state of the similarity index
+        similar: list[Any] = [self.similar_top_k, self.similar_threshold]
+        if self.similarity_index is not None:
+            fingerprint = self.similarity_index.fingerprint
+            similar += [self.similarity_index.backend, None if fingerprint is None else fingerprint.model_dump(mode='json')]
+        return json.dumps([self.project_id, str(self.project_type), self.search_mode, estimate, query, similar, list(watermark)], sort_keys=True, default=str)
+
+    @classmethod
+    def _estimate(cls, plan: list[dict[str, Any]]) -> int:
+        return int(plan[0]['Plan']['Plan Rows'])
 
-    def _transform_results(self, rslt: Sequence[sa.RowMapping]) -> list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel]:
+    def count(self, session: Session, estimate: bool = False, use_cache: bool = True) -> int:
+        """
+        Number of items matching this query.
+        :param session:
+        :param estimate: if true, return the row estimate of the query planner (fast, but possibly far off) instead of the exact count
+        :param use_cache: re-use counts from earlier calls with the same filter, as long as imports, assignments, and annotations in the project did not change
+        :return:
+        """
+        key = None
+        if use_cache:
+            key = self._count_key(estimate, session.execute(self._watermark_stmt()).one())
+            if (cached := _cached_count(key)) is not None:
+                return cached
+
+        if estimate:
+            cnt = self._estimate(session.execute(Explain(self.stmt, format_json=True)).scalar_one())
+        else:
+            cnt = session.execute(self._count_stmt()).scalar_one()
+
+        if key is not None:
+            _cache_count(key, cnt)
+        return cnt
+
+    async def count_async(self, session: AsyncSession | DBSession, estimate: bool = False, use_cache: bool = True) -> int:
+        key = None
+        if use_cache:
+            key = self._count_key(estimate, (await session.execute(self._watermark_stmt())).one())
+            if (cached := _cached_count(key)) is not None:
+                return cached
+
+        if estimate:
+            cnt = self._estimate((await session.execute(Explain(self.stmt, format_json=True))).scalar_one())
+        else:
+            cnt = (await session.execute(self._count_stmt())).scalar_one()
+
+        if key is not None:
+            _cache_count(key, cnt)
+        return cnt
+
+    def explain(self, session: Session, analyze: bool = False) -> list[str]:
+        """
+        Query plan for this query (e.g. to compare the 'cte' and 'flat' compiler); `analyze` actually runs the query.
+        """
+        return list(session.execute(Explain(self.stmt, analyze=analyze)).scalars())
+
+    async def explain_async(self, session: AsyncSession | DBSession, analyze: bool = False) -> list[str]:
+        return list((await session.execute(Explain(self.stmt, analyze=analyze))).scalars())
+
+    def _transform_results(
+        self, rslt: Sequence[sa.RowMapping], transform: TransformMode = 'validate'
+    ) -> list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel]:
         if self.project_type == ItemType.lexis:
-            return lexis_orm_to_model(rslt)
-        elif self.project_type == ItemType.academic:
-            return [AcademicItemModel.model_validate(item['AcademicItem'].__dict__) for item in rslt]
+            if transform == 'validate':
+                return lexis_orm_to_model(rslt)
+            fields = set(FullLexisNexisItemModel.model_fields)
+            if transform == 'bulk':
+                return _list_adapter(FullLexisNexisItemModel).validate_python(
+                    [{**_row_dict(row['LexisNexisItem'], fields), 'sources': row['sources_grp']} for row in rslt]
+                )
+            return [
+                FullLexisNexisItemModel.model_construct(
+                    **_row_dict(row['LexisNexisItem'], fields),
+                    sources=[LexisNexisItemSourceModel.model_construct(**src) for src in row['sources_grp']],
+                )
+                for row in rslt
+            ]
+
+        if self.project_type == ItemType.academic:
+            Model: Type[AcademicItemModel | GenericItemModel] = AcademicItemModel
         elif self.project_type == ItemType.generic:
-            return [GenericItemModel.model_validate(item['GenericItem'].__dict__) for item in rslt]
+            Model = GenericItemModel
         else:
             raise NotImplementedError(f'Unexpected project type: {self.project_type}')
 
+        key = self.Schema.__name__
+        if transform == 'validate':
+            return [Model.model_validate(item[key].__dict__) for item in rslt]  # type: ignore[return-value]
+        fields = set(Model.model_fields)
+        if transform == 'bulk':
+            return _list_adapter(Model).validate_python([_row_dict(item[key], fields) for item in rslt])
+        return [Model.model_construct(**_row_dict(item[key], fields)) for item in rslt]  # type: ignore[return-value]
+
+    def _raw_stmt(self, stmt: sa.Select) -> tuple[list[str], sa.Select]:  # type: ignore[type-arg]
+        fields = [field for field in self.Model.model_fields if hasattr(self.Schema, field)]
+        columns = [getattr(self.Schema, field) for field in fields]
+        if self.project_type == ItemType.lexis:
+            fields.append('sources')
+            columns.append(stmt.selected_columns['sources_grp'])
+        return fields, stmt.with_only_columns(*columns, maintain_column_froms=True)
+
+    def results_raw(self, session: Session, limit: int | None = 20, offset: int | None = None) -> tuple[list[str], list[tuple[Any, ...]]]:
+        """
+        Plain column tuples (no ORM objects and no models), e.g. for exports; see `rows_to_record_batch()` to get them in arrow format.
+        :return: Names of the columns and the rows
+        """
+        fields, stmt = self._raw_stmt(self.stmt.limit(limit).offset(offset))
+        return fields, [tuple(row) for row in session.execute(stmt)]
+
+    async def results_raw_async(
+        self, session: AsyncSession | DBSession, limit: int | None = 20, offset: int | None = None
+    ) -> tuple[list[str], list[tuple[Any, ...]]]:
+        fields, stmt = self._raw_stmt(self.stmt.limit(limit).offset(offset))
+        return fields, [tuple(row) for row in await session.execute(stmt)]
+
     def results(
         self,
         session: Session,
         limit: int | None = 20,
         offset: int | None = None,
+        transform: TransformMode = 'validate',
     ) -> list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel]:
         """
         Query the database for results (mappings) either from an existing `session`.
         :param session:
         :param limit: how many results to return
         :param offset:
+        :param transform: how rows are turned into models (see `TransformMode`)
         :return:
         """
         stmt = self.stmt
@@ -470,13 +990,14 @@ class NQLQuery:
             stmt = stmt.offset(offset)
 
         rslt = session.execute(stmt).mappings().all()
-        return self._transform_results(rslt)
+        return self._transform_results(rslt, transform=transform)
 
     async def results_async(
         self,
         session: AsyncSession | DBSession,
         limit: int | None = 20,
         offset: int | None = None,
+        transform: TransformMode = 'validate',
     ) -> list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel]:
         stmt = self.stmt
         if limit is not None:
@@ -486,16 +1007,82 @@ class NQLQuery:
             stmt = stmt.offset(offset)
 
         rslt = (await session.execute(stmt)).mappings().all()
-        return self._transform_results(rslt)
+        return self._transform_results(rslt, transform=transform)
 
+    def _page_stmt(self, limit: int, cursor: str | None, order_by: str) -> sa.Select:  # type: ignore[type-arg]
+        return keyset_paginate(self.stmt, Schema=self.Schema, limit=limit, cursor=cursor, order_by=order_by)
 
-def query_to_sql(query: NQLFilter, project_id: str, project_type: ItemType | str = ItemType.academic) -> sa.Select:  # type: ignore[type-arg]
-    query_object = NQLQuery(query=query, project_id=project_id, project_type=project_type)
-    return query_object.stmt
+    def _page(
+        self, rslt: Sequence[sa.RowMapping], limit: int, order_by: str, transform: TransformMode
+    ) -> tuple[list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel], str | None]:
+        cursor = next_cursor([row[self.Schema.__name__] for row in rslt], limit=limit, order_by=order_by)
+        return self._transform_results(rslt[:limit], transform=transform), cursor
 
+    def results_page(
+        self,
+        session: Session,
+        limit: int = 20,
+        cursor: str | None = None,
+        order_by: str = 'item_id',
+        transform: TransformMode = 'validate',
+    ) -> tuple[list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel], str | None]:
+        """
+        Query one page of results with keyset pagination, so deep pages are as cheap as the first one.
+        :param session:
+        :param limit: how many results to return
+        :param cursor: opaque token returned with the previous page (None for the first page)
+        :param order_by: name of the (stable) column to sort by; `item_id` is used as a tiebreaker
+        :param transform: how rows are turned into models (see `TransformMode`)
+        :return: results and the cursor for the next page (None if this was the last page)
+        """
+        rslt = session.execute(self._page_stmt(limit=limit, cursor=cursor, order_by=order_by)).mappings().all()
+        return self._page(rslt, limit=limit, order_by=order_by, transform=transform)
 
-def nql_to_sql(query: NQLFilter, project_id: str, project_type: ItemType | str = ItemType.academic) -> sa.Select:  # type: ignore[type-arg]
-    return query_to_sql(query=query, project_id=project_id, project_type=project_type)
+    async def results_page_async(
+        self,
+        session: AsyncSession | DBSession,
+        limit: int = 20,
+        cursor: str | None = None,
+        order_by: str = 'item_id',
+        transform: TransformMode = 'validate',
+    ) -> tuple[list[FullLexisNexisItemModel] | list[AcademicItemModel] | list[GenericItemModel], str | None]:
+        rslt = (await session.execute(self._page_stmt(limit=limit, cursor=cursor, order_by=order_by))).mappings().all()
+        return self._page(rslt, limit=limit, order_by=order_by, transform=transform)
+
+
+def query_to_sql(
+    query: NQLFilter,
+    project_id: str,
+    project_type: ItemType | str = ItemType.academic,
+    search_mode: SearchMode = 'like',
+    compiler: NQLCompiler = 'cte',
+) -> sa.Select:  # type: ignore[type-arg]
+    query_object = NQLQuery(query=query, project_id=project_id, project_type=project_type, search_mode=search_mode, compiler=compiler)
+    return query_object.stmt
 
 
-__all__ = ['query_to_sql', 'nql_to_sql', 'NQLFilter', 'NQLFilterParser', 'InvalidNQLError', 'NQLQuery', 'get_select_base']
+def nql_to_sql(
+    query: NQLFilter,
+    project_id: str,
+    project_type: ItemType | str = ItemType.academic,
+    search_mode: SearchMode = 'like',
+    compiler: NQLCompiler = 'cte',
+) -> sa.Select:  # type: ignore[type-arg]
+    return query_to_sql(query=query, project_id=project_id, project_type=project_type, search_mode=search_mode, compiler=compiler)
+
+
+__all__ = [
+    'query_to_sql',
+    'nql_to_sql',
+    'NQLFilter',
+    'NQLFilterParser',
+    'InvalidNQLError',
+    'NQLQuery',
+    'get_select_base',
+    'SearchMode',
+    'detect_search_mode',
+    'NQLCompiler',
+    'Explain',
+    'TransformMode',
+    'rows_to_record_batch',
+]
@@ -1,12 +1,14 @@
 import logging
+from functools import cache, lru_cache
 from collections import defaultdict
-from typing import TYPE_CHECKING, TypedDict, Optional, Any
+from typing import TYPE_CHECKING, TypedDict, Optional, Any, Sequence
 
 from lark import Lark, Tree, Token
 
 from nacsos_data.util import oring, anding
 
 if TYPE_CHECKING:
+    import numpy as np
     import pandas as pd
 
 logger = logging.getLogger('nacsos_data.util.priority.labels')
@@ -63,15 +65,244 @@ class ColSet(TypedDict):
     users: list[str]
 
 
+@cache
+def _parser() -> Lark:
+    return Lark(GRAMMAR, parser='earley', start='clause')
+
+
 def parse_rule(rule: str) -> Tree[Token]:
-    parser = Lark(GRAMMAR, parser='earley', start='clause')
     # transformer = TypeTransformer()
-    tree = parser.parse(rule)
+    tree = _parser().parse(rule)
     # tree = transformer.transform(tree)
     return tree
 
 
-def get_inclusion_mask(  # noqa: C901
+# Compiled rule: nested tuples of (operator, *operands); leaves are (column operator, column type, column name)
+RuleNode = tuple[Any, ...]
+# Three-valued (Kleene) boolean vector: values and mask of missing values (values are False where missing)
+Mask = tuple['np.ndarray', 'np.ndarray']
+
+
+def _to_node(subtree: Tree[Token]) -> RuleNode:
+    if not isinstance(subtree, Tree):
+        raise SyntaxError('This is not a tree!')
+    if subtree.data in {'and', 'or', 'ored', 'anded'}:
+        return (str(subtree.data), *[_to_node(child) for child in subtree.children if child is not None])  # type: ignore[arg-type]
+    if subtree.data == 'not':
+        raise SyntaxError('Negation of clauses is not supported.')
+    token: Token = subtree.children[0]  # type: ignore[assignment]
+    return str(subtree.data), token.type, token.value
+
+
+@lru_cache(maxsize=256)
+def compile_rule(rule: str) -> RuleNode:
+    """
+    Parse an inclusion rule once into a (hashable) tree of tuples; see `get_inclusion_mask()`.
+    """
+    return _to_node(parse_rule(rule))
+
+
+class _RuleEvaluator:
+    """
+    Evaluates a compiled rule on numpy arrays with the same three-valued semantics as the pandas implementation
+    (`oring`/`anding` skip missing values and only return missing if all inputs are missing).
+    Each column is converted once and each distinct sub-expression is only evaluated once.
+    """
+
+    def __init__(self, df: 'pd.DataFrame', columns: set[str], ignore_missing: bool):
+        self.df = df
+        self.columns = columns
+        self.ignore_missing = ignore_missing
+        self.n_rows = len(df)
+
+        self.anycols: dict[str, list[str]] = defaultdict(list)
+        self.resanycols: dict[str, ColSet] = defaultdict(lambda: ColSet(res=None, users=[]))
+        for col in sorted(columns):
+            if '|' not in col:
+                continue
+            parts = col.split('|')
+            key = '|'.join(parts[1:])
+            self.anycols[key].append(col)
+            if parts[0] == 'res':
+                self.resanycols[key]['res'] = col
+            else:
+                self.resanycols[key]['users'].append(col)
+
+        self._values: dict[str, tuple['np.ndarray', 'np.ndarray', bool]] = {}
+        self._memo: dict[RuleNode, Mask | None] = {}
+
+    def _column(self, col: str) -> tuple['np.ndarray', 'np.ndarray', bool]:
+        if col not in self._values:
+            import numpy as np
+            import pandas as pd
+
+            series = self.df[col]
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            # Comparisons on nullable (extension) columns propagate missing values, on numpy columns they are False
+            self._values[col] = values, np.isnan(values), isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+        return self._values[col]
+
+    def boolean(self, col: str) -> Mask:  # df[col].astype('boolean')
+        values, na, _ = self._column(col)
+        return (values != 0) & ~na, na
+
+    def is_false(self, col: str) -> Mask:  # df[col].astype('boolean') == False
+        values, na, _ = self._column(col)
+        return (values == 0) & ~na, na
+
+    def equals(self, col: str, value: int) -> Mask:  # df[col] == value
+        values, na, extension = self._column(col)
+        return (values == value) & ~na, na if extension else na & False
+
+    def resolved(self, col: str, value: bool) -> Mask:  # (df[col].notna() & df[col]) == value
+        values, na, extension = self._column(col)
+        if extension:
+            return self.boolean(col) if value else self.is_false(col)
+        # On numpy columns, `notna() & df[col]` is False (never missing) where the resolution is missing
+        yes = (values != 0) & ~na
+        return yes if value else ~yes, na & False
+
+    def isna(self, col: str) -> Mask:  # df[col].isna()
+        _, na, _ = self._column(col)
+        return na, na & False
+
+    def or_na(self, mask: Mask, col: str) -> Mask:  # mask | df[col].isna()
+        _, na, _ = self._column(col)
+        return mask[0] | na, na & False
+
+    @staticmethod
+    def oring(masks: Sequence[Mask | None]) -> Mask | None:
+        import numpy as np
+
+        present = [mask for mask in masks if mask is not None]
+        if len(present) == 0:
+            return None
+        na = np.logical_and.reduce([mask[1] for mask in present])
+        return np.logical_or.reduce([mask[0] for mask in present]) & ~na, na
+
+    @staticmethod
+    def anding(masks: Sequence[Mask | None]) -> Mask | None:
+        import numpy as np
+
+        present = [mask for mask in masks if mask is not None]
+        if len(present) == 0:
+            return None
+        na = np.logical_and.reduce([mask[1] for mask in present])
+        return np.logical_and.reduce([mask[0] | mask[1] for mask in present]) & ~na, na
+
+    @staticmethod
+    def kleene_or(left: Mask, right: Mask) -> Mask:
+        value = left[0] | right[0]
+        return value, (left[1] | right[1]) & ~value
+
+    @staticmethod
+    def kleene_and(left: Mask, right: Mask) -> Mask:
+        false = (~left[0] & ~left[1]) | (~right[0] & ~right[1])
+        na = (left[1] | right[1]) & ~false
+        return ~false & ~na, na
+
+    def _or_users(self, masks: list[Mask]) -> Mask:
+        import numpy as np
+
+        mask = self.oring(masks)
+        if mask is None:
+            # `oring([])` is False
+            return np.zeros(self.n_rows, dtype=bool), np.zeros(self.n_rows, dtype=bool)
+        return mask
+
+    def __call__(self, node: RuleNode) -> Mask | None:
+        if node not in self._memo:
+            self._memo[node] = self._evaluate(node)
+        return self._memo[node]
+
+    def _evaluate(self, node: RuleNode) -> Mask | None:  # noqa: C901
+        op = node[0]
+        if op in {'and', 'anded'}:
+            return self.anding([self(child) for child in node[1:]])
+        if op in {'or', 'ored'}:
+            return self.oring([self(child) for child in node[1:]])
+
+        _, ctp, col = node
+        if ctp == 'SRC' and col not in self.columns:
+            if not self.ignore_missing:
+                raise KeyError(f'`{col}` not in dataframe!')
+            return None
+        elif ctp == 'ANYSRC' and col not in self.anycols:
+            if not self.ignore_missing:
+                raise KeyError(f'`*|{col}` not in dataframe!')
+            return None
+
+        # specific columns
+        if op == 'maybeyes':
+            return self.boolean(col)
+        if op == 'maybeno':
+            return self.is_false(col)
+        if op == 'forceyes':
+            return self.equals(col, 1)
+        if op == 'forceno':
+            return self.equals(col, 0)
+
+        # any-user column
+        cols = self.anycols[col]
+        if op == 'anyyes':
+            return self.oring([self.boolean(c) for c in cols])
+        if op == 'allyes':
+            return self.anding([self.oring([self.isna(c) for c in cols]), self.anding([self.or_na(self.boolean(c), c) for c in cols])])
+        if op == 'forceallyes':
+            return self.anding([self.equals(c, 1) for c in cols])
+        if op == 'anyno':
+            return self.oring([self.is_false(c) for c in cols])
+        if op == 'allno':
+            return self.anding([self.oring([self.isna(c) for c in cols]), self.anding([self.or_na(self.is_false(c), c) for c in cols])])
+        if op == 'forceallno':
+            return self.anding([self.equals(c, 0) for c in cols])
+
+        # any-user column (use resolution if available)
+        res = self.resanycols[col]['res']
+        users = self.resanycols[col]['users']
+        if op == 'resanyyes':
+            if res:
+                return self.kleene_or(self.resolved(res, True), self.kleene_and(self.isna(res), self._or_users([self.boolean(c) for c in users])))
+            return self.oring([self.boolean(c) for c in cols])
+        if op == 'resanyno':
+            if res:
+                # FIXME: on numpy columns, a missing resolution counts as "no" (same as the pandas implementation)
+                return self.kleene_or(self.resolved(res, False), self.kleene_and(self.isna(res), self._or_users([self.is_false(c) for c in users])))
+            # FIXME: this is "any yes" (same as the pandas implementation)
+            return self.oring([self.boolean(c) for c in cols])
+
+        raise SyntaxError("You shouldn't end up here.")
+
+
+def get_inclusion_mask(
+    rule: str,
+    df: 'pd.DataFrame',
+    label_cols: list[str] | None = None,
+    ignore_missing: bool = False,
+    compiled: bool = True,
+) -> 'pd.Series[bool]':
+    """
+    Evaluate an inclusion rule (see `GRAMMAR`) on the label columns of an export table (see `wide_export_table()`).
+    :param compiled: Use the (cached) compiled rule and numpy evaluation instead of combining pandas series for each operator
+    :return: Nullable boolean mask (missing where the rule could not be evaluated)
+    """
+    if not compiled:
+        return _get_inclusion_mask_pandas(rule=rule, df=df, label_cols=label_cols, ignore_missing=ignore_missing)
+
+    import pandas as pd
+
+    columns: set[str] = set(df.columns) if label_cols is None else set(label_cols)
+    node = compile_rule(rule)
+    logger.debug(f'Query: {rule}')
+    logger.debug(f'Compiled: {node}')
+
+    mask = _RuleEvaluator(df=df, columns=columns, ignore_missing=ignore_missing)(node)
+    if mask is None:
+        return pd.Series(pd.NA, index=df.index, dtype='boolean')
+    return pd.Series(pd.arrays.BooleanArray(mask[0], mask[1]), index=df.index)
+
+
+def _get_inclusion_mask_pandas(  # noqa: C901
     rule: str,
     df: 'pd.DataFrame',
     label_cols: list[str] | None = None,
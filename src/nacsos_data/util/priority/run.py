@@ -9,7 +9,7 @@ from nacsos_data.util.priority.ml import training, workload_estimation, report
 
 from nacsos_data.db.schemas import Priority
 from nacsos_data.models.priority import PriorityModel
-from nacsos_data.util.annotations.export import wide_export_table
+from nacsos_data.util.annotations.export import wide_export_batches, arrow_to_pandas, drop_unused_label_cols
 from nacsos_data.util.errors import NotFoundError
 from nacsos_data.util.priority.mask import get_inclusion_mask
 from nacsos_data.util.priority.plots import inclusion_curve, scope_inclusions, buscar_frontiers, score_distribution, buscar_workload, roc_auc
@@ -55,8 +55,8 @@ async def main(
     tab_self_eval: str = 'report_self.json',
     fig_params: dict[str, Any] | None = None,
 ) -> None:
-    import pandas as pd
     import numpy as np
+    import pyarrow as pa
 
     # -----------------------------------------------------------------------------------------
     # Setup
@@ -81,7 +81,7 @@ async def main(
     incl_pred_field = priority.incl_pred_field
     config = priority.config
 
-    if not incl_rule or not incl_field or not incl_pred_field or not config:
+    if not incl_rule or not incl_field or not incl_pred_field or not config or not priority.source_scopes or priority.project_id is None:
         raise ValueError('Some data is missing!')
 
     # -----------------------------------------------------------------------------------------
@@ -89,9 +89,11 @@ async def main(
     # -----------------------------------------------------------------------------------------
     logger.info('Fetching wide export table...')
     async with db_engine.session() as session:  # type: AsyncSession
-        base_cols, label_cols, df = await wide_export_table(
+        base_cols, label_cols, schema, batches = await wide_export_batches(
             session=session, scope_ids=priority.source_scopes, limit=None, project_id=priority.project_id, nql_filter=priority.nql_parsed
         )
+        df = arrow_to_pandas(pa.Table.from_batches([batch async for batch in batches], schema=schema))
+    label_cols = drop_unused_label_cols(df, label_cols)
 
     logger.info(f'  -> retrieved table with shape={df.shape}')
     logger.info(f'     / base_cols={base_cols}')
@@ -156,7 +158,6 @@ async def main(
     logger.info('Writing predictions and full data-table to file...')
     df.to_feather(out_path / data_table)
 
-    df = pd.read_feather(out_path / data_table)
     # -----------------------------------------------------------------------------------------
     # Post-train stats and plots
     # -----------------------------------------------------------------------------------------
@@ -0,0 +1,233 @@
+import uuid
+import pickle
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .text import preprocess_text, tokenise_text
+from .duplicate.index_milvus import _sparse_vectors
+from ..db.crud.items.academic import read_item_entries_from_db, read_item_index_fingerprint
+from ..models.items import ItemIndexFingerprint
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession  # noqa: F401
+    from pynndescent import NNDescent
+
+logger = logging.getLogger('nacsos_data.util.similarity')
+
+SimilarityBackend = Literal['inprocess', 'milvus']
+
+
+class SimilarityIndex:
+    """
+    Approximate nearest neighbour lookup of items in a project with texts similar to a query text (e.g. for the NQL `SIMILAR` operator).
+    Texts (title and abstract) are tokenised the same way as for the duplicate detection indexes and weighted by tf-idf.
+    Vectors are l2-normalised, so the similarity of a hit is the cosine similarity to the query.
+
+    Backends:
+      - `inprocess`: approximate nearest neighbour graph (pynndescent) held in memory
+      - `milvus`: sparse vector search in a milvus collection (one per project, kept on the server)
+
+    If `index_dir` is given, the index is persisted there and only rebuilt when the items in the project changed
+    (see `ItemIndexFingerprint`); for milvus, only the vectoriser is stored there.
+    """
+
+    # Texts shorter than N characters are not in the index
+    MIN_TEXT_LEN = 10
+    # Min. number of documents (parameter for vectoriser)
+    MIN_DF = 2
+    # Max. proportion of documents (parameter for vectoriser)
+    MAX_DF = 0.95
+    # Max. number of features / vocabulary size (parameter for vectoriser)
+    MAX_FEATURES = 20000
+    # Number of vectors per insert request (milvus)
+    INSERT_CHUNK = 10000
+
+    def __init__(
+        self,
+        project_id: str | uuid.UUID,
+        backend: SimilarityBackend = 'inprocess',
+        index_dir: Path | str | None = None,
+        batch_size: int = 10000,
+        milvus_uri: str = 'http://localhost:19530',
+    ):
+        self.project_id = project_id
+        self.backend = backend
+        self.index_dir = None if index_dir is None else Path(index_dir)
+        self.batch_size = batch_size
+        self.milvus_uri = milvus_uri
+        self.collection_name = f's_{project_id}'.replace('-', '_')
+
+        self.vectoriser: TfidfVectorizer | None = None
+        self.fingerprint: ItemIndexFingerprint | None = None
+        self.index: NNDescent | None = None
+        self.item_ids: list[str] | None = None
+        self._client: Any = None
+
+    @property
+    def _state_path(self) -> Path | None:
+        if self.index_dir is None:
+            return None
+        return self.index_dir / f'similarity-{self.backend}.pkl'
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from pymilvus import MilvusClient
+
+            self._client = MilvusClient(uri=self.milvus_uri)
+        return self._client
+
+    def _load_state(self, fingerprint: ItemIndexFingerprint) -> bool:
+        if self._state_path is None or not self._state_path.exists():
+            return False
+        with open(self._state_path, 'rb') as f_state:
+            state = pickle.load(f_state)
+        if state['fingerprint'] != fingerprint:
+            logger.info(f'Persisted similarity index is outdated ({state["fingerprint"]} vs {fingerprint}).')
+            return False
+        if self.backend == 'milvus':
+            if not self.client.has_collection(collection_name=self.collection_name):
+                return False
+            self.client.load_collection(self.collection_name)
+
+        self.vectoriser = state['vectoriser']
+        self.index = state.get('index')
+        self.item_ids = state.get('item_ids')
+        self.fingerprint = fingerprint
+        return True
+
+    def _save_state(self) -> None:
+        if self._state_path is None:
+            return
+        state = {'fingerprint': self.fingerprint, 'vectoriser': self.vectoriser}
+        if self.backend == 'inprocess':
+            state.update({'index': self.index, 'item_ids': self.item_ids})
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._state_path.with_suffix('.tmp'), 'wb') as f_state:
+            pickle.dump(state, f_state)
+        self._state_path.with_suffix('.tmp').replace(self._state_path)
+
+    async def _read_texts(self, session: 'AsyncSession') -> tuple[list[str], list[str]]:
+        item_ids: list[str] = []
+        texts: list[str] = []
+        async for batch in read_item_entries_from_db(session=session, project_id=self.project_id, batch_size=self.batch_size, min_text_len=self.MIN_TEXT_LEN):
+            item_ids.extend(entry.item_id for entry in batch)
+            texts.extend(entry.text for entry in batch)
+        return item_ids, texts
+
+    def _create_collection(self, item_ids: list[str], vectors: csr_matrix) -> None:
+        from pymilvus import DataType
+
+        if self.client.has_collection(collection_name=self.collection_name):
+            self.client.drop_collection(collection_name=self.collection_name)
+
+        schema = self.client.create_schema(auto_id=False, enable_dynamic_fields=False)
+        schema.add_field(field_name='item_id', datatype=DataType.VARCHAR, is_primary=True, max_length=36)
+        schema.add_field(field_name='sparse_vector', datatype=DataType.SPARSE_FLOAT_VECTOR)
+        self.client.create_collection(collection_name=self.collection_name, schema=schema)
+
+        for start in range(0, vectors.shape[0], self.INSERT_CHUNK):
+            rows = [
+                {'item_id': item_id, 'sparse_vector': vector}
+                for item_id, vector in zip(
+                    item_ids[start : start + self.INSERT_CHUNK], _sparse_vectors(vectors[start : start + self.INSERT_CHUNK]), strict=True
+                )
+                if len(vector) > 0
+            ]
+            if len(rows) > 0:
+                self.client.insert(collection_name=self.collection_name, data=rows)
+
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(field_name='sparse_vector', index_name='sparse_inverted_index', index_type='SPARSE_INVERTED_INDEX', metric_type='IP')
+        self.client.create_index(collection_name=self.collection_name, index_params=index_params)
+        self.client.load_collection(self.collection_name)
+
+    async def init(self, session: 'AsyncSession') -> None:
+        """
+        Load the persisted index (if still valid) or (re-)build it from the items in the database.
+        """
+        fingerprint = await read_item_index_fingerprint(session=session, project_id=self.project_id, min_text_len=self.MIN_TEXT_LEN)
+        if self._load_state(fingerprint):
+            logger.info(f'Loaded persisted similarity index from {self._state_path}.')
+            return
+
+        logger.info('Loading items from database...')
+        item_ids, texts = await self._read_texts(session)
+        logger.info(f'Building similarity index for {len(item_ids):,} items...')
+        self.item_ids = item_ids
+        self.fingerprint = fingerprint
+        if len(texts) == 0:
+            return
+
+        few = len(texts) <= self.MIN_DF
+        self.vectoriser = TfidfVectorizer(
+            min_df=1 if few else self.MIN_DF,
+            max_df=1.0 if few else self.MAX_DF,
+            max_features=self.MAX_FEATURES,
+            preprocessor=preprocess_text,
+            tokenizer=tokenise_text,
+            token_pattern=None,
+        )
+        vectors = csr_matrix(self.vectoriser.fit_transform(texts))
+        del texts
+
+        if self.backend == 'milvus':
+            self._create_collection(item_ids, vectors)
+        else:
+            import pynndescent
+
+            self.index = pynndescent.NNDescent(vectors, metric='cosine')
+            self.index.prepare()
+
+        self._save_state()
+
+    def query(self, text: str, top_k: int = 100, min_similarity: float = 0.0) -> list[tuple[str, float]]:
+        """
+        Up to `top_k` items most similar to `text`.
+        :param text: Query text
+        :param top_k: Maximum number of items
+        :param min_similarity: Drop hits with a (cosine) similarity at or below this threshold (unrelated texts have similarity 0)
+        :return: Pairs of item_id and similarity (most similar first)
+        """
+        if self.fingerprint is None:
+            raise RuntimeError('Index is not initialised, yet!')
+        if self.vectoriser is None:
+            # No items with texts in this project
+            return []
+
+        vector = csr_matrix(self.vectoriser.transform([text]))
+        if vector.nnz == 0:
+            return []
+
+        hits: list[tuple[str, float]]
+        if self.backend == 'milvus':
+            search_res = self.client.search(
+                collection_name=self.collection_name,
+                data=_sparse_vectors(vector),
+                limit=top_k,
+                search_params={'metric_type': 'IP', 'params': {}},
+            )
+            hits = [(str(hit['id']), float(hit['distance'])) for hit in search_res[0]]
+        else:
+            if self.index is None or self.item_ids is None:
+                raise RuntimeError('Index is not initialised, yet!')
+            indices, distances = self.index.query(vector, k=min(top_k, len(self.item_ids)))
+            hits = [(self.item_ids[idx], 1.0 - float(dist)) for idx, dist in zip(indices[0], distances[0], strict=True) if idx >= 0]
+
+        return [(item_id, similarity) for item_id, similarity in hits if similarity > min_similarity]
+
+    def close(self) -> None:
+        """
+        Release the in-memory index; the persisted state (and milvus collection) is kept for the next lookup.
+        """
+        self.index = None
+        self.item_ids = None
+        self.vectoriser = None
+        self.fingerprint = None
+
+
+__all__ = ['SimilarityIndex', 'SimilarityBackend']